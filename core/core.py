@@ -2,7 +2,7 @@ import pygame
 from time import perf_counter
 from collections import deque
 
-from utils.my_timer import Timer
+from utils.my_timer import Timer, FrameClock, TimeDomain
 from core.event_manger import EventManger
 import game.game_module
 from core.settings import Settings
@@ -12,12 +12,13 @@ from core.menu import Menu
 from core.game_storage import GameStorage
 import core.menu
 from game.game_module import Game
-from core.task_scheduler import TaskScheduler
-from utils.tween_module import TweenTrack, TweenChain
+from core.task_scheduler import TaskScheduler, CoroutineTask, NextFrame, Wait
+from utils.tween_module import TweenTrack, TweenChain, TweenEngine
 from utils.animation import AnimationTrack
+from utils.surface_registry import SurfaceRegistry
 import sys
 import platform
-from typing import Any
+from typing import Any, Coroutine
 
 WEBPLATFORM = 'emscripten'
 
@@ -26,13 +27,17 @@ class Core:
     START_GAME = pygame.event.custom_type()
     END_GAME = pygame.event.custom_type()
     IS_DEBUG : bool = False
+    #Time kept free at the end of every frame for the display flip and clock.tick when running deferred work
+    DEFERRED_WORK_MARGIN : float = 0.002
+    #Longest frame the time domains will advance by, so a hitch doesn't skip timers and tweens ahead
+    MAX_FRAME_TIME : float = 0.25
     def __init__(self) -> None:
         self.FPS = 60
         self.PERFORMANCE_MODE = False
         self.WEBPLATFORM = 'emscripten'
         self.CURRENT_PLATFORM = sys.platform
         self.main_display : pygame.Surface
-        self.brightness_map = pygame.Surface((2000, 2000), pygame.SRCALPHA)
+        self.brightness_map = SurfaceRegistry.prepare(pygame.Surface((2000, 2000), pygame.SRCALPHA), owner='core')
         pygame.draw.rect(self.brightness_map, (255, 255, 255, 0), (0,0, 2000, 2000))
         self.event_manager = EventManger()
         self.make_connections()
@@ -53,7 +58,14 @@ class Core:
         self.brightness_map_blend_mode = pygame.BLENDMODE_NONE
 
         self.global_timer : Timer = Timer(-1, perf_counter, 1)
-        Timer.time_source = self.global_timer.get_time
+        #Every domain runs off the frame clock, so the global timer is only sampled once per frame
+        self.frame_clock : FrameClock = FrameClock(self.global_timer.get_time, max_dt=self.MAX_FRAME_TIME)
+        self.real_domain : TimeDomain = TimeDomain.create('real', self.frame_clock.get_time)
+        self.game_domain : TimeDomain = TimeDomain.create('game', 'real')
+        self.ui_domain : TimeDomain = TimeDomain.create('ui', 'real')
+        #Only game objects opt into the 'game' domain, so menus and the ui keep running while the game is paused
+        Timer.time_source = self.real_domain.get_time
+        Timer.real_time_source = self.global_timer.get_time
 
         self.window_bools : dict = {'Shown' : True, 'input_focused' : True}
 
@@ -73,11 +85,13 @@ class Core:
         self.main_display = main_display
     
     def close_game(self, event : pygame.Event):
+        self.task_scheduler.shutdown()
         self.settings.save()
         pygame.quit()
         exit()
     
     def update_dt(self, target_fps : int|float = 60):
+        self.frame_clock.tick()
         if self.last_dt_measurment == 0:
             self.dt = 1
             self.last_dt_measurment = perf_counter()
@@ -86,6 +100,28 @@ class Core:
             self.dt = (mark - self.last_dt_measurment) * target_fps
             self.last_dt_measurment = mark
     
+    def start_coroutine(self, coroutine : Coroutine) -> CoroutineTask:
+        '''Runs a coroutine on the task scheduler, e.g. core.start_coroutine(cutscene()). See TaskScheduler.start_coroutine.'''
+        return self.task_scheduler.start_coroutine(coroutine)
+    
+    def next_frame(self) -> NextFrame:
+        '''"await core.next_frame()" inside a coroutine started with start_coroutine.'''
+        return NextFrame()
+    
+    def wait(self, seconds : float, domain : TimeDomain|str|None = None) -> Wait:
+        '''"await core.wait(seconds)" inside a coroutine started with start_coroutine. Seconds are counted in domain
+        (a TimeDomain or its name), in real time by default. Pass 'game' for waits that should stop while the game is paused.'''
+        if isinstance(domain, str): domain = TimeDomain.get(domain)
+        if domain is None: return Wait(seconds)
+        return Wait((seconds, domain.get_time, 1))
+    
+    def run_deferred_work(self):
+        '''Spends what is left of this frame's time (1 / FPS since update_dt) on the task scheduler's deferred queue.
+        The main loop calls it right before clock.tick.'''
+        if not self.task_scheduler.deferred: return
+        deadline = self.last_dt_measurment + 1 / self.FPS - self.DEFERRED_WORK_MARGIN
+        self.task_scheduler.run_deferred(deadline)
+    
     def set_debug_message(self, text : str):
         debug_textsprite : TextSprite = core_object.main_ui.get_sprite('debug_sprite')
         if not debug_textsprite: return
@@ -102,7 +138,7 @@ class Core:
             self.brightness_map_blend_mode = pygame.BLEND_RGB_SUB
     
     def make_connections(self):
-        self.event_manager.bound_actions[pygame.QUIT] = [self.close_game]
+        self.event_manager.set_quit_action(self.close_game)
 
         self.event_manager.bind(pygame.WINDOWHIDDEN, self.handle_window_event)
         self.event_manager.bind(pygame.WINDOWSHOWN, self.handle_window_event)
@@ -185,10 +221,12 @@ class Core:
     def update(self):
         self.task_scheduler.update()
         TweenTrack.update_all()
+        TweenEngine.update_all()
         TweenChain.update_all()
         self.update_delta_stream()
         self.bg_manager.update()
         AnimationTrack.update_all_elements()
+        if SurfaceRegistry.accounting_enabled or SurfaceRegistry.audit_enabled: SurfaceRegistry.end_frame()
     
     def update_delta_stream(self):
         target_lentgh = round(30 / self.dt)
@@ -1,17 +1,187 @@
 import pygame
+import weakref
 from sys import exit
+from typing import Callable, Any, Iterator
+from collections.abc import MutableMapping
+
+EventAction = Callable[[pygame.Event], Any]
+
+class EventBinding:
+    '''Handle returned by EventManger.connect. unbind() removes the action in O(1).'''
+    __slots__ = ('manager', 'event_type', 'priority', 'serial', 'action', 'ref', 'is_bound')
+    def __init__(self, manager : 'EventManger', event_type : int, action : EventAction, priority : int, serial : int, weak : bool) -> None:
+        self.manager : EventManger = manager
+        self.event_type : int = event_type
+        self.priority : int = priority
+        self.serial : int = serial
+        self.is_bound : bool = True
+        #Weak bindings keep a reference to the action instead of the action, so they don't keep its object alive
+        self.action : EventAction|None = None if weak else action
+        self.ref : weakref.ref|None = None
+        if weak: self.ref = weakref.WeakMethod(action) if hasattr(action, '__self__') else weakref.ref(action)
+
+    def get_action(self) -> EventAction|None:
+        return self.action if self.ref is None else self.ref()
+
+    def call_weak(self, event : pygame.Event) -> Any:
+        '''Stands in for a weak action in the dispatch table. Unbinds itself once the action's object is gone.'''
+        action = self.ref()
+        if action is None:
+            self.unbind()
+            return None
+        return action(event)
+
+    def unbind(self):
+        self.manager.remove_binding(self)
+
+
+class BoundActions(MutableMapping):
+    '''EventManger.bound_actions: event type -> its actions in dispatch order, read from the bindings.
+    Assigning a list of actions to an event type rebinds it with those actions, and deleting an event type unbinds it.
+    The actions come back as a tuple, so they can't be changed in place behind the bindings' back.'''
+    def __init__(self, manager : 'EventManger') -> None:
+        self.manager : EventManger = manager
+
+    def __getitem__(self, event_type : int) -> tuple[EventAction, ...]:
+        if event_type == pygame.QUIT: return self.manager.quit_actions
+        if not self.manager.bindings.get(event_type, None): raise KeyError(event_type)
+        return self.manager.get_actions(event_type)
+
+    def __setitem__(self, event_type : int, actions : list[EventAction]):
+        if event_type == pygame.QUIT:
+            self.manager.quit_actions = tuple(actions)
+            self.manager.dispatch_table[pygame.QUIT] = self.manager.quit_actions
+            return
+        self.manager.unbind_all(event_type)
+        for action in actions:
+            self.manager.connect(event_type, action, duplicate=True)
+
+    def __delitem__(self, event_type : int):
+        if event_type == pygame.QUIT or not self.manager.unbind_all(event_type): raise KeyError(event_type)
+
+    def __iter__(self) -> Iterator[int]:
+        yield pygame.QUIT
+        for event_type, bindings in list(self.manager.bindings.items()):
+            if bindings: yield event_type
+
+    def __len__(self) -> int:
+        return 1 + sum(1 for bindings in self.manager.bindings.values() if bindings)
+
 
 class EventManger:
+    #Returning STOP from an action stops the event from reaching the actions after it
+    STOP : object = object()
+    #Never blocked by the event filter, bound or not
+    ALWAYS_ALLOWED : set[int] = {getattr(pygame, name) for name in ('QUIT', 'WINDOWCLOSE', 'VIDEORESIZE', 'VIDEOEXPOSE', 'WINDOWRESIZED',
+                                'WINDOWSIZECHANGED', 'WINDOWEXPOSED', 'APP_TERMINATING', 'APP_LOWMEMORY', 'APP_WILLENTERBACKGROUND', 
+                                'APP_DIDENTERBACKGROUND', 'APP_WILLENTERFOREGROUND', 'APP_DIDENTERFOREGROUND', 
+                                'RENDER_TARGETS_RESET', 'RENDER_DEVICE_RESET') if hasattr(pygame, name)}
+    #Every SDL event type pygame knows about, found the first time the filter is enabled
+    sdl_event_types : list[int]|None = None
+
     def __init__(self) -> None:
-        self.bound_actions : dict[int, list['function']] = {pygame.QUIT : [self.close_game]}
-    
+        #event type -> actions in dispatch order, cached from bindings. Rebuilt (copy-on-write) after bindings change,
+        #so actions can bind and unbind while an event is dispatched. bound_actions is the public view of it
+        self.dispatch_table : dict[int, tuple[EventAction, ...]] = {pygame.QUIT : (self.close_game,)}
+        #event type -> serial -> binding
+        self.bindings : dict[int, dict[int, EventBinding]] = {}
+        #event type -> action -> its first strong binding, for bind's duplicate check and unbind by action
+        self.strong_bindings : dict[int, dict[EventAction, EventBinding]] = {}
+        self.serial : int = 0
+        self.quit_actions : tuple[EventAction, ...] = (self.close_game,)
+        self.filter_events : bool = False
+        self.bound_actions : BoundActions = BoundActions(self)
+
     def close_game(self, event):
         pygame.quit()
         exit()
-    
-    def bind(self, event_type : int, actions : list['function'], duplicate = False):
-        '''The action parameter must be a function or list of functions that accepts exactly one pygame.Event argument. 
-        Returns False if the action fails to bind.'''
+
+    def enable_event_filter(self):
+        '''Keeps SDL's allowed event types in sync with the bound ones (plus ALWAYS_ALLOWED), so events nothing listens to
+        are dropped by SDL before they are queued or turned into pygame.Event objects. Custom event types are never blocked.
+        Needs the display to be initialized. Keyboard and mouse state (pygame.key.get_pressed, pygame.mouse.get_pos) still update.'''
+        if EventManger.sdl_event_types is None:
+            EventManger.sdl_event_types = [event_type for event_type in range(1, pygame.USEREVENT) 
+                                           if pygame.event.event_name(event_type) != 'Unknown']
+        self.filter_events = True
+        allowed = [event_type for event_type in EventManger.sdl_event_types if self.is_wanted(event_type)]
+        blocked = [event_type for event_type in EventManger.sdl_event_types if not self.is_wanted(event_type)]
+        if blocked: pygame.event.set_blocked(blocked)
+        if allowed: pygame.event.set_allowed(allowed)
+
+    def disable_event_filter(self):
+        self.filter_events = False
+        pygame.event.set_allowed(None)
+
+    def is_wanted(self, event_type : int) -> bool:
+        return event_type in EventManger.ALWAYS_ALLOWED or event_type >= pygame.USEREVENT or bool(self.bindings.get(event_type, None))
+
+    def sync_event_type(self, event_type : int):
+        '''Allows or blocks event_type in SDL after its bindings changed. Only does something while the event filter is enabled.'''
+        if not self.filter_events: return
+        if self.is_wanted(event_type):
+            pygame.event.set_allowed(event_type)
+        else:
+            pygame.event.set_blocked(event_type)
+
+    def set_quit_action(self, action : EventAction):
+        '''Replaces what happens on pygame.QUIT. QUIT can't be bound through bind or connect.'''
+        self.quit_actions = (action,)
+        self.dispatch_table[pygame.QUIT] = self.quit_actions
+
+    def connect(self, event_type : int, action : EventAction, priority : int = 0, weak : bool = False, duplicate : bool = False) -> EventBinding|None:
+        '''Binds a single action and returns its binding, or None if it could not be bound.
+        Actions with a higher priority run first; equal priorities run in the order they were bound.
+        weak only keeps a weak reference to the action (use it for bound methods of pooled or short lived objects);
+        the binding goes away on its own once the object is collected.'''
+        if event_type == pygame.QUIT: return None
+        strong_bindings = self.strong_bindings.setdefault(event_type, {})
+        if not duplicate:
+            existing = strong_bindings.get(action, None)
+            if existing is not None: return existing
+            if weak:
+                for binding in self.bindings.get(event_type, {}).values():
+                    if binding.ref is not None and binding.get_action() == action: return binding
+        self.serial += 1
+        binding = EventBinding(self, event_type, action, priority, self.serial, weak)
+        bindings = self.bindings.setdefault(event_type, {})
+        bindings[binding.serial] = binding
+        if not weak and action not in strong_bindings: strong_bindings[action] = binding
+        self.dispatch_table.pop(event_type, None)
+        if len(bindings) == 1: self.sync_event_type(event_type)
+        return binding
+
+    def remove_binding(self, binding : EventBinding):
+        if not binding.is_bound: return
+        binding.is_bound = False
+        event_type = binding.event_type
+        bindings = self.bindings.get(event_type, None)
+        if bindings is not None: bindings.pop(binding.serial, None)
+        strong_bindings = self.strong_bindings.get(event_type, None)
+        if binding.action is not None and strong_bindings is not None and strong_bindings.get(binding.action, None) is binding:
+            del strong_bindings[binding.action]
+            #Another (duplicate) binding of the same action takes its place
+            for other in bindings.values() if bindings else ():
+                if other.action == binding.action:
+                    strong_bindings[binding.action] = other
+                    break
+        self.dispatch_table.pop(event_type, None)
+        if not bindings: self.sync_event_type(event_type)
+
+    def rebuild(self, event_type : int) -> tuple[EventAction, ...]:
+        bindings = self.bindings.get(event_type, None)
+        if not bindings:
+            self.bindings.pop(event_type, None)
+            self.strong_bindings.pop(event_type, None)
+            return ()
+        ordered = sorted(bindings.values(), key = lambda binding : (-binding.priority, binding.serial))
+        actions = tuple(binding.action if binding.ref is None else binding.call_weak for binding in ordered)
+        self.dispatch_table[event_type] = actions
+        return actions
+
+    def bind(self, event_type : int, actions : list['function'], duplicate = False, priority : int = 0, weak : bool = False):
+        '''The action parameter must be a function or list of functions that accepts exactly one pygame.Event argument.
+        Returns False if the action fails to bind. See connect for priority and weak.'''
         try:
             actions[0]
         except TypeError:
@@ -19,14 +189,9 @@ class EventManger:
 
         if event_type == pygame.QUIT:
             return False
-        
-        if (event_type in self.bound_actions):
-            for action in actions:
-                if action not in self.bound_actions[event_type] or duplicate is True:
-                    self.bound_actions[event_type].append(action)
-        else:
-            self.bound_actions[event_type] = actions
-        
+
+        for action in actions:
+            self.connect(event_type, action, priority, weak, duplicate)
         return True
 
     def unbind(self, event_type : int, target_actions : list['function']):
@@ -39,26 +204,44 @@ class EventManger:
         if event_type == pygame.QUIT:
             return False
 
-        if event_type not in self.bound_actions:
+        if event_type not in self.bindings:
             return False
-        
+
         for action in target_actions:
-            if action in self.bound_actions[event_type]:
-                self.bound_actions[event_type].remove(action)
-                
+            binding = self.strong_bindings[event_type].get(action, None)
+            if binding is None:
+                for other in self.bindings[event_type].values():
+                    if other.ref is not None and other.get_action() == action:
+                        binding = other
+                        break
+            if binding is not None: binding.unbind()
+
         return True
-    
+
     def unbind_all(self, event_type : int):
         if event_type == pygame.QUIT:
             return False
 
-        if event_type not in self.bound_actions:
+        if event_type not in self.bindings:
             return False
-        
-        self.bound_actions.pop(event_type)
+
+        for binding in self.bindings.pop(event_type).values():
+            binding.is_bound = False
+        self.strong_bindings.pop(event_type, None)
+        self.dispatch_table.pop(event_type, None)
+        self.sync_event_type(event_type)
         return True
-    
+
+    def get_actions(self, event_type : int) -> tuple[EventAction, ...]:
+        actions = self.dispatch_table.get(event_type, None)
+        if actions is None: actions = self.rebuild(event_type)
+        return actions
+
     def process_event(self, event : pygame.Event):
-        if event.type in self.bound_actions:
-            for callback in self.bound_actions[event.type]:
-                callback(event)
+        actions = self.dispatch_table.get(event.type, None)
+        if actions is None:
+            if event.type not in self.bindings: return
+            actions = self.rebuild(event.type)
+        STOP = EventManger.STOP
+        for action in actions:
+            if action(event) is STOP: return
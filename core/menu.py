@@ -5,7 +5,7 @@ from utils.ui.textsprite import TextSprite
 from utils.ui.base_ui_elements import BaseUiElements
 import utils.tween_module as TweenModule
 import utils.interpolation as interpolation
-from utils.my_timer import Timer
+from utils.my_timer import Timer, TimeDomain
 from utils.ui.brightness_overlay import BrightnessOverlay
 from math import floor
 from utils.helpers import ColorType
@@ -32,7 +32,7 @@ class BaseMenu:
     
     def add_temp(self, element : UiSprite, time : float|Timer, override = False, time_source : Callable[[], float]|None = None, time_scale : float = 1):
         if element not in self.temp or override == True:
-            timer = time if type(time) == Timer else Timer(time, time_source, time_scale)
+            timer = time if type(time) == Timer else Timer(time, time_source or TimeDomain.get_source('ui'), time_scale)
             self.temp[element] = timer
     def alert_player(self, text : str, alert_speed : float = 1):
         text_sprite = TextSprite(pygame.Vector2(core_object.main_display.get_width() // 2, 90), 'midtop', 0, text, 
@@ -52,8 +52,9 @@ class BaseMenu:
         info_wait = TInfo(lambda t : t, on_screen_time)
         goal_wait = {}
 
-        chain = TweenModule.TweenChain(text_sprite, [(info1, goal1), (info_wait, goal_wait), (info2, goal2)], True)
-        chain.register()
+        chain = TweenModule.TweenChain.acquire(text_sprite, [(info1, goal1), (info_wait, goal_wait), (info2, goal2)], True,
+                                               TimeDomain.get_source('ui'))
+        chain.register(recycle=True)
         chain.play()
 
     def add_connections(self):
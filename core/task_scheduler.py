@@ -1,46 +1,514 @@
 from utils.my_timer import Timer
-from typing import Callable
+from typing import Callable, Any, Coroutine, Generator
 from utils.helpers import Task
+from heapq import heappush, heappop, heapify
+from concurrent.futures import ThreadPoolExecutor, Future
+from queue import SimpleQueue, Empty
+from collections import deque
+from time import perf_counter
+import traceback
+import sys
+import os
+
+TimeType = float|tuple[float, Callable[[], float]|None, float]
+
+class ScheduledTask(Task):
+    '''Handle returned by the TaskScheduler. cancel() stops it from running (again); cancelling is O(1).'''
+    def __init__(self, callback : Callable, *args, **kwargs) -> None:
+        super().__init__(callback, *args, **kwargs)
+        self.queue : TaskQueue|None = None
+        self.due : float = 0
+        #Time between runs in time source units, or None for a task that only runs once
+        self.interval : float|None = None
+        self.runs_left : int = 1
+        self.is_cancelled : bool = False
+        self.has_finished : bool = False
+
+    @property
+    def is_active(self) -> bool:
+        return not (self.is_cancelled or self.has_finished)
+
+    def cancel(self):
+        if not self.is_active: return
+        self.is_cancelled = True
+        if self.queue is not None: self.queue.forget(self)
+
+
+class TaskQueue:
+    '''Tasks waiting on one time source, in a heap ordered by due time. Cancelled tasks stay in the heap
+    until they reach the top, or until they make up most of it and the heap is rebuilt.'''
+    def __init__(self, time_source : Callable[[], float]|None) -> None:
+        self.time_source : Callable[[], float]|None = time_source
+        self.heap : list[tuple[float, int, ScheduledTask]] = []
+        self.counter : int = 0
+        self.cancelled : int = 0
+        #Set while run_due works through the heap. Rebuilding it then would drop the entries run_due has set aside
+        self.running : bool = False
+
+    def get_now(self) -> float:
+        return (self.time_source or Timer.time_source)()
+
+    def push(self, task : ScheduledTask):
+        #The counter keeps tasks due at the same time in scheduling order and stops the heap from comparing tasks
+        self.counter += 1
+        task.queue = self
+        heappush(self.heap, (task.due, self.counter, task))
+
+    def forget(self, task : ScheduledTask):
+        #Only called for tasks still in the heap: run_due clears task.queue before running a task
+        self.cancelled += 1
+        if not self.running: self.compact()
+
+    def compact(self):
+        '''Rebuilds the heap without its cancelled tasks once they make up most of it. The heap list is kept.'''
+        if self.cancelled > 64 and self.cancelled * 2 > len(self.heap):
+            self.heap[:] = [entry for entry in self.heap if entry[2].is_active]
+            heapify(self.heap)
+            self.cancelled = 0
+
+    def run_due(self):
+        heap = self.heap
+        if not heap: return
+        now = self.get_now()
+        #Tasks scheduled by the callbacks below wait for the next update, even if they are already due
+        last_scheduled = self.counter
+        deferred = None
+        self.running = True
+        try:
+            #Strictly past due, like Timer.isover
+            while heap and heap[0][0] < now:
+                entry = heappop(heap)
+                task = entry[2]
+                if not task.is_active:
+                    if task.is_cancelled: self.cancelled -= 1
+                    continue
+                if entry[1] > last_scheduled:
+                    if deferred is None: deferred = []
+                    deferred.append(entry)
+                    continue
+                task.queue = None
+                task.execute()
+                if task.is_cancelled: continue
+                task.runs_left -= 1
+                if task.interval is None or task.runs_left == 0:
+                    task.has_finished = True
+                    continue
+                #Fixed rate, but a task that fell behind (after a long frame) runs once and skips the runs it missed
+                task.due += task.interval
+                if task.due < now: task.due = now + task.interval
+                self.push(task)
+        finally:
+            if deferred:
+                for entry in deferred:
+                    heappush(heap, entry)
+            self.running = False
+        self.compact()
+
+
+class NextFrame:
+    '''"await NextFrame()" (or core.next_frame()) continues a coroutine on the next frame.'''
+    def __await__(self):
+        yield self
+
+
+class Wait:
+    '''"await Wait(time)" (or core.wait(seconds, domain)) continues a coroutine once time has passed. time works like in schedule_task.'''
+    __slots__ = ('time',)
+    def __init__(self, time : TimeType) -> None:
+        self.time : TimeType = time
+    
+    def __await__(self):
+        yield self
+
+
+class CoroutineTask:
+    '''Handle of a coroutine run by TaskScheduler.start_coroutine.
+    Other coroutines can wait for it with "result = await task", which raises the coroutine's exception if it failed.
+    cancel() closes the coroutine, running its finally blocks.'''
+    def __init__(self, coroutine : Coroutine) -> None:
+        self.coroutine : Coroutine = coroutine
+        self.result : Any = None
+        self.error : Exception|None = None
+        self.has_finished : bool = False
+        self.is_cancelled : bool = False
+        #Goes up every time the coroutine suspends, so a wake up meant for an earlier await is ignored
+        self.wait_id : int = 0
+        self.pending_task : ScheduledTask|None = None
+        self.finish_callbacks : list[Callable[[], Any]]|None = None
+    
+    @property
+    def is_active(self) -> bool:
+        return not (self.is_cancelled or self.has_finished)
+    
+    def finish(self, result : Any = None):
+        self.result = result
+        self.has_finished = True
+        if self.finish_callbacks: self.run_finish_callbacks()
+    
+    def cancel(self):
+        if not self.is_active: return
+        self.is_cancelled = True
+        if self.pending_task is not None: self.pending_task.cancel()
+        self.coroutine.close()
+        if self.finish_callbacks: self.run_finish_callbacks()
+    
+    def add_finish_callback(self, callback : Callable[[], Any]):
+        '''callback runs once, when the coroutine returns or is cancelled. It runs right away if that already happened.'''
+        if not self.is_active:
+            callback()
+            return
+        if self.finish_callbacks is None: self.finish_callbacks = []
+        self.finish_callbacks.append(callback)
+    
+    def run_finish_callbacks(self):
+        callbacks = self.finish_callbacks
+        self.finish_callbacks = None
+        for callback in callbacks:
+            callback()
+    
+    def __await__(self):
+        if self.is_active: yield self
+        if self.error is not None: raise self.error
+        return self.result
+
+
+class WorkerTask:
+    '''Handle of a call made with TaskScheduler.run_in_worker. on_done / on_error and the finish callbacks run on the main thread,
+    from TaskScheduler.update. Coroutines can wait for it with "result = await task", which raises the call's exception if it failed.'''
+    def __init__(self, fn : Callable, args : tuple, kwargs : dict, on_done : Callable[[Any], Any]|None, on_error : Callable[[BaseException], Any]|None) -> None:
+        self.fn : Callable = fn
+        self.args : tuple = args
+        self.kwargs : dict = kwargs
+        self.on_done : Callable[[Any], Any]|None = on_done
+        self.on_error : Callable[[BaseException], Any]|None = on_error
+        self.future : Future|None = None
+        self.result : Any = None
+        self.error : BaseException|None = None
+        #perf_counter times, for the scheduler's stats
+        self.submitted_at : float = perf_counter()
+        self.started_at : float|None = None
+        self.ended_at : float|None = None
+        self.has_finished : bool = False
+        self.is_cancelled : bool = False
+        self.finish_callbacks : list[Callable[[], Any]]|None = None
+    
+    @property
+    def is_active(self) -> bool:
+        return not (self.is_cancelled or self.has_finished)
+    
+    def run(self) -> Any:
+        '''Runs on the worker thread.'''
+        self.started_at = perf_counter()
+        try:
+            return self.fn(*self.args, **self.kwargs)
+        finally:
+            self.ended_at = perf_counter()
+    
+    def cancel(self) -> bool:
+        '''Drops the task: its callbacks won't run. Returns False if the call had already started; it still runs to the end on its thread.'''
+        if not self.is_active: return True
+        self.is_cancelled = True
+        started = self.future is not None and not self.future.cancel()
+        if self.finish_callbacks: self.run_finish_callbacks()
+        return not started
+    
+    def add_finish_callback(self, callback : Callable[[], Any]):
+        if not self.is_active:
+            callback()
+            return
+        if self.finish_callbacks is None: self.finish_callbacks = []
+        self.finish_callbacks.append(callback)
+    
+    def run_finish_callbacks(self):
+        callbacks = self.finish_callbacks
+        self.finish_callbacks = None
+        for callback in callbacks:
+            callback()
+    
+    def __await__(self):
+        if self.is_active: yield self
+        if self.error is not None: raise self.error
+        return self.result
+
+
+class DeferredTask:
+    '''Low priority work queued with TaskScheduler.defer. A callable runs once; a generator (or a callable returning one)
+    is advanced one step at a time, so long jobs can be split over as many frames as they need.'''
+    __slots__ = ('work', 'args', 'kwargs', 'generator', 'has_finished', 'is_cancelled')
+    def __init__(self, work : Callable|Generator, args : tuple, kwargs : dict) -> None:
+        self.work : Callable|Generator = work
+        self.args : tuple = args
+        self.kwargs : dict = kwargs
+        self.generator : Generator|None = work if isinstance(work, Generator) else None
+        self.has_finished : bool = False
+        self.is_cancelled : bool = False
+    
+    def cancel(self):
+        if self.has_finished or self.is_cancelled: return
+        self.is_cancelled = True
+        if self.generator is not None: self.generator.close()
+    
+    def step(self):
+        '''Runs one step of the work. Sets has_finished once there is nothing left to do.'''
+        if self.generator is None:
+            result = self.work(*self.args, **self.kwargs)
+            if not isinstance(result, Generator):
+                self.has_finished = True
+                return
+            self.generator = result
+        try:
+            next(self.generator)
+        except StopIteration:
+            self.has_finished = True
+        except BaseException:
+            self.has_finished = True
+            raise
+
 
 class TaskScheduler:
-    def __init__(self) -> None:
-        self.scheduled_tasks : dict[Task, Timer] = {}
-        self.continous_tasks : dict[Task, Timer] = {}
-
-    def schedule_task(self, time : float|tuple[float, Callable[[], float], float], callback : Callable, *args, **kwargs):
-        new_task = Task(callback, *args, **kwargs)
-        t = type(time)
-        if t == int or float:
-            self.scheduled_tasks[new_task] = Timer(time)
-        else:
-            self.scheduled_tasks[new_task] = Timer(time[0], time[1], time[2])
+    '''Runs callbacks after a delay. Times are in seconds of the scheduler's time source (the default Timer.time_source,
+    which is the 'real' time domain once Core is set up) or given as (time, time_source, scale_factor) like a Timer.
+    Waiting tasks sit in a heap per time source: scheduling is O(log n) and tasks cost nothing until they are due.'''
+    def __init__(self, time_source : Callable[[], float]|None = None) -> None:
+        self.time_source : Callable[[], float]|None = time_source
+        self.queues : dict[Callable[[], float]|None, TaskQueue] = {}
+        self.continous_tasks : dict[ScheduledTask, Timer] = {}
+        #Coroutines woken up by a Wait or by something they awaited finishing, resumed in the next coroutine pass
+        self.ready : list[CoroutineTask] = []
+        #Coroutines that awaited NextFrame. They move to resume_next_update at the end of every update,
+        #so they skip the update that is in progress (or the next one, if they awaited before it)
+        self.next_frame : list[CoroutineTask] = []
+        self.resume_next_update : list[CoroutineTask] = []
+
+        #Worker pool for run_in_worker, made on first use. Finished calls come back through completed, which update drains
+        self.max_workers : int = min(4, os.cpu_count() or 1)
+        self.use_threads : bool = sys.platform != 'emscripten'
+        self.executor : ThreadPoolExecutor|None = None
+        self.completed : SimpleQueue[WorkerTask] = SimpleQueue()
+        self.worker_tasks : set[WorkerTask] = set()
+        self.worker_latencies : deque[float] = deque(maxlen=100)
+        self.worker_run_times : deque[float] = deque(maxlen=100)
+        self.worker_done_count : int = 0
+        self.worker_error_count : int = 0
+
+        #Work that only runs in the time a frame has left over, see defer and run_deferred
+        self.deferred : deque[DeferredTask] = deque()
+
+    def get_queue(self, time_source : Callable[[], float]|None) -> TaskQueue:
+        queue = self.queues.get(time_source, None)
+        if queue is None:
+            queue = TaskQueue(time_source)
+            self.queues[time_source] = queue
+        return queue
+
+    def unpack_time(self, time : TimeType) -> tuple[float, Callable[[], float]|None, float]:
+        if isinstance(time, (int, float)): return time, self.time_source, 1
+        duration, time_source, scale_factor = time
+        return duration, time_source or self.time_source, scale_factor
+
+    def add(self, time : TimeType, task : ScheduledTask, interval : float|None = None) -> ScheduledTask:
+        duration, time_source, scale_factor = self.unpack_time(time)
+        queue = self.get_queue(time_source)
+        #Same condition as Timer.isover: source time * scale_factor has to move duration past its value now
+        to_source = (lambda seconds : seconds / scale_factor) if scale_factor > 0 else (lambda seconds : float('inf'))
+        task.due = queue.get_now() + to_source(duration)
+        if interval is not None: task.interval = max(to_source(interval), 1e-9)
+        queue.push(task)
+        return task
+
+    def schedule_task(self, time : TimeType, callback : Callable, *args, **kwargs) -> ScheduledTask:
+        '''Runs callback once, after time.'''
+        return self.add(time, ScheduledTask(callback, *args, **kwargs))
+
+    def schedule_repeating_task(self, interval : TimeType, times : int, callback : Callable, *args, **kwargs) -> ScheduledTask:
+        '''Runs callback every interval, times times (forever if times is -1) or until the returned task is cancelled.'''
+        new_task = ScheduledTask(callback, *args, **kwargs)
+        new_task.runs_left = times
+        if times == 0:
+            new_task.has_finished = True
+            return new_task
+        return self.add(interval, new_task, self.unpack_time(interval)[0])
+
+    def schedule_continuous_task(self, time : TimeType, callback : Callable, *args, **kwargs) -> ScheduledTask:
+        '''Runs callback every frame until time has passed.'''
+        new_task = ScheduledTask(callback, *args, **kwargs)
+        duration, time_source, scale_factor = self.unpack_time(time)
+        self.continous_tasks[new_task] = Timer(duration, time_source, scale_factor)
         return new_task
-    
-    def schedule_continuous_task(self, time : float|tuple[float, Callable[[], float], float], callback : Callable, *args, **kwargs):
-        new_task = Task(callback, *args, **kwargs)
-        t = type(time)
-        if (t == int) or (t == float):
-            self.continous_tasks[new_task] = Timer(time)
+
+    def start_coroutine(self, coroutine : Coroutine) -> CoroutineTask:
+        '''Runs coroutine up to its first await right away, then resumes it from update whenever what it awaits is done.
+        It can await NextFrame, Wait, another CoroutineTask, or anything with an add_finish_callback method
+        (TweenTrack, TweenChain, TweenHandle, EngineTween, AnimationTrack).'''
+        task = CoroutineTask(coroutine)
+        self.resume(task)
+        return task
+
+    def wake(self, task : CoroutineTask, wait_id : int):
+        if task.wait_id != wait_id or not task.is_active: return
+        task.pending_task = None
+        self.ready.append(task)
+
+    def resume(self, task : CoroutineTask):
+        if not task.is_active: return
+        try:
+            request = task.coroutine.send(None)
+        except StopIteration as stop:
+            task.finish(stop.value)
+            return
+        except Exception as error:
+            #Reported here unless another coroutine awaits the task, which gets the error instead
+            task.error = error
+            if not task.finish_callbacks:
+                print(f'TaskScheduler: coroutine {task.coroutine.__qualname__} failed')
+                traceback.print_exception(error)
+            task.finish()
+            return
+        except BaseException:
+            task.finish()
+            raise
+        task.wait_id += 1
+        wait_id = task.wait_id
+        if isinstance(request, NextFrame) or request is None:
+            self.next_frame.append(task)
+        elif isinstance(request, Wait):
+            task.pending_task = self.schedule_task(request.time, self.wake, task, wait_id)
+        elif hasattr(request, 'add_finish_callback'):
+            request.add_finish_callback(lambda : self.wake(task, wait_id))
         else:
-            self.continous_tasks[new_task] = Timer(time[0], time[1], time[2])
-        return new_task
-    
+            print(f'TaskScheduler: coroutine {task.coroutine.__qualname__} awaited {request!r}, which the scheduler can\'t wait on. Resuming it next frame')
+            self.next_frame.append(task)
+
+    def update_coroutines(self):
+        if not (self.ready or self.resume_next_update): return
+        resumable = self.resume_next_update + self.ready if self.ready else self.resume_next_update
+        self.ready = []
+        self.resume_next_update = []
+        for index, task in enumerate(resumable):
+            try:
+                self.resume(task)
+            except BaseException:
+                #Only things like KeyboardInterrupt get here. The coroutines that weren't resumed yet wait for the next pass
+                self.ready = resumable[index + 1:] + self.ready
+                raise
+
+    def run_in_worker(self, fn : Callable, *args, on_done : Callable[[Any], Any]|None = None,
+                      on_error : Callable[[BaseException], Any]|None = None, **kwargs) -> WorkerTask:
+        '''Calls fn(*args, **kwargs) on a worker thread, for work that would otherwise stall a frame (generation, pathfinding, saving...).
+        fn must not touch pygame surfaces or the display. on_done(result) or on_error(exception) runs on the main thread
+        at the start of the next update after fn returns. Without threads (the browser build) fn runs right away instead,
+        but the callbacks are still delivered from update.'''
+        task = WorkerTask(fn, args, kwargs, on_done, on_error)
+        self.worker_tasks.add(task)
+        if not self.use_threads:
+            future = Future()
+            try: future.set_result(task.run())
+            except Exception as error: future.set_exception(error)
+            self.on_worker_done(task, future)
+            return task
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='worker')
+        task.future = self.executor.submit(task.run)
+        task.future.add_done_callback(lambda future : self.on_worker_done(task, future))
+        return task
+
+    def on_worker_done(self, task : WorkerTask, future : Future):
+        '''Runs on the worker thread (or on the main thread, for a call cancelled before it started). Only hands the task over to update.'''
+        if not future.cancelled():
+            error = future.exception()
+            if error is None: task.result = future.result()
+            else: task.error = error
+        self.completed.put(task)
+
+    def deliver_worker_results(self):
+        while True:
+            try: task = self.completed.get_nowait()
+            except Empty: return
+            self.worker_tasks.discard(task)
+            if task.is_cancelled: continue
+            task.has_finished = True
+            self.worker_latencies.append(perf_counter() - task.submitted_at)
+            if task.started_at is not None and task.ended_at is not None: self.worker_run_times.append(task.ended_at - task.started_at)
+            if task.error is None:
+                self.worker_done_count += 1
+                if task.on_done: task.on_done(task.result)
+            else:
+                self.worker_error_count += 1
+                if task.on_error: task.on_error(task.error)
+                elif not task.finish_callbacks:
+                    print(f'TaskScheduler: worker call {getattr(task.fn, "__qualname__", task.fn)} failed')
+                    traceback.print_exception(task.error)
+            if task.finish_callbacks: task.run_finish_callbacks()
+
+    def get_worker_stats(self) -> dict[str, int|float]:
+        '''queued: submitted but not started, running: on a worker right now, undelivered: done but waiting for update.
+        Latency is from run_in_worker to the callbacks running, run time is how long fn itself took (both over the last 100 calls).'''
+        queued = running = undelivered = 0
+        for task in self.worker_tasks:
+            if task.is_cancelled: continue
+            if task.started_at is None: queued += 1
+            elif task.ended_at is None: running += 1
+            else: undelivered += 1
+        latencies = self.worker_latencies
+        run_times = self.worker_run_times
+        return {'queued' : queued, 'running' : running, 'undelivered' : undelivered,
+                'done' : self.worker_done_count, 'failed' : self.worker_error_count,
+                'average_latency' : sum(latencies) / len(latencies) if latencies else 0, 'max_latency' : max(latencies, default=0),
+                'average_run_time' : sum(run_times) / len(run_times) if run_times else 0}
+
+    def shutdown(self):
+        '''Stops the worker pool. Calls that have not started are dropped.'''
+        if self.executor is None: return
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+
+    def defer(self, work : Callable|Generator, *args, **kwargs) -> DeferredTask:
+        '''Queues work that is not urgent (warming caches, building masks, pre-rendering text...) to run in the spare time
+        at the end of frames, in the order it was queued. Generators should yield often: a step is never interrupted.'''
+        task = DeferredTask(work, args, kwargs)
+        self.deferred.append(task)
+        return task
+
+    def run_deferred(self, deadline : float):
+        '''Runs deferred work until perf_counter() reaches deadline or the queue is empty.
+        The budget is checked after every step, so the frame runs over by at most one step.
+        A job that raises is reported and dropped, and the jobs after it carry on.'''
+        deferred = self.deferred
+        while deferred and perf_counter() < deadline:
+            task = deferred[0]
+            if task.is_cancelled:
+                deferred.popleft()
+                continue
+            try:
+                task.step()
+            except Exception as error:
+                task.has_finished = True
+                print(f'TaskScheduler: deferred {getattr(task.work, "__qualname__", repr(task.work))} failed')
+                traceback.print_exception(error)
+            finally:
+                if task.has_finished: deferred.popleft()
+
     def update(self):
-        to_remove = []
-        for task in self.scheduled_tasks:
-            if self.scheduled_tasks[task].isover():
-                task.execute()
-                to_remove.append(task)
-        
-        for task in to_remove:
-            self.scheduled_tasks.pop(task)
+        self.deliver_worker_results()
+        for queue in list(self.queues.values()):
+            queue.run_due()
 
-        to_remove.clear()
+        self.update_continuous_tasks()
+        self.update_coroutines()
+        self.resume_next_update.extend(self.next_frame)
+        self.next_frame.clear()
 
-        for task in self.continous_tasks:
+    def update_continuous_tasks(self):
+        if not self.continous_tasks: return
+        to_remove = []
+        for task, timer in list(self.continous_tasks.items()):
+            if task.is_cancelled:
+                to_remove.append(task)
+                continue
             task.execute()
-            if self.continous_tasks[task].isover():
-                to_remove
+            if timer.isover():
+                task.has_finished = True
+                to_remove.append(task)
 
         for task in to_remove:
-            self.continous_tasks.pop(task)
\ No newline at end of file
+            self.continous_tasks.pop(task)
@@ -1,7 +1,7 @@
 import pygame
 from utils.ui.ui_sprite import UiSprite
 from utils.ui.base_ui_elements import BaseUiElements
-from utils.my_timer import Timer
+from utils.my_timer import Timer, TimeDomain
 from typing import Callable
 
 class Ui:
@@ -70,7 +70,7 @@ class Ui:
     
     def add_temp(self, element : UiSprite, time : float|Timer, override = False, time_source : Callable[[], float]|None = None, time_scale : float = 1):
         if element not in self.temp_elements or override == True:
-            timer = time if type(time) == Timer else Timer(time, time_source, time_scale)
+            timer = time if type(time) == Timer else Timer(time, time_source or TimeDomain.get_source('ui'), time_scale)
             self.temp_elements[element] = timer
             self.complete_list.append(element)
     
@@ -42,7 +42,8 @@ class Game:
         self.active = True
         self.state = self.STATES.normal
         self.prev_state = None
-        self.game_timer = Timer(-1)
+        core_object.game_domain.unpause()
+        self.game_timer = core_object.game_domain.make_timer()
         self.game_data = {}
         self.make_connections()
 
@@ -69,7 +70,7 @@ class Game:
     def pause(self):
         if not self.active: return
         if self.state == self.STATES.paused: return 
-        self.game_timer.pause()
+        core_object.game_domain.pause()
         window_size = core_object.main_display.get_size()
         pause_ui1 = BrightnessOverlay(-60, pygame.Rect(0,0, *window_size), 0, 'pause_overlay', zindex=999)
         pause_ui2 = TextSprite(pygame.Vector2(window_size[0] // 2, window_size[1] // 2), 'center', 0, 'Paused', 'pause_text', None, None, 1000,
@@ -82,7 +83,7 @@ class Game:
     def unpause(self):
         if not self.active: return
         if self.state != self.STATES.paused: return
-        self.game_timer.unpause()
+        core_object.game_domain.unpause()
         pause_ui1 = core_object.main_ui.get_sprite('pause_overlay')
         pause_ui2 = core_object.main_ui.get_sprite('pause_text')
         if pause_ui1: core_object.main_ui.remove(pause_ui1)
@@ -105,6 +106,7 @@ class Game:
         self.state = None
         self.prev_state = None
         self.game_timer = None
+        core_object.game_domain.unpause()
         self.game_data.clear()
 
         #Cleanup ingame object
@@ -1,9 +1,13 @@
 import pygame
 from utils.animation import AnimationTrack, Animation
+import utils.tween_module as TweenModule
 from typing import Any
 from utils.helpers import is_sorted
 from utils.pivot_2d import Pivot2D
+from utils.rotation_sheet import RotationSheet
 from inspect import isclass
+from utils.surface_registry import SurfaceRegistry
+from utils.my_timer import TimeDomain
 
 class Sprite:
     '''Base class for all game objects.'''
@@ -12,6 +16,11 @@ class Sprite:
     ordered_sprites : list['Sprite'] = []
     registered_classes : list['Sprite'] = []
     SPRITE_CLICKED : int = pygame.event.custom_type()
+    #Set to a number of headings (16, 32, 64...) to draw rotations from a baked RotationSheet instead of rotating every time
+    rotation_steps : int|None = None
+    #Images (and the colorkey their pivots use) baked into RotationSheets by register_class, so the first rotation doesn't hitch
+    rotation_images : list[pygame.Surface] = []
+    rotation_colorkey : pygame.Color|None = None
 
     def __init__(self) -> None:
         self._position : pygame.Vector2
@@ -96,13 +105,28 @@ class Sprite:
     def angle(self, new_val : float):
         if not hasattr(self, 'pivot'): self.pivot = None
         self.pivot.angle = new_val
-        self.image, self.rect, new_pos = self.pivot.rotate_og_image() if self.pivot.original_image else self.pivot.rotate_image()
+        if self.rotation_steps and self.pivot.original_image:
+            self.image, self.rect, new_pos = self.pivot.rotate_og_image_baked(self.rotation_steps)
+        else:
+            self.image, self.rect, new_pos = self.pivot.rotate_og_image() if self.pivot.original_image else self.pivot.rotate_image()
         self.align_rect()
 
+    def get_rotated_size(self) -> tuple[int, int]:
+        '''Size the angle setter gives the rect, worked out without rotating anything.'''
+        if self.pivot.original_image is None: return self.rect.size
+        return self.pivot.get_rotated_size(self.rotation_steps)
+
     @classmethod
     def register_class(cls, class_to_register : 'Sprite'):
         if class_to_register not in cls.registered_classes:
             cls.registered_classes.append(class_to_register)
+        if class_to_register.rotation_steps: class_to_register.bake_rotations()
+
+    @classmethod
+    def bake_rotations(cls):
+        '''Bakes the RotationSheet of every image in rotation_images ahead of time.'''
+        for image in cls.rotation_images:
+            RotationSheet.get(image, cls.rotation_steps, cls.rotation_colorkey)
     
     @property
     def active(self):
@@ -122,6 +146,8 @@ class Sprite:
 
         if element not in Sprite.inactive_elements:
             Sprite.inactive_elements.append(element)
+        #Tweens left running on a pooled sprite would keep animating it in the background
+        TweenModule.cancel_all(element)
     
     @classmethod
     def unpool(cls, element):
@@ -239,8 +265,9 @@ class Sprite:
         for sprite_subclass in Sprite.registered_classes:
             sprite_subclass.update_class(delta)
     
-    def play_animation(self, animation : Animation, time_scale = 1):
-        track = animation.load(self)
+    def play_animation(self, animation : Animation, time_scale = 1, lazy : bool = False):
+        '''Plays animation on the 'game' time domain, so it stops while the game is paused.'''
+        track = animation.load(self, TimeDomain.get_source('game'), lazy=lazy)
         track.play()
         if time_scale != 1:
             track.set_time_scale(time_scale)
@@ -252,7 +279,17 @@ class Sprite:
             val = self.animation_tracks[name]
             val.update()
     
+    def is_visible(self) -> bool:
+        return self.rect.colliderect(core_object.main_display.get_rect())
+    
+    def catch_up_animations(self):
+        '''Applies the image and rotation changes that lazy animation tracks skipped while the sprite was off screen.
+        Call it before reading the image or mask of a sprite that may be off screen.'''
+        for track in list(AnimationTrack.deferred):
+            if track.target is self: track.catch_up()
+    
     def draw(self, display : pygame.Surface):
+        if SurfaceRegistry.audit_enabled: SurfaceRegistry.audit_blit(self.image, display, self.__class__.__name__)
         display.blit(self.image, self.rect)
     
     @classmethod
@@ -4,6 +4,7 @@ from core.core import core_object
 
 from utils.animation import Animation
 from utils.pivot_2d import Pivot2D
+from utils.surface_registry import SurfaceRegistry
 
 
 class TestPlayer(Sprite):
@@ -14,6 +15,7 @@ class TestPlayer(Sprite):
     #load assets
     test_image : pygame.Surface = pygame.surface.Surface(IMAGE_SIZE)
     pygame.draw.rect(test_image, "Red", (0,0, *IMAGE_SIZE))
+    test_image = SurfaceRegistry.prepare(test_image)
 
     colors : list[str] = ["Red", "Green", "Blue", "Yellow", "Orange", "Purple", "Black", "White"]
     surface_list : list[pygame.Surface] = []
@@ -21,6 +23,7 @@ class TestPlayer(Sprite):
     for color in colors:
         image : pygame.Surface = pygame.surface.Surface(IMAGE_SIZE)
         pygame.draw.rect(image, color, (0,0, *IMAGE_SIZE))
+        image = SurfaceRegistry.prepare(image)
         surfaces[color] = image
         surface_list.append(image)
 
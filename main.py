@@ -16,6 +16,8 @@ from core.core import Core, core_object
 
 core = core_object
 core.init(window)
+#SDL drops event types nothing is bound to
+core.event_manager.enable_event_filter()
 core.FPS = 120
 if core.is_web(): core.setup_web(1)
 
@@ -133,6 +135,7 @@ async def main():
             
         pygame.display.update()
         core.frame_counter += 1
+        core.run_deferred_work()
         clock.tick(core.FPS)
         await asyncio.sleep(0)
 
@@ -0,0 +1,29 @@
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+#Fonts and images are loaded with paths relative to the project root
+os.chdir(ROOT)
+
+import pygame
+import pytest
+
+pygame.init()
+pygame.display.set_mode((960, 540))
+
+
+class FakeClock:
+    '''Time source that only moves when a test sets t.'''
+    def __init__(self) -> None:
+        self.t : float = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
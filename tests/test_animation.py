@@ -0,0 +1,520 @@
+import pygame
+import pytest
+from game.sprite import Sprite
+from utils.animation import Animation, AnimationTrack, AnimationBatch, FrameSequence, FramePlayer, _sprite_hint
+from utils.pivot_2d import Pivot2D
+
+Sprite._core_hint()
+_sprite_hint()
+
+
+class Box(Sprite):
+    active_elements : list['Box'] = []
+    inactive_elements : list['Box'] = []
+    def __init__(self, pos : tuple[float, float] = (100, 100), size : tuple[int, int] = (10, 20), pivot : bool = False) -> None:
+        super().__init__()
+        self.image = pygame.Surface(size)
+        self.rect = self.image.get_rect()
+        self._position = pygame.Vector2(pos)
+        self.zindex = 0
+        self.animation_tracks = {}
+        if pivot: self.pivot = Pivot2D(self._position, self.image)
+        self.on_screen : bool = True
+        self.align_rect()
+        Box.unpool(self)
+    
+    def is_visible(self) -> bool:
+        return self.on_screen
+
+
+@pytest.fixture(autouse=True)
+def clean_tracks():
+    yield
+    AnimationBatch.enable(False)
+    AnimationTrack.elements.clear()
+    AnimationTrack.sleeping.clear()
+    AnimationTrack.deferred.clear()
+    Box.pool_elements()
+
+
+def run_frames(clock, start : int, end : int):
+    for frame in range(start, end):
+        clock.t = frame / 60
+        AnimationTrack.update_all_elements()
+
+
+def get_state(box : Box) -> tuple:
+    angle = round(box.pivot.angle, 6) if box.pivot else None
+    return (round(box.position.x, 6), round(box.position.y, 6), tuple(box.rect), angle)
+
+
+BATCHED_ANIMATIONS = {
+    'slide_by' : [{"type" : "slide_by", "offset" : [100, 50], "time" : 1, "easing_style" : "smoothstep"}],
+    'slide_to' : [{"type" : "slide_to", "target" : [300, 200], "anchor" : "topleft", "time" : 0.75, "easing_style" : "quad_ease_in"}],
+    'slide_to_side' : [{"type" : "slide_to", "target" : 400, "anchor" : "left", "time" : 0.5, "easing_style" : "quad_ease_out"}],
+    'rotate_by' : [{"type" : "rotate_by_over_time", "angle" : 270, "time" : 1, "easing_style" : "smoothstep"}],
+    'rotate_to' : [{"type" : "rotate_to_over_time", "angle" : -45, "time" : 0.5, "easing_style" : "linear"}],
+}
+
+@pytest.mark.parametrize('name', BATCHED_ANIMATIONS)
+def test_batched_instruction_matches_unbatched(clock, name):
+    animation = Animation(BATCHED_ANIMATIONS[name], name)
+    results = []
+    for batched in (False, True):
+        assert AnimationBatch.enable(batched)
+        clock.t = 0
+        boxes = [Box((50 + 40 * i, 80 + 10 * i), pivot = name.startswith('rotate')) for i in range(3)]
+        for box in boxes: animation.load(box, clock).play()
+        states = []
+        for frame in range(1, 75):
+            run_frames(clock, frame, frame + 1)
+            states.append([get_state(box) for box in boxes])
+        results.append(states)
+        AnimationTrack.elements.clear()
+    assert results[0] == results[1]
+
+
+def test_batched_writes_wait_for_flush(clock):
+    animation = Animation(BATCHED_ANIMATIONS['slide_by'], 'slide_by')
+    AnimationBatch.enable(True)
+    box = Box((100, 100))
+    track = animation.load(box, clock)
+    track.play(update_manually = True)
+    clock.t = 0.5
+    track.update()
+    assert box.position == pygame.Vector2(100, 100)
+    AnimationBatch.flush()
+    assert box.position == pygame.Vector2(150, 125)
+
+
+def test_disabling_flushes_queued_writes(clock):
+    animation = Animation(BATCHED_ANIMATIONS['slide_by'], 'slide_by')
+    AnimationBatch.enable(True)
+    box = Box((100, 100))
+    track = animation.load(box, clock)
+    track.play(update_manually = True)
+    clock.t = 2
+    track.update()
+    AnimationBatch.enable(False)
+    assert box.position == pygame.Vector2(200, 150)
+    assert track.has_ended
+
+
+def test_culled_rotation_waits_until_visible(clock):
+    animation = Animation([{"type" : "rotate_by_over_time", "angle" : 90, "time" : 1, "easing_style" : "linear"}], 'spin')
+    eager = Box((300, 300), pivot = True)
+    lazy = Box((300, 300), pivot = True)
+    lazy.on_screen = False
+    animation.load(eager, clock).play()
+    animation.load(lazy, clock, lazy = True).play()
+    original_image = lazy.image
+    run_frames(clock, 1, 31)
+    assert lazy.image is original_image
+    assert lazy.pivot.angle == eager.pivot.angle
+    lazy.on_screen = True
+    run_frames(clock, 31, 32)
+    assert lazy.image is not original_image
+    assert lazy.image.get_size() == eager.image.get_size()
+    assert get_state(lazy) == get_state(eager)
+
+
+def test_catch_up_applies_deferred_image_swap(clock):
+    images = {'big' : pygame.Surface((30, 30))}
+    animation = Animation([{"type" : "wait", "time" : 0.01}, {"type" : "switch_image", "source" : "images", "index" : "big", 'dynamic_anchor' : None, 'colorkey' : None}], 'swap')
+    box = Box((200, 200))
+    box.images = images
+    box.on_screen = False
+    track = animation.load(box, clock, lazy = True)
+    track.play()
+    run_frames(clock, 1, 3)
+    assert box.image is not images['big']
+    assert box.rect.size == (30, 30)
+    box.catch_up_animations()
+    assert box.image is images['big']
+    assert box.rect.center == (200, 200)
+
+
+SEEK_ANIMATION = [
+    {"type" : "wait", "time" : 0.5},
+    {"type" : "move_by", "offset" : [20, -10]},
+    {"type" : "slide_by", "offset" : [120, 60], "time" : 1, "easing_style" : "smoothstep"},
+    {"type" : "delay_rel", "index" : -1},
+    {"type" : "switch_image", "source" : "images", "index" : "big", 'dynamic_anchor' : None, 'colorkey' : None},
+    {"type" : "rotate_by_over_time", "angle" : 180, "time" : 1, "easing_style" : "linear"},
+]
+
+def get_seek_state(box : Box) -> tuple:
+    return (round(box.position.x, 3), round(box.position.y, 3), tuple(box.rect), round(box.pivot.angle, 3), box.pivot.original_image.get_size())
+
+
+def test_seek_matches_live_playthrough(clock):
+    animation = Animation(SEEK_ANIMATION, 'seek')
+    box = Box((100, 100), pivot = True)
+    box.images = {'big' : pygame.Surface((30, 16))}
+    track = animation.load(box, clock)
+    track.enable_seeking()
+    track.play(update_manually = True)
+    live = {}
+    for frame in range(1, 180):
+        clock.t = frame / 60
+        track.update()
+        live[frame] = get_seek_state(box)
+    assert track.has_ended
+    #Seeking only depends on the track's own clock, not on where the time source is
+    clock.t = 50
+    for frame in (150, 10, 90, 31, 179, 1, 60, 100):
+        track.seek(frame / 60)
+        assert get_seek_state(box) == live[frame], frame
+
+
+def test_seek_needs_enable_seeking(clock, capsys):
+    animation = Animation(SEEK_ANIMATION, 'seek')
+    box = Box((100, 100), pivot = True)
+    track = animation.load(box, clock)
+    track.play(update_manually = True)
+    track.seek(1)
+    assert 'enable_seeking' in capsys.readouterr().out
+    assert box.position == pygame.Vector2(100, 100)
+
+
+MIXED_ANIMATION = [
+    {"type" : "slide_by", "offset" : [120, 45], "time" : 1, "easing_style" : "smoothstep"},
+    {"type" : "rotate_by_over_time", "angle" : 135, "time" : 0.8, "easing_style" : "quad_ease_in"},
+    {"type" : "wait", "time" : 0.3},
+    {"type" : "move_by", "offset" : [3, -7]},
+    {"type" : "slide_to", "target" : 333, "anchor" : "left", "time" : 0.4, "easing_style" : "linear"},
+    {"type" : "wait", "time" : 0.2},
+    {"type" : "switch_image", "source" : "images", "index" : "big", 'dynamic_anchor' : "topleft", 'colorkey' : None},
+    {"type" : "rotate_to", "angle" : 10},
+]
+
+def test_batch_matches_unbatched_with_other_instructions_on_the_target(clock):
+    animation = Animation(MIXED_ANIMATION, 'mixed')
+    results = []
+    for batched in (False, True):
+        assert AnimationBatch.enable(batched)
+        clock.t = 0
+        box = Box((100.3, 100.6), pivot = True)
+        box.images = {'big' : pygame.Surface((13, 31))}
+        box.pivot.pivot_offset = pygame.Vector2(0, 9)
+        animation.load(box, clock).play()
+        #A second track driving the same target interleaves its writes with the first one
+        Animation(BATCHED_ANIMATIONS['slide_to'], 'slide_to').load(box, clock).play()
+        states = []
+        for frame in range(1, 90):
+            run_frames(clock, frame, frame + 1)
+            states.append(get_state(box))
+        results.append(states)
+        AnimationTrack.elements.clear()
+        Box.pool_elements()
+    assert results[0] == results[1]
+
+
+def test_batched_seek_matches_unbatched_seek(clock):
+    animation = Animation(SEEK_ANIMATION, 'seek')
+    results = []
+    for batched in (False, True):
+        assert AnimationBatch.enable(batched)
+        clock.t = 0
+        box = Box((100, 100), pivot = True)
+        box.images = {'big' : pygame.Surface((30, 16))}
+        track = animation.load(box, clock)
+        track.enable_seeking()
+        track.play(update_manually = True)
+        #Seeking past what has been played steps the track several times before the batch is flushed
+        track.seek(70 / 60)
+        results.append(get_seek_state(box))
+        track.seek(40 / 60)
+        results.append(get_seek_state(box))
+    assert results[:2] == results[2:]
+
+
+@pytest.mark.parametrize('swap', [
+    {"type" : "switch_image", "source" : "images", "index" : "big", 'dynamic_anchor' : "topleft", 'colorkey' : None},
+    {"type" : "image_gradient", "source" : "image_list", "target_index" : 2, "time" : 0.3, "easing_style" : "linear",
+     'dynamic_anchor' : "bottomright", 'colorkey' : None},
+])
+def test_culled_anchored_swap_of_a_rotated_sprite_matches_visible(clock, swap):
+    animation = Animation([
+        {"type" : "rotate_by_over_time", "angle" : 37, "time" : 0.2, "easing_style" : "linear"},
+        {"type" : "wait", "time" : 0.25},
+        swap,
+        {"type" : "slide_by", "offset" : [40, -20], "time" : 0.5, "easing_style" : "smoothstep"},
+        {"type" : "rotate_by_over_time", "angle" : 50, "time" : 0.5, "easing_style" : "linear"},
+    ], 'rotated_swap')
+    boxes = []
+    for lazy in (False, True):
+        box = Box((352.4, 245.8), pivot = True)
+        box.pivot.pivot_offset = pygame.Vector2(3, 11)
+        box.images = {'big' : pygame.Surface((26, 14))}
+        box.image_list = [pygame.Surface((10, 20)), pygame.Surface((18, 24)), pygame.Surface((30, 12))]
+        box.on_screen = not lazy
+        animation.load(box, clock, lazy = lazy).play()
+        boxes.append(box)
+    eager, lazy = boxes
+    for frame in range(1, 60):
+        run_frames(clock, frame, frame + 1)
+        assert lazy.rect == eager.rect, frame
+        assert lazy.position == eager.position, frame
+    lazy.catch_up_animations()
+    assert get_state(lazy) == get_state(eager)
+    assert lazy.image.get_size() == eager.image.get_size()
+
+
+FRAME_COLORS = ['red', 'green', 'blue', 'white']
+
+def make_sequence(fps : float = 10) -> FrameSequence:
+    sheet = pygame.Surface((40, 10))
+    for i, color in enumerate(FRAME_COLORS):
+        sheet.fill(color, (i * 10, 0, 10, 10))
+    return FrameSequence.from_grid(sheet, (10, 10), fps)
+
+
+def play_frames(clock, player : FramePlayer, times : list[float]) -> list[int]:
+    indexes = []
+    for t in times:
+        clock.t = t
+        player.update()
+        indexes.append(player.index)
+    return indexes
+
+
+def test_frame_sequence_shows_each_frame_for_one_over_fps(clock):
+    sequence = make_sequence()
+    assert sequence.count == 4 and sequence.frames[2].get_parent() is sequence.sheet
+    box = Box((100, 100), (10, 10))
+    player = FramePlayer(box, sequence, False, clock)
+    assert play_frames(clock, player, [0, 0.05, 0.15, 0.25, 0.35]) == [0, 0, 1, 2, 3]
+    assert box.image is sequence.frames[3]
+    assert not player.has_ended
+    assert play_frames(clock, player, [0.45, 1]) == [3, 3]
+    assert player.has_ended
+
+
+def test_looping_sequence_wraps_around(clock):
+    player = FramePlayer(Box((100, 100), (10, 10)), make_sequence(), True, clock)
+    assert play_frames(clock, player, [(i + 0.5) / 10 for i in range(9)]) == [0, 1, 2, 3, 0, 1, 2, 3, 0]
+    assert not player.has_ended
+
+
+def test_ping_pong_plays_back_without_repeating_the_ends(clock):
+    times = [(i + 0.5) / 10 for i in range(9)]
+    looping = FramePlayer(Box((100, 100), (10, 10)), make_sequence(), True, clock, ping_pong = True)
+    assert play_frames(clock, looping, times) == [0, 1, 2, 3, 2, 1, 0, 1, 2]
+    clock.t = 0
+    once = FramePlayer(Box((100, 100), (10, 10)), make_sequence(), False, clock, ping_pong = True)
+    assert play_frames(clock, once, times[:7]) == [0, 1, 2, 3, 2, 1, 0]
+    assert not once.has_ended
+    assert play_frames(clock, once, [0.75]) == [0] and once.has_ended
+
+
+def test_frame_player_finish_callbacks_run_once_at_the_end(clock):
+    calls = []
+    player = FramePlayer(Box((100, 100), (10, 10)), make_sequence(), False, clock)
+    player.add_finish_callback(lambda : calls.append(clock.t))
+    play_frames(clock, player, [0.1, 0.3, 0.5, 0.7])
+    assert calls == [0.5]
+    player.add_finish_callback(lambda : calls.append('late'))
+    assert calls == [0.5, 'late']
+
+
+def test_frame_sequence_instruction_ends_the_track(clock):
+    animation = Animation([{"type" : "frame_sequence", "source" : "flipbook", "loop" : False, "ping_pong" : True, "time" : None}], 'flipbook')
+    box = Box((100, 100), (10, 10))
+    box.flipbook = make_sequence()
+    track = animation.load(box, clock)
+    ended = []
+    track.add_finish_callback(lambda : ended.append(clock.t))
+    track.play()
+    run_frames(clock, 1, 60)
+    assert ended and 0.7 <= ended[0] < 0.75
+    assert box.image is box.flipbook.frames[0]
+
+
+def test_frames_of_different_sizes_resize_the_rect_around_the_position(clock):
+    sheet = pygame.Surface((30, 20))
+    sequence = FrameSequence(sheet, [(0, 0, 10, 10), (10, 0, 20, 20)], 10)
+    assert not sequence.uniform_size
+    box = Box((100, 100), (10, 10))
+    player = FramePlayer(box, sequence, True, clock)
+    play_frames(clock, player, [0.15])
+    assert box.rect.size == (20, 20) and box.rect.center == (100, 100)
+
+
+BLOCKING_ANIMATION = [
+    {"type" : "move_by", "offset" : [10, 0]},
+    {"type" : "slide_by", "offset" : [60, 30], "time" : 0.5, "easing_style" : "linear"},
+    {"type" : "wait", "time" : 0.25},
+    {"type" : "slide_by", "offset" : [-20, 40], "time" : 0.4, "easing_style" : "linear"},
+    {"type" : "delay_rel", "index" : -1},
+    {"type" : "move_by", "offset" : [0, -15]},
+    {"type" : "delay", "index" : [1, 3]},
+    {"type" : "wait", "time" : 0.1},
+    {"type" : "move_by", "offset" : [5, 5]},
+]
+
+class ReferenceTrack:
+    '''Straightforward interpreter of the animation data above, with its state in plain dicts and nothing compiled or shared.
+    Follows the track's rules: instructions start from the cursor until one blocks, then the blocking ones run, then the others.'''
+    def __init__(self, data : list[dict], position : tuple[float, float], start : float) -> None:
+        self.data : list[dict] = data
+        self.position : pygame.Vector2 = pygame.Vector2(position)
+        self.start_times : dict[int, float] = {}
+        self.last_offsets : dict[int, pygame.Vector2] = {}
+        self.ended : set[int] = set()
+        self.blocking : list[int] = []
+        self.tasks : list[int] = []
+        self.cursor : int = 0
+        self.start_pending(start)
+
+    def start_pending(self, t : float):
+        while self.cursor < len(self.data) and not self.blocking:
+            index = self.cursor
+            self.cursor += 1
+            data = self.data[index]
+            if data['type'] == 'move_by':
+                self.position += data['offset']
+                self.ended.add(index)
+                continue
+            self.start_times[index] = t
+            if data['type'] == 'slide_by':
+                self.last_offsets[index] = pygame.Vector2(0, 0)
+                self.tasks.append(index)
+            else:
+                self.blocking.append(index)
+
+    def step(self, index : int, t : float):
+        data = self.data[index]
+        elapsed = t - self.start_times[index]
+        if data['type'] == 'wait':
+            if elapsed > data['time']: self.ended.add(index)
+        elif data['type'] == 'delay':
+            if all(other in self.ended for other in data['index']): self.ended.add(index)
+        elif data['type'] == 'delay_rel':
+            if index + data['index'] in self.ended: self.ended.add(index)
+        else:
+            alpha = elapsed / data['time']
+            if alpha > 1:
+                alpha = 1
+                self.ended.add(index)
+            offset = pygame.Vector2(data['offset']) * alpha
+            self.position += offset - self.last_offsets[index]
+            self.last_offsets[index] = offset
+
+    def update(self, t : float):
+        self.start_pending(t)
+        for group in (self.blocking, self.tasks):
+            for index in list(group):
+                self.step(index, t)
+            group[:] = [index for index in group if index not in self.ended]
+
+
+def test_shared_program_matches_a_reference_interpreter_step_by_step(clock):
+    animation = Animation(BLOCKING_ANIMATION, 'blocking')
+    starts = {0 : (100, 100), 12 : (300, 50), 31 : (20, 400)}
+    boxes : dict[int, Box] = {}
+    references : dict[int, ReferenceTrack] = {}
+    for frame in range(0, 120):
+        clock.t = frame / 60
+        if frame in starts:
+            boxes[frame] = Box(starts[frame])
+            track = animation.load(boxes[frame], clock)
+            track.play()
+            assert track.program is animation.program
+            references[frame] = ReferenceTrack(BLOCKING_ANIMATION, starts[frame], clock.t)
+        if frame:
+            AnimationTrack.update_all_elements()
+            for reference in references.values():
+                reference.update(clock.t)
+        for start, box in boxes.items():
+            expected = references[start].position
+            assert (round(box.position.x, 6), round(box.position.y, 6)) == (round(expected.x, 6), round(expected.y, 6)), (start, frame)
+    for start, box in boxes.items():
+        assert box.position == pygame.Vector2(starts[start]) + (55, 60)
+
+
+def test_deleting_an_instruction_only_changes_that_track(clock):
+    animation = Animation(BLOCKING_ANIMATION, 'blocking')
+    edited_box, other_box = Box((100, 100)), Box((100, 100))
+    edited = animation.load(edited_box, clock)
+    other = animation.load(other_box, clock)
+    del edited[8]
+    assert other.program is animation.program and edited.program is not animation.program
+    assert edited.count == len(BLOCKING_ANIMATION) - 1 and other.count == len(BLOCKING_ANIMATION)
+    edited.play()
+    other.play()
+    run_frames(clock, 1, 120)
+    assert edited.has_ended and other.has_ended
+    assert other_box.position - edited_box.position == pygame.Vector2(5, 5)
+
+
+def waiting_animation(time : float) -> Animation:
+    return Animation([{"type" : "wait", "time" : time}, {"type" : "move_by", "offset" : [1, 0]}], f'wait_{time}')
+
+
+def test_sleeping_tracks_wake_in_wake_time_order(clock):
+    boxes = {time : Box((0, 0)) for time in (0.5, 0.2, 0.35)}
+    woken = []
+    for time, box in boxes.items():
+        track = waiting_animation(time).load(box, clock)
+        track.add_finish_callback(lambda time = time : woken.append(time))
+        track.play()
+    run_frames(clock, 1, 3)
+    assert not AnimationTrack.elements
+    assert sorted(entry[0] for entry in AnimationTrack.sleeping[clock]) == pytest.approx([0.2, 0.35, 0.5])
+    run_frames(clock, 3, 60)
+    assert woken == [0.2, 0.35, 0.5]
+    assert all(box.position.x == 1 for box in boxes.values())
+    assert not AnimationTrack.elements and not AnimationTrack.sleeping[clock]
+
+
+def test_track_added_while_others_sleep_runs_every_frame(clock):
+    sleeper = Box((0, 0))
+    waiting_animation(0.5).load(sleeper, clock).play()
+    run_frames(clock, 1, 5)
+    slider = Box((0, 0))
+    Animation(BATCHED_ANIMATIONS['slide_by'], 'slide_by').load(slider, clock).play()
+    positions = []
+    for frame in range(5, 20):
+        run_frames(clock, frame, frame + 1)
+        positions.append(slider.position.x)
+        assert [track.target for track in AnimationTrack.elements] == [slider]
+    assert positions == sorted(positions) and len(set(positions)) == len(positions)
+    run_frames(clock, 20, 40)
+    assert sleeper.position.x == 1
+
+
+def test_stopped_sleeping_track_never_wakes(clock):
+    box = Box((0, 0))
+    track = waiting_animation(0.2).load(box, clock)
+    track.play()
+    run_frames(clock, 1, 3)
+    assert not AnimationTrack.elements
+    track.stop()
+    run_frames(clock, 3, 40)
+    assert box.position.x == 0 and not AnimationTrack.elements
+
+
+def test_replaying_a_sleeping_track_drops_its_old_wake_up(clock):
+    box = Box((0, 0))
+    track = waiting_animation(0.2).load(box, clock)
+    track.play()
+    run_frames(clock, 1, 6)
+    track.reset()
+    track.play()
+    run_frames(clock, 6, 17)
+    #The first play would have woken the track here; only the replay's wake up counts
+    assert box.position.x == 0 and track not in AnimationTrack.elements
+    run_frames(clock, 17, 40)
+    assert box.position.x == 1 and track.has_ended
+
+
+def test_track_of_a_pooled_target_stops_when_it_wakes(clock):
+    box = Box((0, 0))
+    track = waiting_animation(0.2).load(box, clock)
+    track.play()
+    run_frames(clock, 1, 3)
+    Box.pool(box)
+    run_frames(clock, 3, 40)
+    assert track.has_ended and box.position.x == 0
+    assert not AnimationTrack.elements
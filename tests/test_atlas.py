@@ -0,0 +1,61 @@
+import pygame
+import pytest
+from utils.atlas import pack_directory, TextureAtlas
+
+
+@pytest.fixture(autouse=True)
+def clean_atlases():
+    yield
+    TextureAtlas.atlases.clear()
+
+
+@pytest.fixture
+def packed(tmp_path) -> str:
+    colors = {'red' : ((30, 20), 'red'), 'blue' : ((12, 40), 'blue'), 'keyed' : ((16, 16), (0, 255, 0))}
+    for name, (size, color) in colors.items():
+        image = pygame.Surface(size)
+        image.fill(color)
+        if name == 'keyed': image.fill('white', (4, 4, 8, 8))
+        pygame.image.save(image, str(tmp_path / f'{name}.png'))
+    (tmp_path / 'notes.txt').write_text('not an image')
+    return str(tmp_path / 'sheet')
+
+
+def test_pack_places_every_image_without_overlap(packed, tmp_path):
+    index = pack_directory(str(tmp_path), packed, max_width = 40)
+    assert sorted(index) == ['blue', 'keyed', 'red']
+    rects = [pygame.Rect(rect) for rect in index.values()]
+    assert pygame.Rect(index['red']).size == (30, 20) and pygame.Rect(index['blue']).size == (12, 40)
+    for i, rect in enumerate(rects):
+        assert rect.collidelist(rects[:i] + rects[i + 1:]) == -1
+        assert rect.right <= 40
+
+
+def test_views_are_cached_subsurfaces_of_the_sheet(packed, tmp_path):
+    pack_directory(str(tmp_path), packed)
+    atlas = TextureAtlas.load(packed)
+    assert TextureAtlas.load(packed) is atlas
+    assert 'red' in atlas and 'notes' not in atlas
+    red = atlas.get('red')
+    assert red is atlas.get('red')
+    assert red.get_parent() is atlas.sheet
+    assert red.get_size() == (30, 20)
+    assert red.get_at((5, 5))[:3] == (255, 0, 0)
+    assert atlas.get('blue').get_at((0, 39))[:3] == (0, 0, 255)
+
+
+def test_colorkeyed_view_gets_the_rle_fast_path(packed, tmp_path):
+    pack_directory(str(tmp_path), packed)
+    atlas = TextureAtlas.load(packed)
+    keyed = atlas.get('keyed', (0, 255, 0))
+    assert keyed is atlas.get('keyed', (0, 255, 0))
+    assert keyed.get_colorkey() == pygame.Color(0, 255, 0)
+    assert keyed.get_flags() & pygame.RLEACCELOK
+    assert not keyed.get_flags() & pygame.SRCALPHA
+    target = pygame.Surface((16, 16))
+    target.fill('black')
+    target.blit(keyed, (0, 0))
+    assert target.get_at((0, 0))[:3] == (0, 0, 0)
+    assert target.get_at((8, 8))[:3] == (255, 255, 255)
+    #The plain view of the same image is untouched
+    assert atlas.get('keyed').get_colorkey() is None
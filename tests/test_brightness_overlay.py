@@ -0,0 +1,23 @@
+import pygame
+from utils.ui.brightness_overlay import BrightnessOverlay
+
+
+def test_render_reuses_the_display_format_surface():
+    overlay = BrightnessOverlay(-60, pygame.Rect(0, 0, 40, 30), 0)
+    surf = overlay.surf
+    assert surf.get_bitsize() == pygame.display.get_surface().get_bitsize()
+    overlay.brightness = 40
+    assert overlay.surf is surf
+    assert overlay.surf.get_at((0, 0))[:3] == (40, 40, 40)
+    overlay.opacity = 0.5
+    overlay.opacity = 1
+    overlay._render()
+    assert overlay.surf is surf and overlay.surf.get_alpha() in (None, 255)
+
+
+def test_resize_remakes_the_surface():
+    overlay = BrightnessOverlay(30, pygame.Rect(0, 0, 40, 30), 0)
+    surf = overlay.surf
+    overlay.rect.size = (50, 20)
+    overlay._render()
+    assert overlay.surf is not surf and overlay.surf.get_size() == (50, 20)
@@ -0,0 +1,170 @@
+import gc
+import pygame
+import pytest
+from core.event_manger import EventManger
+
+EVENT_TYPE = pygame.event.custom_type()
+
+
+@pytest.fixture
+def manager() -> EventManger:
+    return EventManger()
+
+
+def fire(manager : EventManger, event_type : int = EVENT_TYPE):
+    manager.process_event(pygame.Event(event_type, {}))
+
+
+def test_higher_priority_runs_first(manager):
+    log = []
+    manager.connect(EVENT_TYPE, lambda event : log.append('low'), priority = -1)
+    manager.connect(EVENT_TYPE, lambda event : log.append('first'))
+    manager.connect(EVENT_TYPE, lambda event : log.append('high'), priority = 5)
+    manager.connect(EVENT_TYPE, lambda event : log.append('second'))
+    fire(manager)
+    assert log == ['high', 'first', 'second', 'low']
+
+
+def test_stop_skips_the_remaining_actions(manager):
+    log = []
+    manager.connect(EVENT_TYPE, lambda event : log.append('after'))
+    manager.connect(EVENT_TYPE, lambda event : EventManger.STOP, priority = 1)
+    fire(manager)
+    assert log == []
+
+
+def test_binding_handle_unbinds(manager):
+    log = []
+    binding = manager.connect(EVENT_TYPE, log.append)
+    fire(manager)
+    binding.unbind()
+    binding.unbind()
+    fire(manager)
+    assert len(log) == 1
+    assert EVENT_TYPE not in manager.bindings or not manager.bindings[EVENT_TYPE]
+
+
+def test_actions_can_unbind_while_the_event_is_dispatched(manager):
+    log = []
+    def once(event):
+        log.append('once')
+        once_binding.unbind()
+        other_binding.unbind()
+    once_binding = manager.connect(EVENT_TYPE, once, priority = 1)
+    other_binding = manager.connect(EVENT_TYPE, lambda event : log.append('other'))
+    fire(manager)
+    fire(manager)
+    assert log == ['once', 'other']
+
+
+def test_duplicates_are_ignored_unless_asked_for(manager):
+    log = []
+    assert manager.connect(EVENT_TYPE, log.append) is manager.connect(EVENT_TYPE, log.append)
+    fire(manager)
+    assert len(log) == 1
+    manager.connect(EVENT_TYPE, log.append, duplicate = True)
+    fire(manager)
+    assert len(log) == 3
+
+
+def test_weak_binding_goes_away_with_its_object(manager):
+    class Listener:
+        calls = 0
+        def on_event(self, event):
+            Listener.calls += 1
+    listener = Listener()
+    binding = manager.connect(EVENT_TYPE, listener.on_event, weak = True)
+    fire(manager)
+    del listener
+    gc.collect()
+    fire(manager)
+    assert Listener.calls == 1
+    assert not binding.is_bound
+
+
+def test_bind_and_unbind_keep_their_old_behaviour(manager):
+    log = []
+    first = lambda event : log.append('first')
+    second = lambda event : log.append('second')
+    assert manager.bind(EVENT_TYPE, [first, second])
+    fire(manager)
+    assert manager.unbind(EVENT_TYPE, first)
+    fire(manager)
+    assert log == ['first', 'second', 'second']
+    assert manager.unbind_all(EVENT_TYPE)
+    assert not manager.unbind(EVENT_TYPE, second)
+    assert not manager.bind(pygame.QUIT, first)
+
+
+def test_quit_action_can_be_replaced(manager):
+    log = []
+    manager.set_quit_action(lambda event : log.append('quit'))
+    fire(manager, pygame.QUIT)
+    assert log == ['quit']
+    assert manager.connect(pygame.QUIT, log.append) is None
+
+
+@pytest.fixture
+def filtered(manager : EventManger):
+    manager.enable_event_filter()
+    yield manager
+    manager.disable_event_filter()
+
+
+def test_filter_blocks_only_unbound_types(filtered):
+    assert pygame.event.get_blocked(pygame.MOUSEMOTION)
+    assert not pygame.event.get_blocked(pygame.QUIT)
+    assert not pygame.event.get_blocked(EVENT_TYPE)
+
+
+def test_filter_follows_bindings(filtered):
+    binding = filtered.connect(pygame.MOUSEMOTION, lambda event : None)
+    assert not pygame.event.get_blocked(pygame.MOUSEMOTION)
+    binding.unbind()
+    assert pygame.event.get_blocked(pygame.MOUSEMOTION)
+
+
+def test_disabling_the_filter_allows_everything(filtered):
+    filtered.disable_event_filter()
+    assert not pygame.event.get_blocked(pygame.MOUSEMOTION)
+    filtered.connect(pygame.KEYDOWN, lambda event : None).unbind()
+    assert not pygame.event.get_blocked(pygame.KEYDOWN)
+
+
+def test_bound_actions_lists_the_actions_in_dispatch_order(manager):
+    first = lambda event : None
+    second = lambda event : None
+    manager.connect(EVENT_TYPE, second)
+    manager.connect(EVENT_TYPE, first, priority = 1)
+    assert manager.bound_actions[EVENT_TYPE] == (first, second)
+    assert EVENT_TYPE in manager.bound_actions and pygame.QUIT in manager.bound_actions
+    assert pygame.KEYDOWN not in manager.bound_actions
+
+
+def test_assigning_bound_actions_rebinds_the_event_type(manager):
+    log = []
+    manager.connect(EVENT_TYPE, lambda event : log.append('old'))
+    manager.bound_actions[EVENT_TYPE] = [lambda event : log.append('new'), log.append]
+    fire(manager)
+    assert log[0] == 'new' and len(log) == 2
+    del manager.bound_actions[EVENT_TYPE]
+    fire(manager)
+    assert len(log) == 2
+    assert EVENT_TYPE not in manager.bound_actions
+    with pytest.raises(KeyError):
+        del manager.bound_actions[EVENT_TYPE]
+
+
+def test_assigning_bound_actions_keeps_the_filter_in_sync(filtered):
+    filtered.bound_actions[pygame.MOUSEMOTION] = [lambda event : None]
+    assert not pygame.event.get_blocked(pygame.MOUSEMOTION)
+    filtered.bound_actions[pygame.MOUSEMOTION] = []
+    assert pygame.event.get_blocked(pygame.MOUSEMOTION)
+
+
+def test_bound_actions_can_replace_the_quit_actions(manager):
+    log = []
+    manager.bound_actions[pygame.QUIT] = [log.append]
+    fire(manager, pygame.QUIT)
+    assert len(log) == 1
+    assert manager.bound_actions[pygame.QUIT] == (log.append,)
@@ -0,0 +1,87 @@
+import pygame
+import pytest
+import game.game_module
+from utils.my_timer import Timer, TimeDomain
+from utils.particle_effects import ParticleEffectTrack
+from game.sprite import Sprite
+
+
+@pytest.fixture
+def core(clock, monkeypatch):
+    from core.core import core_object
+    frame_clock = core_object.frame_clock
+    monkeypatch.setattr(frame_clock, 'source', clock)
+    monkeypatch.setattr(frame_clock, 'now', None)
+    clock.t = 100
+    frame_clock.tick()
+    for domain in (core_object.real_domain, core_object.game_domain, core_object.ui_domain):
+        domain.anchor()
+    monkeypatch.setattr(game.game_module, 'core_object', core_object, raising=False)
+    monkeypatch.setattr(core_object, 'main_display', pygame.display.get_surface(), raising=False)
+    game_object = core_object.game
+    game_object.active = True
+    game_object.state = game_object.STATES.normal
+    yield core_object
+    game_object.unpause()
+    game_object.active = False
+    game_object.state = None
+
+
+def advance(core_object, clock, seconds : float, frames : int = 1):
+    '''Ticks the frame clock frames times, seconds / frames apart. Frames are kept short of Core.MAX_FRAME_TIME.'''
+    for _ in range(frames):
+        clock.t += seconds / frames
+        core_object.frame_clock.tick()
+
+
+def test_game_pause_only_stops_game_objects(core, clock):
+    default_timer = Timer(-1)
+    ui_timer = Timer(-1, TimeDomain.get_source('ui'))
+    game_timer = core.game_domain.make_timer()
+    effect_track = ParticleEffectTrack(None, 1)
+    advance(core, clock, 0.1)
+    core.game.pause()
+    advance(core, clock, 0.2)
+    assert default_timer.get_time() == pytest.approx(0.3)
+    assert ui_timer.get_time() == pytest.approx(0.3)
+    assert game_timer.get_time() == pytest.approx(0.1)
+    assert effect_track.timer.get_time() == pytest.approx(0.1)
+    core.game.unpause()
+    advance(core, clock, 0.2)
+    assert default_timer.get_time() == pytest.approx(0.5)
+    assert game_timer.get_time() == pytest.approx(0.3)
+
+
+def test_ui_temp_elements_expire_while_the_game_is_paused(core, clock):
+    core.game.pause()
+    element = object()
+    core.main_ui.add_temp(element, 0.5)
+    advance(core, clock, 0.6, frames=6)
+    assert core.main_ui.temp_elements[element].isover()
+    core.main_ui.temp_elements.pop(element)
+    core.main_ui.complete_list.remove(element)
+
+
+class FakeTrack:
+    def play(self):
+        pass
+
+
+class FakeAnimation:
+    '''Records the time source play_animation loads it with.'''
+    name : str = 'fake'
+
+    def __init__(self) -> None:
+        self.time_sources : list = []
+
+    def load(self, owner, time_source = None, timer_factor : float = 1, lazy : bool = False):
+        self.time_sources.append(time_source)
+        return FakeTrack()
+
+
+def test_sprite_animations_run_on_the_game_domain(core):
+    animation = FakeAnimation()
+    sprite = Sprite.__new__(Sprite)
+    sprite.animation_tracks = {}
+    sprite.play_animation(animation)
+    assert animation.time_sources == [core.game_domain.get_time]
@@ -0,0 +1,127 @@
+import pygame
+import pytest
+import utils.interpolation as interpolation
+from utils.interpolation import get_lerp, compatibilty_lerp
+
+
+class Lerpable:
+    '''Only knows how to lerp itself, like a type from another library.'''
+    def __init__(self, value : float) -> None:
+        self.value : float = value
+
+    def lerp(self, other : 'Lerpable', t : float) -> 'Lerpable':
+        return Lerpable(self.value + (other.value - self.value) * t)
+
+
+@pytest.mark.parametrize('a, b, strategy, expected', [
+    (2, 12, interpolation.lerp_arithmetic, 4.5),
+    (2.0, 12, interpolation.lerp_arithmetic, 4.5),
+    (pygame.Vector2(0, 10), pygame.Vector2(20, 30), interpolation.lerp_arithmetic, pygame.Vector2(5, 15)),
+    (pygame.Vector3(0, 0, 4), pygame.Vector3(8, 4, 0), interpolation.lerp_arithmetic, pygame.Vector3(2, 1, 3)),
+    ((0, 10), (20, 30), interpolation.lerp_tuple, (5, 15)),
+    ((0, 10), [20, 30], interpolation.lerp_tuple, (5, 15)),
+    ([0, 0, 4], [8, 4, 0], interpolation.lerp_sequence, [2, 1, 3]),
+    (pygame.Color(0, 0, 0), (200, 100, 40), interpolation.lerp_color, pygame.Color(50, 25, 10)),
+    ((0, 0, 0), pygame.Color(200, 100, 40), interpolation.lerp_color, pygame.Color(50, 25, 10)),
+    (pygame.Rect(0, 0, 10, 10), pygame.Rect(40, 20, 30, 10), interpolation.lerp_rect, pygame.Rect(10, 5, 15, 10)),
+    (pygame.Rect(0, 0, 10, 10), (40, 20, 30, 10), interpolation.lerp_rect, pygame.Rect(10, 5, 15, 10)),
+])
+def test_each_type_gets_its_strategy(a, b, strategy, expected):
+    assert get_lerp(a, b) is strategy
+    result = compatibilty_lerp(a, b, 0.25)
+    assert result == expected
+    assert type(result) == type(expected)
+
+
+def test_frect_keeps_its_type():
+    if not hasattr(pygame, 'FRect'): pytest.skip('pygame without FRect')
+    result = compatibilty_lerp(pygame.FRect(0, 0, 1, 1), pygame.FRect(1, 1, 2, 2), 0.5)
+    assert isinstance(result, pygame.FRect) and tuple(result) == (0.5, 0.5, 1.5, 1.5)
+
+
+def test_arrays_lerp_elementwise():
+    numpy = pytest.importorskip('numpy')
+    a, b = numpy.array([0.0, 10.0]), numpy.array([10.0, 30.0])
+    assert get_lerp(a, b) is interpolation.lerp_arithmetic
+    assert compatibilty_lerp(a, b, 0.5).tolist() == [5.0, 20.0]
+
+
+def test_color_overshoot_is_clamped():
+    result = compatibilty_lerp(pygame.Color(0, 100, 250), pygame.Color(100, 100, 200), 1.5)
+    assert result == pygame.Color(150, 100, 175)
+    assert compatibilty_lerp(pygame.Color(0, 0, 255), pygame.Color(255, 0, 0), -0.5) == pygame.Color(0, 0, 255)
+
+
+def test_fallback_to_the_lerp_method():
+    assert get_lerp(Lerpable(0), Lerpable(8)) is interpolation.lerp_method
+    assert compatibilty_lerp(Lerpable(0), Lerpable(8), 0.25).value == 2
+
+
+def test_incompatible_values_raise():
+    with pytest.raises(ValueError):
+        get_lerp(object(), object())
+    with pytest.raises(ValueError):
+        compatibilty_lerp([1, 2], [1, 2, 3], 0.5)
+
+
+def test_strategy_is_resolved_once_per_type_pair(monkeypatch):
+    calls = []
+    resolve = interpolation.resolve_lerp
+    monkeypatch.setattr(interpolation, 'lerp_strategies', {})
+    monkeypatch.setattr(interpolation, 'resolve_lerp', lambda a, b : calls.append((a, b)) or resolve(a, b))
+    for i in range(5):
+        compatibilty_lerp(pygame.Vector2(i, 0), pygame.Vector2(0, i), 0.5)
+    compatibilty_lerp((0, 1), (1, 0), 0.5)
+    assert len(calls) == 2
+
+
+EASING_NAMES = ['quad_ease_out', 'quad_ease_in', 'cubic_ease_in', 'cubic_ease_out', 'smoothstep', 'linear', 'mirror']
+ALPHAS = [i / 997 for i in range(998)]
+
+@pytest.mark.parametrize('name', EASING_NAMES)
+def test_baked_lut_matches_the_analytic_curve(name):
+    function = interpolation.easings[name].function
+    easing = interpolation.Easing(function).bake()
+    for alpha in ALPHAS:
+        assert easing(alpha) == pytest.approx(function(alpha), abs=1e-4)
+    assert easing(0) == function(0) and easing(1) == function(1)
+    #Outside 0-1 the curve itself is used, so overshooting tweens are unaffected
+    assert easing(1.25) == function(1.25) and easing(-0.5) == function(-0.5)
+
+
+@pytest.mark.parametrize('name', EASING_NAMES)
+def test_array_evaluation_matches_per_value_calls(name):
+    numpy = pytest.importorskip('numpy')
+    registered = interpolation.easings[name]
+    expected = [registered.function(alpha) for alpha in ALPHAS]
+    assert interpolation.ease_array(registered.function, ALPHAS).tolist() == pytest.approx(expected, abs=1e-12)
+    baked = interpolation.Easing(registered.function).bake()
+    values = baked.evaluate(numpy.array(ALPHAS))
+    assert values.tolist() == pytest.approx(expected, abs=1e-4)
+    assert values[0] == expected[0] and values[-1] == expected[-1]
+
+
+@pytest.mark.parametrize('points', [(0.25, 0.1, 0.25, 1), (0.42, 0, 0.58, 1), (0.68, -0.55, 0.27, 1.55)])
+def test_cubic_bezier_lut_matches_the_solved_curve(points):
+    easing = interpolation.cubic_bezier(*points)
+    assert easing.lut is not None
+    assert easing(0) == 0 and easing(1) == 1
+    for alpha in ALPHAS:
+        assert easing(alpha) == pytest.approx(easing.function(alpha), abs=2e-3)
+
+
+def test_linear_bezier_is_linear():
+    easing = interpolation.cubic_bezier(0, 0, 1, 1)
+    for alpha in ALPHAS:
+        assert easing(alpha) == pytest.approx(alpha, abs=1e-6)
+
+
+def test_named_bezier_is_registered_for_animations():
+    easing = interpolation.cubic_bezier(0.42, 0, 0.58, 1, 'test_ease_in_out')
+    try:
+        assert interpolation.get_easing('test_ease_in_out') is easing
+        assert interpolation.ease_array(easing, [0, 0.5, 1]).tolist() == pytest.approx([0, 0.5, 1], abs=1e-9)
+    finally:
+        del interpolation.easings['test_ease_in_out']
+        del interpolation.easings_by_function[easing.function]
+        del interpolation.easings_by_function[easing]
@@ -0,0 +1,54 @@
+import pygame
+import pytest
+from utils.mipmap import MipChain
+from utils.surface_registry import SurfaceRegistry
+from utils.ui.ui_sprite import UiSprite
+
+
+@pytest.fixture(autouse=True)
+def clean_chains():
+    yield
+    MipChain.clear_cache()
+
+
+def checkerboard(depth : int) -> pygame.Surface:
+    surf = pygame.Surface((64, 64), depth = depth)
+    surf.fill('black')
+    for x in range(64):
+        for y in range(64):
+            if (x + y) % 2: surf.set_at((x, y), 'white')
+    return surf
+
+
+def test_downscale_filters_the_last_step():
+    result = MipChain.get(checkerboard(32)).scale_by(0.3)
+    assert result.get_size() == (19, 19)
+    #A 1px checkerboard averages to grey; nearest sampling would keep pure black and white pixels
+    for x in range(19):
+        for y in range(19):
+            assert 64 < result.get_at((x, y)).r < 192
+
+
+def test_paletted_surfaces_fall_back_to_nearest():
+    result = MipChain.get(checkerboard(8)).scale_by(0.3)
+    assert result.get_size() == (19, 19)
+    assert result.get_at((0, 0)).r in (0, 255)
+
+
+def test_upscale_matches_scale_by():
+    surf = checkerboard(32)
+    assert MipChain.get(surf).scale_by(2).get_size() == pygame.transform.scale_by(surf, 2).get_size()
+
+
+def test_ui_sprite_mip_chain_is_cached_and_evictable():
+    sprite = UiSprite(checkerboard(32), None, 0)
+    sprite.use_mipmaps = True
+    sprite.scale = 0.5
+    chain = MipChain.chains[sprite.og_surf]
+    sprite.scale = 0.4
+    assert MipChain.chains[sprite.og_surf] is chain
+    assert SurfaceRegistry.get_evictable() is not None
+    SurfaceRegistry.frame += 1
+    assert MipChain.get_evictable() == chain.bytes
+    MipChain.evict_unused()
+    assert sprite.og_surf not in MipChain.chains
@@ -0,0 +1,178 @@
+import pytest
+from utils.my_timer import FrameClock, TimeDomain, Timer
+
+
+class Source:
+    '''Settable time source that counts how often it is read.'''
+    def __init__(self) -> None:
+        self.t : float = 0
+        self.reads : int = 0
+
+    def __call__(self) -> float:
+        self.reads += 1
+        return self.t
+
+
+@pytest.fixture
+def source():
+    return Source()
+
+
+def test_time_reads_the_source_until_the_first_tick(source):
+    frame_clock = FrameClock(source)
+    source.t = 1.5
+    assert frame_clock.get_time() == 1.5
+    source.t = 2
+    assert frame_clock.get_time() == 2
+    assert frame_clock.frame == 0
+
+
+def test_time_is_fixed_within_a_frame(source):
+    frame_clock = FrameClock(source)
+    source.t = 1
+    assert frame_clock.tick() == 1
+    reads = source.reads
+    source.t = 1.2
+    assert frame_clock.get_time() == 1
+    assert frame_clock.get_time() == 1
+    assert source.reads == reads
+    assert frame_clock.tick() == pytest.approx(1.2)
+    assert frame_clock.get_time() == pytest.approx(1.2)
+    assert frame_clock.frame == 2
+
+
+def test_dt_is_the_time_between_ticks(source):
+    frame_clock = FrameClock(source)
+    source.t = 3
+    frame_clock.tick()
+    assert frame_clock.dt == 0
+    source.t = 3.016
+    frame_clock.tick()
+    assert frame_clock.dt == pytest.approx(0.016)
+    frame_clock.tick()
+    assert frame_clock.dt == 0
+
+
+def test_dt_is_clamped_and_the_clock_falls_behind_the_source(source):
+    frame_clock = FrameClock(source, max_dt=0.1)
+    frame_clock.tick()
+    source.t = 5
+    assert frame_clock.tick() == pytest.approx(0.1)
+    assert frame_clock.dt == pytest.approx(0.1)
+    source.t = 5.02
+    assert frame_clock.tick() == pytest.approx(0.12)
+    assert frame_clock.dt == pytest.approx(0.02)
+
+
+def test_source_going_backwards_does_not_rewind(source):
+    frame_clock = FrameClock(source)
+    source.t = 2
+    frame_clock.tick()
+    source.t = 1
+    assert frame_clock.tick() == 2
+    assert frame_clock.dt == 0
+    source.t = 1.5
+    assert frame_clock.tick() == pytest.approx(2.5)
+
+
+def test_smoothed_dt_starts_at_the_first_dt_and_follows_changes(source):
+    frame_clock = FrameClock(source, smoothing=0.5)
+    frame_clock.tick()
+    source.t = 0.02
+    frame_clock.tick()
+    assert frame_clock.smoothed_dt == pytest.approx(0.02)
+    source.t = 0.06
+    frame_clock.tick()
+    assert frame_clock.smoothed_dt == pytest.approx(0.03)
+    for _ in range(30):
+        source.t += 0.04
+        frame_clock.tick()
+    assert frame_clock.smoothed_dt == pytest.approx(0.04)
+    assert frame_clock.dt == pytest.approx(0.04)
+
+
+def test_smoothing_uses_the_clamped_dt(source):
+    frame_clock = FrameClock(source, max_dt=0.05, smoothing=0.5)
+    frame_clock.tick()
+    source.t = 0.02
+    frame_clock.tick()
+    source.t = 2
+    frame_clock.tick()
+    assert frame_clock.smoothed_dt == pytest.approx(0.035)
+
+
+@pytest.fixture
+def domains(source):
+    root = TimeDomain.create('test_root', source)
+    game = TimeDomain.create('test_game', 'test_root')
+    scene = TimeDomain.create('test_scene', 'test_game')
+    yield root, game, scene
+    for name in ('test_root', 'test_game', 'test_scene'):
+        TimeDomain.remove(name)
+
+
+def test_pausing_a_domain_stops_it_and_the_domains_under_it(source, domains):
+    root, game, scene = domains
+    source.t = 1
+    game.pause()
+    source.t = 3
+    assert root.get_time() == 3
+    assert game.get_time() == 1
+    assert scene.get_time() == 1
+    assert scene.is_paused() and not root.is_paused()
+    game.unpause()
+    source.t = 4
+    assert game.get_time() == 2
+    assert scene.get_time() == 2
+
+
+def test_unpausing_a_child_does_not_run_it_under_a_paused_parent(source, domains):
+    root, game, scene = domains
+    scene.pause()
+    game.pause()
+    scene.unpause()
+    source.t = 5
+    assert scene.get_time() == 0
+    assert scene.get_scale() == 0
+
+
+def test_scales_multiply_down_the_tree(source, domains):
+    root, game, scene = domains
+    source.t = 2
+    game.set_scale(0.5)
+    scene.set_scale(4)
+    source.t = 4
+    assert game.get_time() == pytest.approx(3)
+    assert scene.get_time() == pytest.approx(6)
+    assert scene.get_scale() == pytest.approx(2)
+
+
+def test_rescaling_keeps_the_time_continuous(source, domains):
+    root, game, scene = domains
+    source.t = 10
+    game.set_scale(3)
+    assert game.get_time() == pytest.approx(10)
+    source.t = 11
+    game.set_scale(0)
+    source.t = 20
+    assert game.get_time() == pytest.approx(13)
+
+
+def test_timers_follow_their_domain(source, domains):
+    root, game, scene = domains
+    timer = scene.make_timer(2)
+    source.t = 1
+    game.pause()
+    source.t = 10
+    assert timer.get_time() == 1
+    assert not timer.isover()
+    game.unpause()
+    source.t = 11.5
+    assert timer.isover()
+
+
+def test_get_source_falls_back_to_the_default_source(domains):
+    root, game, scene = domains
+    assert TimeDomain.get_source('test_game') == game.get_time
+    assert TimeDomain.get_source('no_such_domain') is None
+    assert Timer(-1, TimeDomain.get_source('no_such_domain')).time_source == Timer.time_source
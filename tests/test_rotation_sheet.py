@@ -0,0 +1,77 @@
+import subprocess
+import sys
+import pygame
+import pytest
+from game.sprite import Sprite
+from utils.pivot_2d import Pivot2D, rotate_around_pivot_accurate
+from utils.rotation_sheet import RotationSheet
+from conftest import ROOT
+
+Sprite._core_hint()
+
+
+@pytest.fixture(autouse=True)
+def clean_sheets():
+    yield
+    RotationSheet.clear_cache()
+
+
+def make_image() -> pygame.Surface:
+    image = pygame.Surface((20, 60))
+    image.fill('red')
+    image.fill((0, 255, 0), (0, 0, 20, 10))
+    return image
+
+
+def test_one_sheet_serves_every_pivot_offset():
+    image = make_image()
+    for offset in [(0, 30), (0, 31), (5, -2)]:
+        pivot = Pivot2D(pygame.Vector2(100, 100), image, (0, 255, 0))
+        pivot.pivot_offset = pygame.Vector2(offset)
+        pivot.angle = 45
+        baked_image, baked_rect, baked_pos = pivot.rotate_og_image_baked(16)
+        new_image, new_rect, new_pos = rotate_around_pivot_accurate(image, pivot.origin, 45, pivot.pivot_offset, colorkey=(0, 255, 0))
+        assert baked_rect == new_rect
+        assert baked_pos == new_pos
+        assert baked_image.get_size() == new_image.get_size()
+    assert len(RotationSheet.sheets) == 1
+
+
+@pytest.mark.parametrize('angle', [10, 47.5, -101.3, 200])
+def test_off_step_angle_keeps_the_rect_on_the_pivot_position(angle):
+    image = make_image()
+    pivot = Pivot2D(pygame.Vector2(100, 100), image, (0, 255, 0))
+    pivot.pivot_offset = pygame.Vector2(0, 30)
+    pivot.angle = angle
+    baked_image, baked_rect, baked_pos = pivot.rotate_og_image_baked(16)
+    assert baked_pos == pivot.position
+    assert baked_rect.center == round(pivot.position)
+    assert baked_image is RotationSheet.get(image, 16, (0, 255, 0)).surfaces[round(angle / 22.5) % 16]
+
+
+def test_register_class_bakes_ahead_of_time():
+    image = make_image()
+    class Turret(Sprite):
+        rotation_steps = 32
+        rotation_images = [image]
+        rotation_colorkey = (0, 255, 0)
+    Sprite.register_class(Turret)
+    try:
+        assert RotationSheet.make_key(image, 32, (0, 255, 0)) in RotationSheet.sheets
+    finally:
+        Sprite.registered_classes.remove(Turret)
+
+
+def test_offline_bake_keeps_the_colorkey(tmp_path):
+    image = pygame.Surface((20, 20))
+    image.fill('magenta')
+    image.fill('blue', (5, 5, 10, 10))
+    pygame.image.save(image, str(tmp_path / 'ship.png'))
+    output = str(tmp_path / 'ship_sheet')
+    subprocess.run([sys.executable, '-m', 'utils.rotation_sheet', str(tmp_path / 'ship.png'), '8', output, '--colorkey', 'magenta'],
+                   cwd=ROOT, check=True, env={'SDL_VIDEODRIVER' : 'dummy', 'SDL_AUDIODRIVER' : 'dummy', 'PYGAME_HIDE_SUPPORT_PROMPT' : '1'})
+    sheet = RotationSheet.load(output, image, 'magenta')
+    assert RotationSheet.get(image, 8, 'magenta') is sheet
+    first = sheet.surfaces[0]
+    assert first.get_at((0, 0)).a == 0
+    assert first.get_at((10, 10)) == pygame.Color('blue')
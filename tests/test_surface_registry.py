@@ -0,0 +1,102 @@
+import pygame
+import pytest
+from utils.surface_registry import SurfaceRegistry
+from utils.rotation_sheet import RotationSheet
+from utils.ui.ui_sprite import UiSprite
+
+
+class Cache:
+    '''Evictable stand-in that counts how often it is asked to evict.'''
+    def __init__(self) -> None:
+        self.surfaces : list[pygame.Surface] = []
+        self.calls : int = 0
+
+    def add(self, size : int):
+        self.surfaces.append(SurfaceRegistry.track(pygame.Surface((size, size)), 'test_cache'))
+
+    def evict(self):
+        self.calls += 1
+        self.surfaces.clear()
+
+    def evictable(self) -> int:
+        return sum(SurfaceRegistry.get_bytes(surf) for surf in self.surfaces)
+
+
+@pytest.fixture
+def accounting():
+    SurfaceRegistry.accounting_enabled = True
+    yield
+    SurfaceRegistry.accounting_enabled = False
+
+
+@pytest.fixture
+def cache(accounting):
+    evictors = SurfaceRegistry.evictors
+    SurfaceRegistry.evictors = []
+    cache = Cache()
+    SurfaceRegistry.register_evictor('test_cache', cache.evict, evictable = cache.evictable)
+    yield cache
+    SurfaceRegistry.evictors = evictors
+    SurfaceRegistry.budget = None
+    SurfaceRegistry.over_budget_warned = False
+    RotationSheet.clear_cache()
+
+
+def test_budget_is_enforced_once_per_frame(cache):
+    SurfaceRegistry.budget = SurfaceRegistry.total
+    for _ in range(50):
+        cache.add(16)
+    assert cache.calls == 0
+    SurfaceRegistry.end_frame()
+    assert cache.calls == 1
+    assert SurfaceRegistry.total <= SurfaceRegistry.budget
+
+
+def test_eviction_is_skipped_when_it_cant_reach_the_budget(cache, capsys):
+    cache.add(16)
+    SurfaceRegistry.budget = SurfaceRegistry.total - 10 * SurfaceRegistry.get_bytes(cache.surfaces[0])
+    for _ in range(3):
+        SurfaceRegistry.end_frame()
+    assert cache.calls == 0
+    assert len(cache.surfaces) == 1
+    assert capsys.readouterr().out.count('over the budget') == 1
+
+
+def test_caches_used_this_frame_are_kept(cache):
+    SurfaceRegistry.evictors = []
+    SurfaceRegistry.register_evictor('rotation_sheet', RotationSheet.evict_unused, evictable = RotationSheet.get_evictable)
+    image = pygame.Surface((20, 60))
+    used = RotationSheet.get(image, 8)
+    idle_bytes = RotationSheet.get(pygame.Surface((20, 60)), 8).bytes
+    SurfaceRegistry.end_frame()
+    assert RotationSheet.get(image, 8) is used
+    SurfaceRegistry.budget = SurfaceRegistry.total - idle_bytes
+    SurfaceRegistry.end_frame()
+    assert list(RotationSheet.sheets.values()) == [used]
+    assert SurfaceRegistry.total <= SurfaceRegistry.budget
+
+
+def test_accounting_is_off_by_default():
+    assert not SurfaceRegistry.accounting_enabled
+    total = SurfaceRegistry.total
+    SurfaceRegistry.track(pygame.Surface((64, 64)), 'test_cache')
+    assert SurfaceRegistry.total == total
+
+
+def test_render_results_are_not_tracked(accounting):
+    sprite = UiSprite(pygame.Surface((32, 32)), None, 0)
+    sprite._render()
+    totals = SurfaceRegistry.get_totals()
+    for angle in range(1, 30):
+        sprite.angle = angle
+        sprite.opacity = 0.5
+        sprite._render()
+    assert SurfaceRegistry.get_totals() == totals
+
+
+def test_budget_does_nothing_without_accounting(cache):
+    cache.add(16)
+    SurfaceRegistry.accounting_enabled = False
+    SurfaceRegistry.budget = 0
+    SurfaceRegistry.end_frame()
+    assert cache.calls == 0
@@ -0,0 +1,409 @@
+import pytest
+import threading
+from time import perf_counter, sleep
+from core.task_scheduler import TaskScheduler, ScheduledTask, NextFrame, Wait
+from utils.tween_module import TweenTrack, TweenInfo
+from utils.my_timer import Timer
+import utils.interpolation as interpolation
+
+
+@pytest.fixture
+def scheduler(clock) -> TaskScheduler:
+    scheduler = TaskScheduler(clock)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def update_at(scheduler : TaskScheduler, clock, t : float):
+    clock.t = t
+    scheduler.update()
+
+
+def test_task_runs_once_after_its_delay(scheduler, clock):
+    calls = []
+    task = scheduler.schedule_task(1, calls.append, 'done')
+    assert isinstance(task, ScheduledTask)
+    update_at(scheduler, clock, 0.5)
+    assert calls == []
+    update_at(scheduler, clock, 1.5)
+    update_at(scheduler, clock, 3)
+    assert calls == ['done']
+    assert task.has_finished and not task.is_active
+
+
+def test_tasks_run_in_due_order(scheduler, clock):
+    calls = []
+    scheduler.schedule_task(2, calls.append, 'late')
+    scheduler.schedule_task(1, calls.append, 'early')
+    scheduler.schedule_task(1, calls.append, 'early too')
+    update_at(scheduler, clock, 5)
+    assert calls == ['early', 'early too', 'late']
+
+
+def test_cancelled_task_never_runs(scheduler, clock):
+    calls = []
+    task = scheduler.schedule_task(1, calls.append, 'cancelled')
+    task.cancel()
+    update_at(scheduler, clock, 2)
+    assert calls == []
+    assert task.is_cancelled and not task.is_active
+
+
+def test_repeating_task_runs_at_a_fixed_rate(scheduler, clock):
+    calls = []
+    task = scheduler.schedule_repeating_task(1, 3, lambda : calls.append(clock.t))
+    for frame in range(1, 60):
+        update_at(scheduler, clock, frame / 10 + 0.05)
+    assert calls == pytest.approx([1.05, 2.05, 3.05])
+    assert task.has_finished
+
+
+def test_repeating_task_can_be_cancelled_from_its_callback(scheduler, clock):
+    calls = []
+    def callback():
+        calls.append(clock.t)
+        if len(calls) == 2: task.cancel()
+    task = scheduler.schedule_repeating_task(1, -1, callback)
+    for frame in range(1, 60):
+        update_at(scheduler, clock, frame / 10)
+    assert len(calls) == 2
+
+
+def test_task_due_exactly_now_waits_like_a_timer(scheduler, clock):
+    calls = []
+    scheduler.schedule_task(1, calls.append, 'done')
+    timer = Timer(1, clock)
+    update_at(scheduler, clock, 1)
+    assert calls == [] and not timer.isover()
+    update_at(scheduler, clock, 1.01)
+    assert calls == ['done'] and timer.isover()
+
+
+def test_cancelling_a_running_task_is_not_counted_as_waiting_in_the_heap(scheduler, clock):
+    tasks = []
+    for index in range(100):
+        tasks.append(scheduler.schedule_task(1, lambda index : tasks[index].cancel(), index))
+    queue = scheduler.get_queue(clock)
+    update_at(scheduler, clock, 2)
+    assert queue.cancelled == 0 and not queue.heap
+    waiting = scheduler.schedule_task(1, lambda : None)
+    waiting.cancel()
+    assert queue.cancelled == 1 and len(queue.heap) == 1
+
+
+def test_callback_cancelling_most_of_the_heap_keeps_the_other_tasks(scheduler, clock):
+    calls = []
+    victims = [scheduler.schedule_task(2, calls.append, 'victim') for _ in range(100)]
+    def cancel_victims():
+        for task in victims:
+            task.cancel()
+        scheduler.schedule_task(0, calls.append, 'scheduled')
+    scheduler.schedule_task(1, cancel_victims)
+    for index in range(10):
+        scheduler.schedule_task(1.5, calls.append, ('due', index))
+        scheduler.schedule_task(5, calls.append, ('later', index))
+    queue = scheduler.get_queue(clock)
+    update_at(scheduler, clock, 3)
+    assert calls == [('due', index) for index in range(10)]
+    update_at(scheduler, clock, 4)
+    assert calls[10:] == ['scheduled']
+    update_at(scheduler, clock, 6)
+    update_at(scheduler, clock, 7)
+    assert calls[11:] == [('later', index) for index in range(10)]
+    assert not queue.heap and queue.cancelled == 0
+
+
+def test_task_scheduled_by_a_callback_waits_for_the_next_update(scheduler, clock):
+    calls = []
+    def reschedule():
+        calls.append(clock.t)
+        scheduler.schedule_task(0, reschedule)
+    scheduler.schedule_task(0, reschedule)
+    update_at(scheduler, clock, 1)
+    assert len(calls) == 1
+    update_at(scheduler, clock, 2)
+    assert len(calls) == 2
+
+
+def test_task_can_use_its_own_time_source(scheduler, clock):
+    class OtherClock:
+        t = 0.0
+        def __call__(self): return self.t
+    other = OtherClock()
+    calls = []
+    scheduler.schedule_task((1, other, 1), calls.append, 'other')
+    update_at(scheduler, clock, 5)
+    assert calls == []
+    other.t = 1.5
+    scheduler.update()
+    assert calls == ['other']
+
+
+def test_continuous_task_runs_every_update_until_it_expires(scheduler, clock):
+    calls = []
+    scheduler.schedule_continuous_task(1, lambda : calls.append(clock.t))
+    for frame in range(1, 16):
+        update_at(scheduler, clock, frame / 10)
+    assert calls == pytest.approx([frame / 10 for frame in range(1, 12)])
+    assert not scheduler.continous_tasks
+
+
+def test_coroutine_resumes_after_wait_and_next_frame(scheduler, clock):
+    log = []
+    async def script():
+        log.append('start')
+        await Wait(1)
+        log.append(('waited', clock.t))
+        await NextFrame()
+        log.append(('next frame', clock.t))
+        return 'result'
+    task = scheduler.start_coroutine(script())
+    assert log == ['start']
+    update_at(scheduler, clock, 0.5)
+    assert log == ['start']
+    update_at(scheduler, clock, 1.5)
+    assert log == ['start', ('waited', 1.5)]
+    update_at(scheduler, clock, 1.6)
+    assert log[-1] == ('next frame', 1.6)
+    assert task.has_finished and task.result == 'result'
+
+
+def test_coroutine_can_await_another_coroutine(scheduler, clock):
+    async def child():
+        await Wait(1)
+        return 42
+    async def parent():
+        return await scheduler.start_coroutine(child()) + 1
+    task = scheduler.start_coroutine(parent())
+    update_at(scheduler, clock, 2)
+    update_at(scheduler, clock, 2.1)
+    assert task.result == 43
+
+
+def test_cancel_closes_the_coroutine(scheduler, clock):
+    log = []
+    async def script():
+        try:
+            await Wait(1)
+            log.append('resumed')
+        finally:
+            log.append('closed')
+    task = scheduler.start_coroutine(script())
+    task.cancel()
+    assert log == ['closed']
+    update_at(scheduler, clock, 2)
+    assert log == ['closed'] and task.is_cancelled
+
+
+def test_failing_coroutine_does_not_stop_the_others(scheduler, clock, capsys):
+    log = []
+    async def script(name, fail):
+        await NextFrame()
+        if fail: raise ValueError(name)
+        log.append(name)
+    tasks = [scheduler.start_coroutine(script(name, name == 'first')) for name in ('first', 'second', 'third')]
+    update_at(scheduler, clock, 0.1)
+    update_at(scheduler, clock, 0.2)
+    assert log == ['second', 'third']
+    assert not any(task.is_active for task in tasks)
+    assert isinstance(tasks[0].error, ValueError)
+    assert 'script' in capsys.readouterr().out
+
+
+def test_awaiting_a_failed_coroutine_raises_its_error(scheduler, clock, capsys):
+    log = []
+    async def child():
+        await Wait(1)
+        raise ValueError('child')
+    async def parent():
+        try:
+            await scheduler.start_coroutine(child())
+        except ValueError as error:
+            log.append(str(error))
+    scheduler.start_coroutine(parent())
+    update_at(scheduler, clock, 2)
+    update_at(scheduler, clock, 2.1)
+    assert log == ['child']
+    assert capsys.readouterr().out == ''
+
+
+def test_coroutines_left_by_an_interrupt_resume_next_pass(scheduler, clock):
+    class Interrupt(BaseException):
+        pass
+    log = []
+    async def script(name):
+        await NextFrame()
+        if name == 'first': raise Interrupt()
+        log.append(name)
+    for name in ('first', 'second', 'third'):
+        scheduler.start_coroutine(script(name))
+    update_at(scheduler, clock, 0.1)
+    with pytest.raises(Interrupt):
+        update_at(scheduler, clock, 0.2)
+    assert log == []
+    scheduler.update_coroutines()
+    assert log == ['second', 'third']
+
+
+def test_coroutine_can_await_a_tween(scheduler, clock):
+    class Target:
+        x = 0
+    target = Target()
+    track = TweenTrack(target, TweenInfo(interpolation.linear, 1), {'x' : 10}, True, clock)
+    track.play()
+    log = []
+    async def script():
+        await track
+        log.append(target.x)
+    scheduler.start_coroutine(script())
+    clock.t = 1.5
+    track.update()
+    scheduler.update()
+    assert log == [10]
+
+
+def deliver(scheduler : TaskScheduler, task):
+    deadline = perf_counter() + 5
+    while task.is_active and perf_counter() < deadline:
+        sleep(0.001)
+        scheduler.update()
+
+
+def test_worker_result_is_delivered_on_the_main_thread(scheduler):
+    release = threading.Event()
+    worker_threads = []
+    results = []
+    def work(value):
+        worker_threads.append(threading.get_ident())
+        release.wait(5)
+        return value * 2
+    task = scheduler.run_in_worker(work, 21, on_done = lambda result : results.append((result, threading.get_ident())))
+    scheduler.update()
+    assert results == []
+    release.set()
+    deliver(scheduler, task)
+    assert results == [(42, threading.get_ident())]
+    assert worker_threads[0] != threading.get_ident()
+    assert task.has_finished and task.result == 42
+    assert scheduler.get_worker_stats()['done'] == 1
+
+
+def test_worker_error_goes_to_on_error(scheduler):
+    errors = []
+    def work():
+        raise ValueError('bad input')
+    task = scheduler.run_in_worker(work, on_error = errors.append)
+    deliver(scheduler, task)
+    assert len(errors) == 1 and isinstance(errors[0], ValueError)
+    assert scheduler.get_worker_stats()['failed'] == 1
+
+
+def test_cancelled_worker_task_never_calls_back(scheduler):
+    scheduler.max_workers = 1
+    release = threading.Event()
+    results = []
+    blocking = scheduler.run_in_worker(release.wait, 5)
+    waiting = scheduler.run_in_worker(lambda : 'late', on_done = results.append)
+    assert waiting.cancel()
+    release.set()
+    deliver(scheduler, blocking)
+    scheduler.update()
+    assert results == [] and waiting.is_cancelled
+
+
+def test_coroutine_can_await_a_worker(scheduler):
+    log = []
+    async def script():
+        log.append(await scheduler.run_in_worker(sum, [1, 2, 3]))
+        try:
+            await scheduler.run_in_worker(int, 'not a number')
+        except ValueError:
+            log.append('failed')
+    task = scheduler.start_coroutine(script())
+    deadline = perf_counter() + 5
+    while task.is_active and perf_counter() < deadline:
+        sleep(0.001)
+        scheduler.update()
+    assert log == [6, 'failed']
+
+
+def test_without_threads_work_runs_inline_but_calls_back_from_update(scheduler):
+    scheduler.use_threads = False
+    results = []
+    task = scheduler.run_in_worker(lambda : threading.get_ident(), on_done = results.append)
+    assert results == []
+    scheduler.update()
+    assert results == [threading.get_ident()] and task.has_finished
+
+
+def test_without_threads_errors_are_delivered_but_interrupts_are_not_caught(scheduler):
+    scheduler.use_threads = False
+    errors = []
+    scheduler.run_in_worker(lambda : 1 / 0, on_error = errors.append)
+    scheduler.update()
+    assert len(errors) == 1 and isinstance(errors[0], ZeroDivisionError)
+    def interrupt():
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.run_in_worker(interrupt, on_error = errors.append)
+    scheduler.update()
+    assert len(errors) == 1
+
+
+def test_deferred_work_runs_in_order_within_the_deadline(scheduler):
+    log = []
+    def job(name):
+        log.append(name)
+        for step in range(3):
+            yield
+            log.append((name, step))
+    scheduler.defer(log.append, 'first')
+    scheduler.defer(job, 'second')
+    scheduler.defer(log.append, 'third')
+    scheduler.run_deferred(perf_counter() - 1)
+    assert log == []
+    scheduler.run_deferred(perf_counter() + 5)
+    assert log == ['first', 'second', ('second', 0), ('second', 1), ('second', 2), 'third']
+    assert not scheduler.deferred
+
+
+def test_deferred_generator_is_split_over_frames(scheduler):
+    log = []
+    def job():
+        for step in range(3):
+            log.append(step)
+            sleep(0.01)
+            yield
+    task = scheduler.defer(job())
+    scheduler.run_deferred(perf_counter() + 0.005)
+    assert log == [0]
+    scheduler.run_deferred(perf_counter() + 0.005)
+    assert log == [0, 1]
+    task.cancel()
+    scheduler.run_deferred(perf_counter() + 5)
+    assert log == [0, 1] and not scheduler.deferred
+
+
+def test_failing_deferred_job_is_reported_and_dropped(scheduler, capsys):
+    log = []
+    def broken_step():
+        log.append('step')
+        yield
+        raise ValueError('broken')
+    scheduler.defer(lambda : 1 / 0)
+    failed = scheduler.defer(broken_step)
+    scheduler.defer(log.append, 'after')
+    scheduler.run_deferred(perf_counter() + 5)
+    assert log == ['step', 'after']
+    assert failed.has_finished and not scheduler.deferred
+    assert capsys.readouterr().out.count('failed') == 2
+
+
+def test_deferred_job_interrupt_is_not_caught(scheduler):
+    def interrupt():
+        raise KeyboardInterrupt
+    scheduler.defer(interrupt)
+    scheduler.defer(lambda : None)
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.run_deferred(perf_counter() + 5)
+    assert len(scheduler.deferred) == 2
@@ -0,0 +1,428 @@
+import pygame
+import pytest
+import utils.tween_module as TweenModule
+import utils.interpolation as interpolation
+from utils.tween_module import TweenTrack, TweenChain, TweenHandle, TweenInfo, TweenEngine, EngineTween
+
+
+class Target:
+    def __init__(self) -> None:
+        self.x : float = 0
+        self.y : float = 0
+        self.position : pygame.Vector2 = pygame.Vector2(0, 0)
+
+
+@pytest.fixture(autouse=True)
+def clean_tweens():
+    yield
+    TweenTrack.elements.clear()
+    TweenTrack.inactive_elements.clear()
+    TweenChain.elements.clear()
+    TweenChain.inactive_elements.clear()
+    TweenTrack.index.clear()
+    TweenChain.index.clear()
+    TweenEngine.engines.clear()
+
+
+def update_at(clock, t : float):
+    clock.t = t
+    TweenTrack.update_all()
+    TweenEngine.update_all()
+    TweenChain.update_all()
+
+
+def test_released_track_is_reused(clock):
+    target = Target()
+    track = TweenTrack.acquire(target, TweenInfo(interpolation.linear, 1), {'x' : 10}, True, clock)
+    generation = track.generation
+    TweenTrack.release(track)
+    TweenTrack.release(track)
+    assert TweenTrack.inactive_elements == [track]
+    other = Target()
+    reused = TweenTrack.acquire(other, TweenInfo(interpolation.linear, 1), {'y' : 5}, True, clock)
+    assert reused is track
+    assert reused.generation == generation + 1
+    assert reused.target is other and not reused.is_playing
+
+
+def test_pooled_tween_returns_to_pool_when_finished(clock):
+    target = Target()
+    handle = TweenModule.new_tween(target, TweenInfo(interpolation.linear, 1), {'x' : 10}, time_source = clock, pooled = True)
+    assert isinstance(handle, TweenHandle)
+    update_at(clock, 0.5)
+    assert target.x == 5
+    assert handle.is_playing
+    update_at(clock, 1.5)
+    assert target.x == 10
+    assert handle.has_finished and not handle.is_valid
+    assert len(TweenTrack.inactive_elements) == 1
+
+
+def test_stale_handle_does_not_control_reused_track(clock):
+    first = Target()
+    handle = TweenModule.new_tween(first, TweenInfo(interpolation.linear, 1), {'x' : 10}, time_source = clock, pooled = True)
+    handle.stop()
+    second = Target()
+    new_handle = TweenModule.new_tween(second, TweenInfo(interpolation.linear, 1), {'x' : 10}, time_source = clock, pooled = True)
+    assert new_handle.get() is handle.element
+    handle.stop()
+    handle.pause()
+    update_at(clock, 0.5)
+    assert new_handle.is_playing
+    assert second.x == 5 and first.x == 0
+
+
+def test_track_keeps_its_timer_between_plays(clock):
+    target = Target()
+    track = TweenTrack(target, TweenInfo(interpolation.linear, 1), {'x' : 10}, True, clock)
+    track.play()
+    timer = track.timer
+    clock.t = 2
+    track.update()
+    assert track.has_finished
+    track.play()
+    assert track.timer is timer
+    clock.t = 2.5
+    track.update()
+    assert target.x == 10
+
+
+def test_recycled_chain_returns_to_pool(clock):
+    target = Target()
+    steps = [(TweenInfo(interpolation.linear, 1), {'x' : 10}), (TweenInfo(interpolation.linear, 1), {'x' : 0})]
+    chain = TweenChain.acquire(target, steps, True, clock)
+    chain.register(recycle = True)
+    chain.play()
+    update_at(clock, 0.5)
+    assert target.x == 5
+    update_at(clock, 1.01)
+    update_at(clock, 1.51)
+    assert target.x == pytest.approx(5, abs = 0.2)
+    update_at(clock, 2.6)
+    assert target.x == 0
+    assert TweenChain.inactive_elements == [chain]
+    assert TweenChain.acquire(target, steps, True, clock) is chain
+
+
+def linear_tween(target : Target, goal : dict, clock, time : float = 1, override : str = 'replace') -> TweenTrack:
+    return TweenModule.new_tween(target, TweenInfo(interpolation.linear, time), goal, time_source = clock, override = override)
+
+
+def test_replace_takes_over_only_the_shared_attributes(clock):
+    target = Target()
+    first = linear_tween(target, {'x' : 10, 'y' : 10}, clock)
+    update_at(clock, 0.5)
+    second = linear_tween(target, {'x' : -10}, clock)
+    update_at(clock, 1)
+    assert target.x == pytest.approx(-2.5)
+    assert target.y == 10
+    assert TweenTrack.index[id(target)] == {'x' : second, 'y' : first}
+    update_at(clock, 1.1)
+    assert first.has_finished and second.is_playing
+    assert TweenTrack.index[id(target)] == {'x' : second}
+
+
+def test_replaced_track_is_cancelled_once_it_drives_nothing(clock):
+    target = Target()
+    first = linear_tween(target, {'x' : 10}, clock)
+    linear_tween(target, {'x' : 0}, clock)
+    assert first.has_finished and not first.is_playing
+
+
+def test_queue_waits_for_the_running_tween(clock):
+    target = Target()
+    linear_tween(target, {'x' : 10}, clock)
+    queued = linear_tween(target, {'x' : 0}, clock, override = 'queue')
+    assert not queued.is_playing
+    update_at(clock, 0.5)
+    assert target.x == 5
+    update_at(clock, 1.01)
+    assert target.x == 10 and queued.is_playing
+    update_at(clock, 1.51)
+    assert target.x == pytest.approx(5)
+    update_at(clock, 2.1)
+    assert target.x == 0 and queued.has_finished
+
+
+def test_blend_keeps_the_motion_continuous(clock):
+    target = Target()
+    linear_tween(target, {'x' : 10}, clock)
+    update_at(clock, 0.5)
+    before = target.x
+    linear_tween(target, {'x' : 20}, clock, override = 'blend')
+    update_at(clock, 0.5)
+    assert target.x == pytest.approx(before)
+    update_at(clock, 0.6)
+    assert 6 < target.x < 10
+    update_at(clock, 1.6)
+    assert target.x == 20
+
+
+def test_cancel_all_stops_tracks_chains_and_queued_tweens(clock):
+    target = Target()
+    other = Target()
+    track = linear_tween(target, {'y' : 10}, clock)
+    queued = linear_tween(target, {'y' : 0}, clock, override = 'queue')
+    chain = TweenChain(target, [(TweenInfo(interpolation.linear, 1), {'x' : 10}), (TweenInfo(interpolation.linear, 1), {'x' : 0})], True, clock)
+    chain.register()
+    chain.play()
+    untouched = linear_tween(other, {'x' : 10}, clock)
+    TweenModule.cancel_all(target)
+    assert track.has_finished and queued.has_finished and chain.has_finished
+    assert untouched.is_playing
+    update_at(clock, 0.5)
+    assert (target.x, target.y) == (0, 0)
+    assert other.x == 5
+    assert id(target) not in TweenTrack.index
+
+
+class Body:
+    def __init__(self) -> None:
+        self.rect : pygame.Rect = pygame.Rect(0, 0, 10, 10)
+        self.position : pygame.Vector2 = pygame.Vector2(5, 5)
+        self.alpha : int = 0
+        self.color : pygame.Color = pygame.Color(0, 0, 0)
+        self.size : list[int] = [1, 2, 3]
+
+
+BODY_GOAL = {'rect.centery' : 50, 'position' : pygame.Vector2(40, 50), 'position.x' : 9, 'alpha' : 3,
+             'color' : (200, 100, 50), 'size' : [4, 8, 16]}
+
+def get_body(body : Body) -> tuple:
+    return (tuple(body.rect), tuple(body.position), body.alpha, tuple(body.color), list(body.size))
+
+
+def test_engine_matches_tween_tracks(clock):
+    results = []
+    for batched in (False, True):
+        clock.t = 0
+        bodies = [Body() for _ in range(6)]
+        for i, body in enumerate(bodies):
+            goal = dict(BODY_GOAL)
+            #position and position.x would fight over the same value
+            del goal['position' if i % 2 else 'position.x']
+            easing = interpolation.quad_ease_out if i % 3 else interpolation.smoothstep
+            tween = TweenModule.new_tween(body, TweenInfo(easing, 0.5 + i * 0.1), goal, time_source = clock, batched = batched)
+            assert isinstance(tween, EngineTween) == batched
+        states = []
+        for frame in range(1, 70):
+            update_at(clock, frame / 60)
+            states.append([get_body(body) for body in bodies])
+        results.append(states)
+    assert results[0] == results[1]
+
+
+def test_engine_runs_finish_callbacks_after_the_last_write(clock):
+    body = Body()
+    tween = TweenModule.new_tween(body, TweenInfo(interpolation.linear, 1), {'alpha' : 10}, time_source = clock, batched = True)
+    seen = []
+    tween.add_finish_callback(lambda : seen.append(body.alpha))
+    update_at(clock, 0.5)
+    assert body.alpha == 5 and tween.is_playing
+    update_at(clock, 1.5)
+    assert seen == [10]
+    assert tween.has_finished
+    assert TweenEngine.get(clock).count == 0
+
+
+def test_batched_tween_updated_manually_is_a_track(clock):
+    body = Body()
+    tween = TweenModule.new_tween(body, TweenInfo(interpolation.linear, 1), {'alpha' : 10}, update_manually = True,
+                                  time_source = clock, batched = True)
+    assert isinstance(tween, TweenTrack)
+    update_at(clock, 0.5)
+    assert body.alpha == 0
+    tween.update()
+    assert body.alpha == 5
+
+
+def batched_tween(target : object, goal : dict, clock, time : float = 1, override : str = 'replace') -> EngineTween:
+    tween = TweenModule.new_tween(target, TweenInfo(interpolation.linear, time), goal, time_source = clock, batched = True, override = override)
+    assert isinstance(tween, EngineTween)
+    return tween
+
+
+def test_cancel_all_reaches_a_chain_on_a_wait_step(clock):
+    target = Target()
+    steps = [(TweenInfo(interpolation.linear, 1), {'x' : 10}), (TweenInfo(interpolation.linear, 1), {}), (TweenInfo(interpolation.linear, 1), {'x' : 0})]
+    chain = TweenChain(target, steps, True, clock)
+    chain.register()
+    chain.play()
+    update_at(clock, 1.5)
+    assert chain.current_step == 1
+    TweenModule.cancel_all(target)
+    assert chain.has_finished
+    update_at(clock, 3)
+    assert target.x == 10
+    assert id(target) not in TweenChain.index
+
+
+def test_engine_tween_replaces_a_track(clock):
+    target = Target()
+    track = linear_tween(target, {'x' : 10, 'y' : 10}, clock)
+    update_at(clock, 0.5)
+    tween = batched_tween(target, {'x' : 0}, clock)
+    assert TweenTrack.index[id(target)]['x'] is tween
+    update_at(clock, 1)
+    assert (target.x, target.y) == (2.5, 10)
+    update_at(clock, 1.6)
+    assert target.x == 0 and tween.has_finished
+    assert track.has_finished
+
+
+def test_track_replaces_one_attribute_of_an_engine_tween(clock):
+    target = Target()
+    tween = batched_tween(target, {'x' : 10, 'y' : 10}, clock)
+    update_at(clock, 0.5)
+    linear_tween(target, {'x' : -10}, clock)
+    update_at(clock, 1.5)
+    assert (target.x, target.y) == (-10, 10)
+    assert tween.has_finished
+    assert TweenEngine.get(clock).count == 0
+
+
+def test_queued_engine_tween_starts_when_the_track_finishes(clock):
+    target = Target()
+    linear_tween(target, {'x' : 10}, clock)
+    queued = batched_tween(target, {'x' : 0}, clock, override = 'queue')
+    assert not queued.is_playing and not queued.has_finished
+    update_at(clock, 1.25)
+    assert target.x == 10 and queued.is_playing
+    update_at(clock, 1.75)
+    assert target.x == 5
+    update_at(clock, 2.5)
+    assert target.x == 0 and queued.has_finished
+
+
+def test_engine_tween_blends_like_a_track(clock):
+    results = []
+    for batched in (False, True):
+        clock.t = 0
+        target = Target()
+        TweenModule.new_tween(target, TweenInfo(interpolation.smoothstep, 1), {'x' : 10, 'position' : pygame.Vector2(5, 5)}, time_source = clock,
+                              batched = batched)
+        update_at(clock, 0.4)
+        TweenModule.new_tween(target, TweenInfo(interpolation.linear, 1), {'x' : 20, 'position' : pygame.Vector2(-5, 0)}, time_source = clock,
+                              batched = batched, override = 'blend')
+        states = []
+        for frame in range(24, 100):
+            update_at(clock, frame / 60)
+            states.append((round(target.x, 9), round(target.position.x, 9), round(target.position.y, 9)))
+        results.append(states)
+    assert results[0] == results[1]
+
+
+def test_cancel_all_stops_engine_tweens_and_their_queue(clock):
+    target = Target()
+    tween = batched_tween(target, {'x' : 10}, clock)
+    queued = linear_tween(target, {'x' : 0}, clock, override = 'queue')
+    TweenModule.cancel_all(target)
+    assert tween.has_finished and queued.has_finished
+    update_at(clock, 0.5)
+    assert target.x == 0
+    assert TweenEngine.get(clock).count == 0
+    assert id(target) not in TweenTrack.index
+
+
+class Node:
+    def __init__(self, child : object = None) -> None:
+        self.child : object = child
+        self.value : float = 0
+        self.rect : pygame.Rect = pygame.Rect(0, 0, 10, 10)
+        self.offset : pygame.Vector3 = pygame.Vector3(0, 0, 0)
+
+
+class Point:
+    def __init__(self) -> None:
+        self.x : float = 0
+        self.y : float = 0
+
+
+def test_accessors_read_and_write_chained_attributes(clock):
+    node = Node(Node(Node()))
+    node.child.child.value = 2
+    node.child.offset.z = 4
+    goal = {'child.child.value' : 12, 'rect.centery' : 45, 'child.offset.z' : 24, 'child.rect.width' : 30}
+    assert TweenTrack.get_chained_attribute(node, 'child.child.value') == 2
+    track = TweenTrack(node, TweenInfo(interpolation.linear, 1), goal, True, clock)
+    track.play()
+    clock.t = 0.5
+    track.update()
+    assert node.child.child.value == 7
+    assert node.rect.centery == 25
+    assert node.child.offset.z == 14
+    assert node.child.rect.width == 20
+    TweenTrack.set_chained_attribute(node, 'child.child.value', 1)
+    assert node.child.child.value == 1
+    assert (Node, 'child.child.value') in TweenTrack.accessors
+
+
+def test_cached_vector_setter_handles_another_parent_type(clock):
+    with_vector = Node(pygame.Vector2(0, 0))
+    with_point = Node(Point())
+    for node in (with_vector, with_point):
+        TweenTrack.set_chained_attribute(node, 'child.y', 7)
+    assert with_vector.child == pygame.Vector2(0, 7)
+    assert isinstance(with_point.child, Point) and with_point.child.y == 7
+
+
+def test_retargeted_track_writes_through_the_new_target_accessors(clock):
+    node = Node()
+    track = TweenTrack.acquire(node, TweenInfo(interpolation.linear, 1), {'rect.x' : 10}, True, clock)
+    track.play()
+    clock.t = 2
+    track.update()
+    TweenTrack.release(track)
+    target = Target()
+    clock.t = 0
+    reused = TweenTrack.acquire(target, TweenInfo(interpolation.linear, 1), {'position.x' : 10, 'y' : 4}, True, clock)
+    assert reused is track
+    reused.play()
+    clock.t = 0.5
+    reused.update()
+    assert target.position.x == 5 and target.y == 2
+    assert node.rect.x == 10 and not hasattr(node, 'y')
+    assert [attr for attr, _, _ in reused.properties] == ['position.x', 'y']
+
+
+class Panel:
+    def __init__(self) -> None:
+        self.rect : pygame.Rect = pygame.Rect(0, 0, 10, 10)
+        self.tint : tuple[int, int, int] = (0, 0, 0)
+        self.color : pygame.Color = pygame.Color(0, 0, 0)
+        self.scale : list[float] = [1, 1]
+        self.offset : pygame.Vector2 = pygame.Vector2(0, 0)
+
+
+PANEL_GOAL = {'rect' : (10, 10, 20, 20), 'tint' : (100, 50, 20), 'color' : (200, 100, 50), 'scale' : [2, 3], 'offset' : (4, 8)}
+
+def test_engine_keeps_the_type_of_sequence_attributes(clock):
+    results = []
+    for batched in (False, True):
+        clock.t = 0
+        panel = Panel()
+        TweenModule.new_tween(panel, TweenInfo(interpolation.linear, 1), dict(PANEL_GOAL), time_source = clock, batched = batched)
+        states = []
+        for t in (0.5, 1.5):
+            update_at(clock, t)
+            assert type(panel.rect) is pygame.Rect
+            assert type(panel.tint) is tuple
+            assert type(panel.color) is pygame.Color
+            assert type(panel.scale) is list
+            assert type(panel.offset) is pygame.Vector2
+            states.append((tuple(panel.rect), panel.tint, tuple(panel.color), panel.scale, tuple(panel.offset)))
+        results.append(states)
+    assert results[0] == results[1]
+    assert results[1][0][0] == (5, 5, 15, 15)
+    assert results[1][1] == ((10, 10, 20, 20), (100, 50, 20), (200, 100, 50, 255), [2, 3], (4, 8))
+
+
+def test_other_sequence_types_use_a_track(clock):
+    class Samples(list):
+        pass
+    class Holder:
+        def __init__(self) -> None:
+            self.samples : Samples = Samples([0, 0])
+    holder = Holder()
+    tween = TweenModule.new_tween(holder, TweenInfo(interpolation.linear, 1), {'samples' : [4, 8]}, time_source = clock, batched = True)
+    assert isinstance(tween, TweenTrack)
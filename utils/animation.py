@@ -1,10 +1,17 @@
 import json
+import copy
 import pygame
 from utils.helpers import Task
 from utils.my_timer import Timer
 import utils.interpolation as interpolation
 import utils.tween_module as TweenModule
 from typing import Any, Callable, Union
+from heapq import heappush, heappop
+from bisect import bisect_right
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 ColorType = Union[list[int], tuple[int, int, int], pygame.Color]
 
@@ -17,20 +24,25 @@ def is_rect_pos(name : str) -> bool:
 
 class AnimationTrack:
     elements : list['AnimationTrack'] = []
-    def __init__(self, owner : 'Sprite', data : list[dict], name : str|None = None, time_source : Callable[[], float]|None = None, timer_factor : float = 1):
+    #Registered tracks that are only waiting, in one heap of (wake time, token, track) per time source
+    sleeping : dict[Callable[[], float], list[tuple[float, int, 'AnimationTrack']]] = {}
+    _sleep_counter : int = 0
+    #Lazy tracks with image or rotation work held back while their target was off screen
+    deferred : set['AnimationTrack'] = set()
+    #Step used by seek past the furthest point a track has been played to
+    SEEK_STEP : float = 1 / 60
+    def __init__(self, owner : 'Sprite', data : 'list[dict]|AnimationProgram', name : str|None = None, time_source : Callable[[], float]|None = None, 
+                 timer_factor : float = 1, lazy : bool = False):
         self.target : Sprite = owner
         
-        new_data = [None for instruction in data]
-        for i, value in enumerate(data):
-            instruction = AnimationInstruction.new(value)
-            instruction.animation_index = i
-            new_data[i] = instruction
-
-        self.data : list[AnimationInstruction] = new_data
-        self.blocking_tasks : list[AnimationInstruction] = []
-        self.tasks : list[AnimationInstruction] = []
+        self.program : AnimationProgram = data if isinstance(data, AnimationProgram) else AnimationProgram(data, name)
+        self.data : tuple[AnimationInstruction, ...] = self.program.instructions
+        self.states : list[InstructionState] = [InstructionState() for _ in range(self.program.count)]
+        self.cursor : int = 0
+        self.blocking_tasks : dict[int, AnimationInstruction] = {}
+        self.tasks : dict[int, AnimationInstruction] = {}
         self.progress = 0
-        self.count = len(self.data)
+        self.count = self.program.count
 
         self.has_started = False
         self.has_ended= False
@@ -39,20 +51,43 @@ class AnimationTrack:
 
         self.time_source : Callable[[], float]|None = time_source
         self.timer_factor : float = timer_factor
+        #Time source given to the instructions. Seekable tracks use their own clock (see enable_seeking)
+        self.timer_source : Callable[[], float]|None = time_source
+        self.clock_offset : float = 0
+        self.play_start : float = 0
+        self.update_manually : bool = False
+        self.snapshots : list[TrackSnapshot]|None = None
+        self.snapshot_times : list[float] = []
+        self.recorded_until : float = 0
+        #Set by instructions whose result depends on the frames they ran on, so seek does not skip over them
+        self.at_boundary : bool = False
         self.callback : Task|None = None
+        #Run once when the track ends or is stopped (see add_finish_callback)
+        self.finish_callbacks : list[Callable[[], Any]]|None = None
+        self.wake_time : float|None = None
+        self.sleep_token : int = -1
+
+        #While a lazy track's target is off screen, image swaps and rotations are skipped until it can be seen again (see catch_up)
+        self.lazy : bool = lazy
+        self.is_culled : bool = False
+        self.needs_render : bool = False
+        self.deferred_image : pygame.Surface|None = None
     
     def reset(self):
-        instruction : AnimationInstruction
-        for instruction in self.data:
-            instruction.reset()
+        state : InstructionState
+        for state in self.states:
+            state.reset()
         
-        self.blocking_tasks = []
-        self.tasks = []
+        self.cursor = 0
+        self.blocking_tasks = {}
+        self.tasks = {}
         self.progress = 0
         self.count = len(self.data)
 
         self.has_started = False
         self.has_ended= False
+        self.wake_time = None
+        self.sleep_token = -1
     
     def set_time_scale(self, value):
         self.time_scale = value
@@ -62,21 +97,33 @@ class AnimationTrack:
         return self.data[index]
     
     def __delitem__(self, index):
-        del self.data[index]
+        #The program is shared with every other track of the animation, so this track gets its own copy without the instruction
+        source = list(self.program.source)
+        del source[index]
+        self.program = AnimationProgram(source, self.program.name)
+        self.data = self.program.instructions
+        del self.states[index]
+        self.count = self.program.count
+    
+    def get_time_source(self) -> Callable[[], float]:
+        return self.time_source or Timer.time_source
     
     def do_instruction(self, instruction : 'AnimationInstruction', index : int|None = None):
-        instruction.execute(self)
+        instruction.execute(self, self.states[instruction.animation_index])
                 
     
     def play(self, update_manually : bool = False, callback : Task|None = None):
         self.has_started= True
         self.has_ended = False
         self.callback = callback
-        instruction: AnimationInstruction
-        for i, instruction in enumerate(self.data):
-            if self.blocking_tasks: break
-            self.do_instruction(instruction, i)
-            if instruction.has_ended: self.progress += 1
+        self.update_manually = update_manually
+        self.play_start = self.clock()
+        self.start_new_tasks()
+        if self.snapshots is not None:
+            self.snapshots.clear()
+            self.snapshot_times.clear()
+            self.recorded_until = 0
+            self.record_snapshot(0)
         if not update_manually:
             self.register()
     
@@ -85,79 +132,315 @@ class AnimationTrack:
     
     def stop(self):
         self.has_ended = True
-            
+        if self.finish_callbacks: self.run_finish_callbacks()
+    
+    def add_finish_callback(self, callback : Callable[[], Any]):
+        '''callback runs once, when the track ends or is stopped. It runs right away if the track has already ended.'''
+        if self.has_ended and self.has_started: 
+            callback()
+            return
+        if self.finish_callbacks is None: self.finish_callbacks = []
+        self.finish_callbacks.append(callback)
+    
+    def run_finish_callbacks(self):
+        callbacks = self.finish_callbacks
+        self.finish_callbacks = None
+        for callback in callbacks:
+            callback()
+    
+    def __await__(self):
+        '''Lets coroutines run by the TaskScheduler wait for the track with "await track".'''
+        if not (self.has_ended and self.has_started): yield self
+    
+    def start_new_tasks(self):
+        '''Starts instructions from the cursor onwards until one of them blocks.'''
+        data = self.data
+        states = self.states
+        while self.cursor < self.count and not self.blocking_tasks:
+            instruction : AnimationInstruction = data[self.cursor]
+            self.cursor += 1
+            state = states[instruction.animation_index]
+            if state.has_started or state.has_ended: continue
+            if instruction.uses_target and AnimationBatch.pending: AnimationBatch.sync(self.target)
+            instruction.execute(self, state)
+            if state.has_ended: 
+                self.progress += 1
+    
+    def get_wake_time(self) -> float|None:
+        '''Returns the time_source() value before which updating the track can't do anything,
+        or None if it has to be updated every frame.'''
+        if self.tasks or not self.blocking_tasks: return None
+        wake_time : float|None = None
+        for index, instruction in self.blocking_tasks.items():
+            instruction_wake = instruction.get_wake_time(self.states[index])
+            if instruction_wake is None: return None
+            if wake_time is None or instruction_wake < wake_time: wake_time = instruction_wake
+        #Instruction timers of seekable tracks run on the track's clock
+        return wake_time - self.clock_offset
 
     def update(self):
+        if self.wake_time is not None:
+            if self.get_time_source()() < self.wake_time: return
+            self.wake_time = None
         if not self.target.active: self.stop()
         if self.has_ended: return
+        if self.lazy: self.check_culling()
+        if self.snapshots is not None: progress, cursor = self.progress, self.cursor
 
-        to_delete = []
-        instruction: AnimationInstruction
-        for i, instruction in enumerate(self.data): #this loop starting new tasks
-            if self.blocking_tasks: 
-                break #cant start new tasks when there's a blocking task
-            if instruction.has_started: continue #Already being handled by self.tasks
-            if instruction.has_ended: continue #Already finished
-            self.do_instruction(instruction, i)
-            if instruction.has_ended: 
-                self.progress += 1
-                #print(f'Progress made : {self.progress}/{self.count} (type = {instruction.type})')
-                
-        to_delete = []
+        states = self.states
+        self.start_new_tasks()
 
-        for instruction in self.blocking_tasks: #this loop is for blocking tasks
-            if instruction.has_ended: 
-                to_delete.append(instruction) #Uncessary guard clause
+        to_delete : list[int] = []
+        for index, instruction in self.blocking_tasks.items(): #this loop is for blocking tasks
+            state = states[index]
+            if state.has_ended: 
+                to_delete.append(index) #Uncessary guard clause
                 continue
 
-            self.do_instruction(instruction)
-            if instruction.has_ended: 
-                to_delete.append(instruction)
+            if instruction.uses_target and AnimationBatch.pending: AnimationBatch.sync(self.target)
+            instruction.execute(self, state)
+            if state.has_ended: 
+                to_delete.append(index)
                 self.progress += 1
-                #print(f'Progress made : {self.progress}/{self.count} (type = {instruction.type})')
-                
         
-        for instruction in to_delete:
-            self.blocking_tasks.remove(instruction)
+        for index in to_delete:
+            del self.blocking_tasks[index]
         
-        to_delete = []
-        for i, instruction in enumerate(self.tasks): #this loop is for already running tasks
-            if instruction.has_ended: 
-                to_delete.append(instruction) #Uncessary guard clause
+        to_delete.clear()
+        for index, instruction in self.tasks.items(): #this loop is for already running tasks
+            state = states[index]
+            if state.has_ended: 
+                to_delete.append(index) #Uncessary guard clause
                 continue
 
-            self.do_instruction(instruction, i)
-            if instruction.has_ended:
-                to_delete.append(instruction)
+            if instruction.uses_target and AnimationBatch.pending: AnimationBatch.sync(self.target)
+            instruction.execute(self, state)
+            if state.has_ended:
+                to_delete.append(index)
                 self.progress += 1
-                #print(f'Progress made : {self.progress}/{self.count} (type = {instruction.type})')
 
-        for instruction in to_delete:
-            self.tasks.remove(instruction)
+        for index in to_delete:
+            del self.tasks[index]
+        
+        if self.snapshots is not None: self.check_snapshot(progress, cursor)
 
         if self.progress >= self.count: 
             self.has_ended = True
             if self.callback: self.callback.execute()
+            if self.finish_callbacks: self.run_finish_callbacks()
+            return
+        self.wake_time = self.get_wake_time()
+    
+    def clock(self) -> float:
+        return self.get_time_source()() + self.clock_offset
+    
+    def set_clock(self, time : float):
+        '''Shifts the track's clock so that it reads time seconds (in track time) after play.'''
+        self.clock_offset += self.play_start + time / self.timer_factor - self.clock()
+    
+    def get_elapsed(self) -> float:
+        return (self.clock() - self.play_start) * self.timer_factor
+    
+    def enable_seeking(self):
+        '''Call before play. The track then records snapshots at instruction boundaries the first time it plays through them.'''
+        self.snapshots = []
+        self.timer_source = self.clock
+    
+    def record_snapshot(self, time : float):
+        if AnimationBatch.pending: AnimationBatch.sync(self.target)
+        self.snapshots.append(TrackSnapshot(self))
+        self.snapshot_times.append(time)
+    
+    def check_snapshot(self, progress : int, cursor : int):
+        elapsed = self.get_elapsed()
+        if elapsed <= self.recorded_until: return
+        self.recorded_until = elapsed
+        if progress != self.progress or cursor != self.cursor or self.at_boundary: self.record_snapshot(elapsed)
+        self.at_boundary = False
+    
+    def seek(self, time : float):
+        '''Jumps to time seconds after play. Restores the last snapshot before time and evaluates the running instructions once,
+        so the cost does not depend on how far the jump is. Past the furthest point played so far, the track is stepped forward
+        SEEK_STEP at a time (recording the snapshots it finds), so instructions may end up to a step apart from a live playthrough.
+        Needs enable_seeking to be called before play.'''
+        if not self.snapshots:
+            print('AnimationError: Call enable_seeking before playing a track to seek it')
+            return
+        if time < 0: time = 0
+        if AnimationBatch.pending: AnimationBatch.sync(self.target)
+        index = bisect_right(self.snapshot_times, time) - 1
+        self.snapshots[index].restore(self)
+        if not self.update_manually:
+            self.sleep_token = -1 #Drops the track from the sleeping heap, if it was there
+            if self not in AnimationTrack.elements: AnimationTrack.elements.append(self)
+        
+        start_time = step_time = self.snapshot_times[index]
+        steps = 0
+        while time > self.recorded_until and step_time + AnimationTrack.SEEK_STEP < time and not self.has_ended:
+            steps += 1
+            step_time = start_time + steps * AnimationTrack.SEEK_STEP
+            self.set_clock(step_time)
+            self.wake_time = None
+            self.update()
+        self.set_clock(time)
+        self.wake_time = None
+        if time != step_time and not self.has_ended: self.update() #Otherwise exactly on a snapshot
+        if AnimationBatch.pending: AnimationBatch.sync(self.target)
+    
+    def check_culling(self):
+        if AnimationBatch.pending: AnimationBatch.sync(self.target)
+        self.is_culled = not self.target.is_visible()
+        if not self.is_culled and self.needs_render: self.catch_up()
+    
+    def defer(self):
+        if self.needs_render: return
+        self.needs_render = True
+        AnimationTrack.deferred.add(self)
+    
+    def get_target_image(self) -> pygame.Surface:
+        return self.target.image if self.deferred_image is None else self.deferred_image
+    
+    def set_target_angle(self, angle : float):
+        '''Rotates the target. While it is culled, only its pivot (and so its position) and the size of its rect are updated.'''
+        if self.is_culled:
+            target = self.target
+            target.pivot.angle = angle
+            target.rect.size = target.get_rotated_size()
+            target.align_rect()
+            self.defer()
+        else:
+            self.target.angle = angle
+    
+    def catch_up(self):
+        '''Applies the image and rotation work that was skipped while the target was off screen, for the current time.'''
+        if not self.needs_render: return
+        self.needs_render = False
+        target = self.target
+        for index, instruction in self.tasks.items():
+            instruction.catch_up(self, self.states[index])
+        if self.deferred_image is not None:
+            target.image = self.deferred_image
+            self.deferred_image = None
+        if target.pivot: target.angle = target.angle
+    
+    @classmethod
+    def catch_up_visible(cls):
+        '''Catches up deferred tracks whose target came back on screen, including tracks that are sleeping or have ended.'''
+        for track in list(cls.deferred):
+            target = track.target
+            if not track.needs_render or target.rect is None:
+                cls.deferred.discard(track)
+            elif target.is_visible():
+                track.catch_up()
+                cls.deferred.discard(track)
+            elif track.has_ended and not target.active:
+                track.needs_render = False
+                cls.deferred.discard(track)
+    
+    def sleep(self):
+        '''Moves a registered track that has a wake time out of the per-frame list until it is due.'''
+        AnimationTrack._sleep_counter += 1
+        self.sleep_token = AnimationTrack._sleep_counter
+        heap = AnimationTrack.sleeping.setdefault(self.get_time_source(), [])
+        heappush(heap, (self.wake_time, self.sleep_token, self))
+    
+    @classmethod
+    def wake_due_tracks(cls):
+        for time_source, heap in cls.sleeping.items():
+            if not heap: continue
+            now = time_source()
+            while heap and heap[0][0] <= now:
+                wake_time, token, track = heappop(heap)
+                if token != track.sleep_token: continue #Track was reset or replayed while sleeping
+                track.sleep_token = -1
+                track.wake_time = None
+                if not track.has_ended: cls.elements.append(track)
     
     @classmethod
     def update_all_elements(cls):
-        to_del : list[AnimationTrack] = []
+        cls.wake_due_tracks()
+        element : AnimationTrack
         for element in cls.elements:
             element.update()
-            if element.has_ended:
-                to_del.append(element)
-        for element in to_del:
-            cls.elements.remove(element)
-        to_del.clear()
+        if AnimationBatch.enabled: AnimationBatch.flush()
+        if cls.deferred: cls.catch_up_visible()
+        if not cls.elements: return
+        still_running : list[AnimationTrack] = []
+        for element in cls.elements:
+            if element.has_ended: continue
+            if element.wake_time is not None:
+                element.sleep()
+            else:
+                still_running.append(element)
+        cls.elements[:] = still_running
         
 
+BatchEntry = tuple['AnimationInstruction', AnimationTrack, 'InstructionState', float]
 
+class AnimationBatch:
+    '''Engine mode for time based instructions (slide_by, slide_to, rotate_by_over_time, rotate_to_over_time).
+    While enabled, those instructions only work out their alpha when executed; the easing and lerp of every track
+    are then evaluated together as NumPy array operations when the frame's animations are flushed, and written back to the targets
+    in the order the instructions ran, so the result is the same as without batching.
+    Instructions that use a target with queued writes (see AnimationInstruction.uses_target) flush the batch first.
+    Requires NumPy, see AnimationBatch.enable.'''
+    enabled : bool = False
+    entries : list[BatchEntry] = []
+    #ids of the targets that have queued writes
+    pending : set[int] = set()
 
-class AnimationInstruction:
-    def __init__(self, data):
-        self.type : str = data["type"]
-        self.data : dict = data
+    @classmethod
+    def enable(cls, value : bool = True) -> bool:
+        '''Returns False (and stays disabled) if NumPy is not available.'''
+        if value and numpy is None: return False
+        if not value: cls.flush()
+        cls.enabled = value
+        return True
 
+    @classmethod
+    def add(cls, instruction : 'AnimationInstruction', track : AnimationTrack, state : 'InstructionState', alpha : float):
+        cls.entries.append((instruction, track, state, alpha))
+        cls.pending.add(id(track.target))
+    
+    @classmethod
+    def sync(cls, target : 'Sprite'):
+        '''Flushes the batch if target has queued writes, so it can be read or written in order.'''
+        if id(target) in cls.pending: cls.flush()
+    
+    @staticmethod
+    def ease(easing_style : Callable[[float], float], alphas : list[float]) -> 'numpy.ndarray':
+        return interpolation.ease_array(easing_style, alphas)
+
+    @classmethod
+    def flush(cls):
+        '''Evaluates every queued instruction, then applies the results in queue order.'''
+        if not cls.entries: return
+        entries = cls.entries
+        cls.entries = []
+        cls.pending.clear()
+        groups : dict[tuple[type, Callable[[float], float]], list[int]] = {}
+        for i, entry in enumerate(entries):
+            key = (entry[0].__class__, entry[0].easing_style)
+            group = groups.get(key, None)
+            if group is None: groups[key] = group = []
+            group.append(i)
+        
+        values : list[Any] = [None] * len(entries)
+        for (instruction_type, easing_style), group in groups.items():
+            group_entries = [entries[i] for i in group]
+            results = instruction_type.evaluate_batch(group_entries, cls.ease(easing_style, [entry[3] for entry in group_entries]))
+            for i, value in zip(group, results):
+                values[i] = value
+        
+        #Entries of the same state (from several updates in one frame, e.g. while seeking) chain through the state's last_value
+        for (instruction, track, state, _), value in zip(entries, values):
+            instruction.apply_value(track, state, value)
+
+
+class InstructionState:
+    '''Per-track progress of one instruction. This is the only part of an animation that each track allocates.'''
+    __slots__ = ('has_started', 'has_ended', 'start_value', 'last_update', 'last_value', 'timer')
+    def __init__(self) -> None:
         self.has_started : bool = False
         self.has_ended : bool = False
 
@@ -165,22 +448,121 @@ class AnimationInstruction:
         self.last_update : Any|None = None
         self.last_value : Any|None = None
         self.timer : Timer|None = None
+    
+    def reset(self):
+        self.has_started = False
+        self.has_ended = False
+
+        self.start_value = None
+        self.last_update = None
+        self.last_value = None
+        self.timer = None
+    
+    def copy(self) -> 'InstructionState':
+        new_state = InstructionState()
+        new_state.has_started = self.has_started
+        new_state.has_ended = self.has_ended
+        new_state.start_value = copy_state_value(self.start_value)
+        new_state.last_update = copy_state_value(self.last_update)
+        new_state.last_value = copy_state_value(self.last_value)
+        new_state.timer = copy.copy(self.timer)
+        return new_state
+
+
+def copy_state_value(value : Any) -> Any:
+    '''Copies the mutable values instructions keep in their state, so that a snapshot does not change as the track plays on.'''
+    if isinstance(value, (pygame.Vector2, pygame.Rect, list)): return value.copy()
+    if isinstance(value, (FramePlayer, TweenModule.TweenTrack)):
+        new_value = copy.copy(value)
+        if new_value.timer is not None: new_value.timer = copy.copy(new_value.timer)
+        if isinstance(new_value, TweenModule.TweenTrack): new_value.reusable_timer = new_value.timer
+        return new_value
+    return value
+
+
+class TrackSnapshot:
+    '''Progress of a track and the state of its target at one point in time. Used by AnimationTrack.seek.'''
+    __slots__ = ('cursor', 'progress', 'has_ended', 'blocking_tasks', 'tasks', 'states', 
+                 'position', 'angle', 'image', 'rect', 'original_image', 'img_colorkey')
+    def __init__(self, track : AnimationTrack) -> None:
+        self.cursor : int = track.cursor
+        self.progress : int = track.progress
+        self.has_ended : bool = track.has_ended
+        self.blocking_tasks : tuple[tuple[int, AnimationInstruction], ...] = tuple(track.blocking_tasks.items())
+        self.tasks : tuple[tuple[int, AnimationInstruction], ...] = tuple(track.tasks.items())
+        self.states : list[InstructionState] = [state.copy() for state in track.states]
+
+        target = track.target
+        self.position : pygame.Vector2 = target.position.copy()
+        self.image : pygame.Surface = track.get_target_image()
+        self.rect : pygame.Rect = target.rect.copy()
+        pivot = target.pivot
+        self.angle : float = pivot.angle if pivot else 0
+        self.original_image : pygame.Surface|None = pivot.original_image if pivot else None
+        self.img_colorkey : ColorType|None = pivot.img_colorkey if pivot else None
+    
+    def restore(self, track : AnimationTrack):
+        track.cursor = self.cursor
+        track.progress = self.progress
+        track.has_ended = self.has_ended
+        track.blocking_tasks = dict(self.blocking_tasks)
+        track.tasks = dict(self.tasks)
+        track.states = [state.copy() for state in self.states]
+        track.deferred_image = None
+        track.needs_render = False
+
+        target = track.target
+        pivot = target.pivot
+        if pivot:
+            pivot.original_image = self.original_image
+            pivot.img_colorkey = self.img_colorkey
+            pivot.angle = self.angle
+        target.position = self.position.copy()
+        target.image = self.image
+        target.rect = self.rect.copy()
+
+
+class AnimationProgram:
+    '''Animation data compiled once into instruction specs.
+    A program is shared by every track playing it and must not be modified; per-track progress lives in InstructionState.'''
+    __slots__ = ('source', 'instructions', 'count', 'name')
+    def __init__(self, data : list[dict], name : str|None = None) -> None:
+        self.source : tuple[dict, ...] = tuple(data)
+        self.name : str|None = name
+        instructions : list[AnimationInstruction] = []
+        for i, value in enumerate(data):
+            instruction = AnimationInstruction.new(value)
+            instruction.animation_index = i
+            instructions.append(instruction)
+        self.instructions : tuple[AnimationInstruction, ...] = tuple(instructions)
+        self.count : int = len(self.instructions)
+
+
+class AnimationInstruction:
+    '''Compiled, read-only description of one animation step. Its state for a given track is passed to execute.'''
+    __slots__ = ('type', 'data', 'animation_index')
+    #False for instructions that never read or write the target when executed, so queued AnimationBatch writes don't need flushing first
+    uses_target : bool = True
+    def __init__(self, data):
+        self.type : str = data["type"]
+        self.data : dict = data
         self.animation_index : int
     
     
     def get_anchor(self, sprite : 'Sprite', anchor : str|None) -> pygame.Vector2:
+        #Copies, since sprites move their position vector in place
         if anchor is None:
-            return sprite.position
+            return sprite.position.copy()
         elif anchor == 'true':
-            return sprite.true_position
+            return sprite.true_position.copy()
         else:
             return pygame.Vector2(sprite.rect.__getattribute__(anchor))
     
     def set_anchor(self, sprite : 'Sprite', anchor : str|None, position : pygame.Vector2):
         if anchor is None:
-            sprite.position = position
+            sprite.position = pygame.Vector2(position)
         elif anchor == 'true':
-            sprite.true_position = position
+            sprite.true_position = pygame.Vector2(position)
         else:
             sprite.move_rect(anchor, position)
     
@@ -198,102 +580,125 @@ class AnimationInstruction:
     
     @staticmethod
     def new(data : dict) -> 'AnimationInstruction':
-        anim_conversion_dict : dict[str, AnimationInstruction] = {
-            "wait" : WaitInstruction,
-            "delay" : DelayInstruction,
-            'delay_rel' : DelayRelInstruction,
-            "move_to" : MoveToInstruction,
-            "move_by" : MoveByInstruction,
-            "slide_by" : SlideByInstruction,
-            "slide_to" : SlideToInstruction,
-            "switch_image" : SwitchImageInstruction,
-            "rotate_by" : RotateByInstruction,
-            "rotate_to" : RotateToInstruction,
-            "rotate_by_over_time" : RotateByOverTimeInstruction,
-            "rotate_to_over_time" : RotateToOverTimeInstruction,
-            "image_gradient" : ImageGradientInstruction,
-            "tween_property" : TweenPropertyInstruction,
-        }
         instruction_type : str = data['type']
-        if instruction_type in anim_conversion_dict:
-            return (anim_conversion_dict[instruction_type])(data)
+        if instruction_type in INSTRUCTION_TYPES:
+            return (INSTRUCTION_TYPES[instruction_type])(data)
         else:
             return AnimationInstruction(data)
     
-    def execute(self, track : AnimationTrack):
+    def execute(self, track : AnimationTrack, state : InstructionState):
+        pass
+    
+    def get_wake_time(self, state : InstructionState) -> float|None:
+        '''Time source value before which executing this instruction again can't change anything. None means every frame.'''
+        return None
+    
+    def catch_up(self, track : AnimationTrack, state : InstructionState):
+        '''Called on running instructions when a lazy track catches up. Only needed for instructions that defer their own work.'''
         pass
+    
+    def defer_image(self, track : AnimationTrack, new_image : pygame.Surface, rotate_first : bool = False):
+        '''Off screen version of an image swap (needs anchor and colorkey). The rect and pivot follow the new image right away,
+        the image itself and the rotation are applied when the track catches up.
+        rotate_first tells whether the visible swap rotates the new image before moving it to the anchor or after.'''
+        target = track.target
+        old_pos = None if self.anchor is None else self.get_any_anchor(target, self.anchor)
+        if self.colorkey: new_image.set_colorkey(self.colorkey)
+        elif self.colorkey == 0: new_image.set_colorkey(None)
+        if target.pivot:
+            target.pivot.original_image = new_image
+            if self.colorkey is None:
+                pass
+            elif self.colorkey == 0:
+                target.pivot.img_colorkey = None
+            else:
+                target.pivot.img_colorkey = self.colorkey
         
-    def reset(self):
-        self.has_started = False
-        self.has_ended = False
-
-        self.start_value = None
-        self.last_update = None
-        self.last_value = None
-        self.timer = None
+        target.rect = new_image.get_rect()
+        if target.pivot and rotate_first:
+            target.rect.size = target.get_rotated_size()
+            target.align_rect()
+        if self.anchor is None:
+            target.align_rect()
+        else:
+            target.move_rect(self.anchor, old_pos)
+        if target.pivot and not rotate_first:
+            target.rect.size = target.get_rotated_size()
+            target.align_rect()
+        track.deferred_image = new_image
+        track.defer()
 
 
 class WaitInstruction(AnimationInstruction):
-
+    __slots__ = ('time',)
+    uses_target : bool = False
     def __init__(self, data):
         super().__init__(data)
         self.time : float = data['time']
 
-    def execute(self, track: AnimationTrack, current_index : int|None = None):
-        if not self.has_started:
-            self.has_started = True
-            self.timer = Timer(self.time, track.time_source, track.timer_factor)
-            track.blocking_tasks.append(self)
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        if not state.has_started:
+            state.has_started = True
+            state.timer = Timer(self.time, track.timer_source, track.timer_factor)
+            track.blocking_tasks[self.animation_index] = self
 
-        if self.timer.isover():
-            self.has_ended = True
+        if state.timer.isover():
+            state.has_ended = True
         return
+    
+    def get_wake_time(self, state : InstructionState) -> float|None:
+        return state.timer.get_end_time()
 
 class DelayInstruction(AnimationInstruction):
+    __slots__ = ('indexes',)
+    uses_target : bool = False
     def __init__(self, data):
         super().__init__(data)
         indexes : int|list[int] = data["index"]
         self.indexes : list[int] = [indexes] if type(indexes) == int else indexes
     
-    def execute(self, track: AnimationTrack, current_index : int|None = None):
-        if not self.has_started:
-            self.has_started = True
-            track.blocking_tasks.append(self)
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        if not state.has_started:
+            state.has_started = True
+            track.blocking_tasks[self.animation_index] = self
         
         for index in self.indexes:
-            if not track.data[index].has_ended: return     
-        self.has_ended = True
+            if not track.states[index].has_ended: return     
+        state.has_ended = True
 
 class DelayRelInstruction(AnimationInstruction):
+    __slots__ = ('indexes',)
+    uses_target : bool = False
     def __init__(self, data):
         super().__init__(data)
         indexes : int|list[int] = data["index"]
         self.indexes : list[int] = [indexes] if type(indexes) == int else indexes
     
-    def execute(self, track: AnimationTrack, current_index : int|None = None):
-        if not self.has_started:
-            self.has_started = True
-            track.blocking_tasks.append(self)
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        if not state.has_started:
+            state.has_started = True
+            track.blocking_tasks[self.animation_index] = self
         
         for index in self.indexes:
             target_index = self.animation_index + index
             if target_index < 0: target_index = f"Target index went below 0 ({target_index})"
-            if not track.data[target_index].has_ended: return     
-        self.has_ended = True
+            if not track.states[target_index].has_ended: return     
+        state.has_ended = True
 
 class MoveByInstruction(AnimationInstruction):
+    __slots__ = ('offset',)
     def __init__(self, data):
         super().__init__(data)
         self.offset : pygame.Vector2 = pygame.Vector2(data['offset'])
-        self.last_value : None|pygame.Vector2 = None
     
-    def execute(self, track: AnimationTrack, current_index : int|None = None):
-        self.has_started = True
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        state.has_started = True
         track.target.position += self.offset
-        self.has_ended = True
+        state.has_ended = True
         return
 
 class MoveToInstruction(AnimationInstruction):
+    __slots__ = ('anchor', 'target')
     def __init__(self, data):
         super().__init__(data)
         self.anchor : str|None = data['anchor']
@@ -305,51 +710,60 @@ class MoveToInstruction(AnimationInstruction):
         else:
             self.target = pygame.Vector2(target)
     
-    def execute(self, track: AnimationTrack, current_index : int|None = None):
-        self.has_started = True
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        state.has_started = True
         self.set_any_anchor(track.target, self.anchor, self.target)
-        self.has_ended = True
+        state.has_ended = True
         return
 
 class SlideByInstruction(AnimationInstruction):
+    __slots__ = ('offset', 'time', 'easing_style')
+    uses_target : bool = False
     def __init__(self, data):
         super().__init__(data)
         self.offset : pygame.Vector2 = pygame.Vector2(data['offset'])
         self.time : float = data['time']
-        self.easing_style : Callable[[float], float]
-        easing_style : str|Callable[[float], float] = data['easing_style']
-        if type(easing_style) == str: 
-            self.easing_style = getattr(interpolation, easing_style)
-        else:
-            self.easing_style = easing_style
+        self.easing_style : Callable[[float], float] = interpolation.get_easing(data['easing_style'])
     
-    def execute(self, track: AnimationTrack, current_index : int|None = None):
-        if self.has_ended: return
-        if not self.has_started:
-            self.has_started = True
-            track.tasks.append(self)
-            self.timer = Timer(self.time, track.time_source, track.timer_factor)
-            self.start_value = pygame.Vector2(track.target.position)
-            self.last_value = pygame.Vector2(0,0)    
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        if state.has_ended: return
+        if not state.has_started:
+            state.has_started = True
+            track.tasks[self.animation_index] = self
+            state.timer = Timer(self.time, track.timer_source, track.timer_factor)
+            if AnimationBatch.pending: AnimationBatch.sync(track.target)
+            state.start_value = pygame.Vector2(track.target.position)
+            state.last_value = pygame.Vector2(0,0)    
             return
         
         
-        alpha = self.timer.get_time() / self.timer.duration
+        alpha = state.timer.get_time() / state.timer.duration
         if alpha > 1: 
             alpha = 1
-            self.has_ended = True
+            state.has_ended = True
         
-        new_offset : pygame.Vector2 = interpolation.compatibilty_lerp(pygame.Vector2(0, 0), self.offset, self.easing_style(alpha))
-        prev_offset : pygame.Vector2 = self.last_value
+        if AnimationBatch.enabled: return AnimationBatch.add(self, track, state, alpha)
+        self.apply(track, state, self.easing_style(alpha))
+    
+    def apply(self, track : AnimationTrack, state : 'InstructionState', eased_alpha : float):
+        self.apply_value(track, state, interpolation.lerp_arithmetic(pygame.Vector2(0, 0), self.offset, eased_alpha))
+    
+    def apply_value(self, track : AnimationTrack, state : 'InstructionState', new_offset : pygame.Vector2):
+        prev_offset : pygame.Vector2 = state.last_value
         result : pygame.Vector2 = new_offset - prev_offset
 
         
         track.target.position += result
-        self.last_value = new_offset
-
-        return
+        state.last_value = new_offset
+    
+    @staticmethod
+    def evaluate_batch(entries : list['BatchEntry'], eased : 'numpy.ndarray') -> list[pygame.Vector2]:
+        offsets = numpy.array([(entry[0].offset.x, entry[0].offset.y) for entry in entries])
+        return [pygame.Vector2(new_offset) for new_offset in (offsets * eased[:, None]).tolist()]
 
 class SlideToInstruction(AnimationInstruction):
+    __slots__ = ('anchor', 'target', 'time', 'easing_style')
+    uses_target : bool = False
     def __init__(self, data):
         super().__init__(data)
         self.anchor : str|None = data['anchor']
@@ -363,30 +777,44 @@ class SlideToInstruction(AnimationInstruction):
             self.target = pygame.Vector2(target)
         
         self.time : float = data['time']
-        self.easing_style : Callable[[float], float]
-        easing_style : str|Callable[[float], float] = data['easing_style']
-        if type(easing_style) == str: 
-            self.easing_style = getattr(interpolation, easing_style)
-        else:
-            self.easing_style = easing_style
+        self.easing_style : Callable[[float], float] = interpolation.get_easing(data['easing_style'])
     
-    def execute(self, track: AnimationTrack, current_index : int|None = None):
-        if not self.has_started:
-            self.has_started = True
-            track.tasks.append(self)
-            self.timer = Timer(self.time, track.time_source, track.timer_factor)
-            self.start_value = self.get_any_anchor(track.target, self.anchor)
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        if not state.has_started:
+            state.has_started = True
+            track.tasks[self.animation_index] = self
+            state.timer = Timer(self.time, track.timer_source, track.timer_factor)
+            if AnimationBatch.pending: AnimationBatch.sync(track.target)
+            state.start_value = self.get_any_anchor(track.target, self.anchor)
         
-        alpha = self.timer.get_time() / self.timer.duration
+        alpha = state.timer.get_time() / state.timer.duration
         if alpha > 1: 
             alpha = 1
-            self.has_ended = True
+            state.has_ended = True
 
-        new_pos : pygame.Vector2|int = interpolation.lerp(self.start_value, self.target, self.easing_style(alpha))
+        if AnimationBatch.enabled: return AnimationBatch.add(self, track, state, alpha)
+        self.apply(track, state, self.easing_style(alpha))
+    
+    def apply(self, track : AnimationTrack, state : 'InstructionState', eased_alpha : float):
+        new_pos : pygame.Vector2|int = interpolation.lerp(state.start_value, self.target, eased_alpha)
         self.set_any_anchor(track.target, self.anchor, new_pos)
-        return
+    
+    def apply_value(self, track : AnimationTrack, state : 'InstructionState', new_pos : pygame.Vector2|int):
+        self.set_any_anchor(track.target, self.anchor, new_pos)
+    
+    @staticmethod
+    def evaluate_batch(entries : list['BatchEntry'], eased : 'numpy.ndarray') -> list[pygame.Vector2|float]:
+        #Rect sides slide a single number, every other anchor slides a position
+        is_vector = [type(entry[0].target) == pygame.Vector2 for entry in entries]
+        starts = numpy.array([(entry[2].start_value[0], entry[2].start_value[1]) if vector else (entry[2].start_value, 0)
+                              for entry, vector in zip(entries, is_vector)])
+        targets = numpy.array([(entry[0].target[0], entry[0].target[1]) if vector else (entry[0].target, 0)
+                               for entry, vector in zip(entries, is_vector)])
+        results = (starts + (targets - starts) * eased[:, None]).tolist()
+        return [pygame.Vector2(x, y) if vector else x for vector, (x, y) in zip(is_vector, results)]
 
 class SwitchImageInstruction(AnimationInstruction):
+    __slots__ = ('source_name', 'index', 'anchor', 'colorkey')
     def __init__(self, data):
         super().__init__(data)
         self.source_name : str = data['source']
@@ -394,12 +822,16 @@ class SwitchImageInstruction(AnimationInstruction):
         self.anchor : str|None = data['dynamic_anchor']
         self.colorkey : str|ColorType|None = data['colorkey']
     
-    def execute(self, track: AnimationTrack, current_index : int|None = None):
-        self.has_started = True
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        state.has_started = True
         old_pos = None if self.anchor is None else self.get_any_anchor(track.target, self.anchor)
 
         source : dict[Any, pygame.Surface] = track.target.__getattribute__(self.source_name)
         new_image : pygame.Surface = source[self.index]
+        if track.is_culled:
+            self.defer_image(track, new_image)
+            state.has_ended = True
+            return
         if self.colorkey: new_image.set_colorkey(self.colorkey)
         elif self.colorkey == 0: new_image.set_colorkey(None)
 
@@ -422,95 +854,118 @@ class SwitchImageInstruction(AnimationInstruction):
         if track.target.pivot:
             track.target.angle = track.target.angle
 
-        self.has_ended = True
+        state.has_ended = True
         return
 
 class RotateByInstruction(AnimationInstruction):
+    __slots__ = ('target_angle',)
     def __init__(self, data):
         super().__init__(data)
         self.target_angle : float = data['angle']
     
-    def execute(self, track: AnimationTrack, current_index : int|None = None):
-        self.has_started = True
-        track.target.angle += self.target_angle
-        self.has_ended = True
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        state.has_started = True
+        track.set_target_angle(track.target.angle + self.target_angle)
+        state.has_ended = True
         return
 
 class RotateToInstruction(AnimationInstruction):
+    __slots__ = ('target_angle',)
     def __init__(self, data):
         super().__init__(data)
         self.target_angle : float = data['angle']
     
-    def execute(self, track: AnimationTrack, current_index : int|None = None):
-        self.has_started = True
-        track.target.angle = self.target_angle
-        self.has_ended = True
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        state.has_started = True
+        track.set_target_angle(self.target_angle)
+        state.has_ended = True
         return
 
 class RotateByOverTimeInstruction(AnimationInstruction):
+    __slots__ = ('target_angle', 'time', 'easing_style')
+    uses_target : bool = False
     def __init__(self, data):
         super().__init__(data)
         self.target_angle : float = data['angle']
         self.time : float = data['time']
-        self.easing_style : Callable[[float], float]
-        easing_style : str|Callable[[float], float] = data['easing_style']
-        if type(easing_style) == str: 
-            self.easing_style = getattr(interpolation, easing_style)
-        else:
-            self.easing_style = easing_style
-    
-    def execute(self, track: AnimationTrack, current_index : int|None = None):
-        if not self.has_started:
-            self.has_started = True
-            track.tasks.append(self)
-            self.timer = Timer(self.time, track.time_source, track.timer_factor)
-            self.start_value = track.target.angle
-            self.last_value = 0.0    
+        self.easing_style : Callable[[float], float] = interpolation.get_easing(data['easing_style'])
+    
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        if not state.has_started:
+            state.has_started = True
+            track.tasks[self.animation_index] = self
+            state.timer = Timer(self.time, track.timer_source, track.timer_factor)
+            if AnimationBatch.pending: AnimationBatch.sync(track.target)
+            state.start_value = track.target.angle
+            state.last_value = 0.0    
             return
         
         
-        alpha = self.timer.get_time() / self.timer.duration
+        alpha = state.timer.get_time() / state.timer.duration
         if alpha > 1: 
             alpha = 1
-            self.has_ended = True
+            state.has_ended = True
         
-        new_offset : float = interpolation.lerp(0, self.target_angle, self.easing_style(alpha))
-        prev_offset : float = self.last_value
+        if AnimationBatch.enabled: return AnimationBatch.add(self, track, state, alpha)
+        self.apply(track, state, self.easing_style(alpha))
+    
+    def apply(self, track : AnimationTrack, state : 'InstructionState', eased_alpha : float):
+        self.apply_value(track, state, interpolation.lerp(0, self.target_angle, eased_alpha))
+    
+    def apply_value(self, track : AnimationTrack, state : 'InstructionState', new_offset : float):
+        prev_offset : float = state.last_value
         result : float = new_offset - prev_offset
 
         
-        track.target.angle += result
-        self.last_value = new_offset
+        track.set_target_angle(track.target.angle + result)
+        state.last_value = new_offset
+    
+    @staticmethod
+    def evaluate_batch(entries : list['BatchEntry'], eased : 'numpy.ndarray') -> list[float]:
+        angles = numpy.array([entry[0].target_angle for entry in entries], dtype=float)
+        return (angles * eased).tolist()
     
 class RotateToOverTimeInstruction(AnimationInstruction):
+    __slots__ = ('target_angle', 'time', 'easing_style')
+    uses_target : bool = False
     def __init__(self, data):
         super().__init__(data)
         self.target_angle : float = data['angle']
         self.time : float = data['time']
-        self.easing_style : Callable[[float], float]
-        easing_style : str|Callable[[float], float] = data['easing_style']
-        if type(easing_style) == str: 
-            self.easing_style = getattr(interpolation, easing_style)
-        else:
-            self.easing_style = easing_style
-    
-    def execute(self, track: AnimationTrack, current_index : int|None = None):
-        if not self.has_started:
-            self.has_started = True
-            track.tasks.append(self)
-            self.timer = Timer(self.time, track.time_source, track.timer_factor)
-            self.start_value = track.target.angle
+        self.easing_style : Callable[[float], float] = interpolation.get_easing(data['easing_style'])
+    
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        if not state.has_started:
+            state.has_started = True
+            track.tasks[self.animation_index] = self
+            state.timer = Timer(self.time, track.timer_source, track.timer_factor)
+            if AnimationBatch.pending: AnimationBatch.sync(track.target)
+            state.start_value = track.target.angle
             return
         
         
-        alpha = self.timer.get_time() / self.timer.duration
+        alpha = state.timer.get_time() / state.timer.duration
         if alpha > 1: 
             alpha = 1
-            self.has_ended = True
+            state.has_ended = True
         
-        track.target.angle = interpolation.lerp(self.start_value, self.target_angle, self.easing_style(alpha))
+        if AnimationBatch.enabled: return AnimationBatch.add(self, track, state, alpha)
+        self.apply(track, state, self.easing_style(alpha))
+    
+    def apply(self, track : AnimationTrack, state : 'InstructionState', eased_alpha : float):
+        track.set_target_angle(interpolation.lerp(state.start_value, self.target_angle, eased_alpha))
+    
+    def apply_value(self, track : AnimationTrack, state : 'InstructionState', angle : float):
+        track.set_target_angle(angle)
+    
+    @staticmethod
+    def evaluate_batch(entries : list['BatchEntry'], eased : 'numpy.ndarray') -> list[float]:
+        starts = numpy.array([entry[2].start_value for entry in entries], dtype=float)
+        targets = numpy.array([entry[0].target_angle for entry in entries], dtype=float)
+        return (starts + (targets - starts) * eased).tolist()
 
 class ImageGradientInstruction(AnimationInstruction):
+    __slots__ = ('source_name', 'target_index', 'anchor', 'colorkey', 'time', 'easing_style')
     def __init__(self, data):
         super().__init__(data)
         self.source_name : str = data['source']
@@ -520,31 +975,31 @@ class ImageGradientInstruction(AnimationInstruction):
 
         self.time : float = data['time']
 
-        self.easing_style : Callable[[float], float]
-        easing_style : str|Callable[[float], float] = data['easing_style']
-        if type(easing_style) == str: 
-            self.easing_style = getattr(interpolation, easing_style)
-        else:
-            self.easing_style = easing_style
+        self.easing_style : Callable[[float], float] = interpolation.get_easing(data['easing_style'])
     
-    def execute(self, track: AnimationTrack, current_index : int|None = None):
-        if not self.has_started:
-            self.has_started = True
-            track.tasks.append(self)
-            self.timer = Timer(self.time, track.time_source, track.timer_factor)
-            self.start_value = track.target.image
-            self.last_value = track.target.image
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        if not state.has_started:
+            state.has_started = True
+            track.tasks[self.animation_index] = self
+            state.timer = Timer(self.time, track.timer_source, track.timer_factor)
+            state.start_value = track.get_target_image()
+            state.last_value = state.start_value
 
         
-        alpha = self.timer.get_time() / self.timer.duration
+        alpha = state.timer.get_time() / state.timer.duration
         if alpha > 1: 
             alpha = 1
-            self.has_ended = True
+            state.has_ended = True
 
         
         source : list[pygame.Surface] = track.target.__getattribute__(self.source_name)
         new_image : pygame.Surface = source[int(interpolation.lerp(0, self.target_index, self.easing_style(alpha)))]
-        if new_image == self.last_value: return
+        if new_image == state.last_value: return
+        if track.is_culled:
+            self.defer_image(track, new_image, rotate_first = True)
+            state.last_value = new_image
+            track.at_boundary = True
+            return
 
         old_pos = None if self.anchor is None else self.get_any_anchor(track.target, self.anchor)    
         if self.colorkey: new_image.set_colorkey(self.colorkey)
@@ -570,9 +1025,43 @@ class ImageGradientInstruction(AnimationInstruction):
             track.target.align_rect()
         else:
             track.target.move_rect(self.anchor, old_pos)    
-        self.last_value = new_image
+        state.last_value = new_image
+        #Anchored swaps move the sprite by the size difference, which depends on every swap that happened before
+        track.at_boundary = True
+
+class FrameSequenceInstruction(AnimationInstruction):
+    __slots__ = ('source_name', 'loop', 'ping_pong', 'time')
+    def __init__(self, data):
+        super().__init__(data)
+        self.source_name : str = data['source']
+        self.loop : bool = data.get('loop', False)
+        self.ping_pong : bool = data.get('ping_pong', False)
+        self.time : float|None = data.get('time', None)
+    
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        if not state.has_started:
+            state.has_started = True
+            track.tasks[self.animation_index] = self
+            sequence : FrameSequence = track.target.__getattribute__(self.source_name)
+            state.start_value = FramePlayer(track.target, sequence, self.loop, track.timer_source, track.timer_factor, self.ping_pong)
+            if self.time is not None: state.timer = Timer(self.time, track.timer_source, track.timer_factor)
+        
+        player : FramePlayer = state.start_value
+        is_over : bool = state.timer is not None and state.timer.isover()
+        if track.is_culled and not is_over and not player.is_finishing():
+            track.defer()
+        else:
+            player.update()
+        if state.timer is not None:
+            if is_over: state.has_ended = True
+        elif player.has_ended:
+            state.has_ended = True
+    
+    def catch_up(self, track : AnimationTrack, state : InstructionState):
+        state.start_value.update()
 
 class TweenPropertyInstruction(AnimationInstruction):
+    __slots__ = ('property_name', 'goal', 'time', 'easing_style')
     def __init__(self, data):
         super().__init__(data)
         self.property_name : str = data['property']
@@ -580,26 +1069,139 @@ class TweenPropertyInstruction(AnimationInstruction):
 
         self.time : float = data['time']
 
-        self.easing_style : Callable[[float], float]
-        easing_style : str|Callable[[float], float] = data['easing_style']
-        if type(easing_style) == str: 
-            self.easing_style = getattr(interpolation, easing_style)
-        else:
-            self.easing_style = easing_style
+        self.easing_style : Callable[[float], float] = interpolation.get_easing(data['easing_style'])
     
-    def execute(self, track: AnimationTrack):
-        if not self.has_started:
-            self.has_started = True
-            track.tasks.append(self)
-            self.timer = Timer(self.time, track.time_source, track.timer_factor)
+    def execute(self, track: AnimationTrack, state : 'InstructionState'):
+        if not state.has_started:
+            state.has_started = True
+            track.tasks[self.animation_index] = self
+            state.timer = Timer(self.time, track.timer_source, track.timer_factor)
             new_tween = TweenModule.new_tween(track.target, TweenModule.TweenInfo(self.easing_style, self.time), {self.property_name : self.goal},
-                                              True, True, True, track.time_source, track.timer_factor)
-            self.start_value = new_tween
+                                              True, True, True, track.timer_source, track.timer_factor)
+            state.start_value = new_tween
         
-        tween : TweenModule.TweenTrack = self.start_value
+        tween : TweenModule.TweenTrack = state.start_value
         tween.update()
         if tween.has_finished:
+            state.has_ended = True
+
+INSTRUCTION_TYPES : dict[str, type[AnimationInstruction]] = {
+    "wait" : WaitInstruction,
+    "delay" : DelayInstruction,
+    'delay_rel' : DelayRelInstruction,
+    "move_to" : MoveToInstruction,
+    "move_by" : MoveByInstruction,
+    "slide_by" : SlideByInstruction,
+    "slide_to" : SlideToInstruction,
+    "switch_image" : SwitchImageInstruction,
+    "rotate_by" : RotateByInstruction,
+    "rotate_to" : RotateToInstruction,
+    "rotate_by_over_time" : RotateByOverTimeInstruction,
+    "rotate_to_over_time" : RotateToOverTimeInstruction,
+    "image_gradient" : ImageGradientInstruction,
+    "tween_property" : TweenPropertyInstruction,
+    "frame_sequence" : FrameSequenceInstruction,
+}
+
+
+class FrameSequence:
+    '''Flipbook frames cut from a single sprite sheet.
+    The subsurface views and frame sizes are computed once and shared by every FramePlayer using the sequence.'''
+    def __init__(self, sheet : pygame.Surface, frame_rects : list[pygame.Rect|tuple[int, int, int, int]], fps : float) -> None:
+        self.sheet : pygame.Surface = sheet
+        self.frames : tuple[pygame.Surface, ...] = tuple(sheet.subsurface(rect) for rect in frame_rects)
+        self.sizes : tuple[tuple[int, int], ...] = tuple(frame.get_size() for frame in self.frames)
+        self.uniform_size : bool = all(size == self.sizes[0] for size in self.sizes)
+        self.count : int = len(self.frames)
+        self.fps : float = fps
+        self.duration : float = self.count / fps
+    
+    @classmethod
+    def from_grid(cls, sheet : pygame.Surface, frame_size : tuple[int, int], fps : float, count : int|None = None) -> 'FrameSequence':
+        '''Cuts the sheet into frame_size cells, left to right then top to bottom.'''
+        width, height = frame_size
+        columns, rows = sheet.get_width() // width, sheet.get_height() // height
+        rects = [(column * width, row * height, width, height) for row in range(rows) for column in range(columns)]
+        if count is not None: rects = rects[:count]
+        return FrameSequence(sheet, rects, fps)
+    
+    def get_index(self, elapsed : float, loop : bool, ping_pong : bool = False) -> int:
+        index = int(elapsed * self.fps)
+        if ping_pong and self.count > 1:
+            #One cycle goes 0, 1 ... last ... 1; played once it stops back on frame 0
+            period = 2 * self.count - 2
+            if loop: index %= period
+            elif index >= period: return 0
+            return index if index < self.count else period - index
+        if loop: return index % self.count
+        return index if index < self.count else self.count - 1
+    
+    def get_duration(self, ping_pong : bool = False) -> float:
+        '''How long the sequence plays when it doesn't loop.'''
+        if ping_pong and self.count > 1: return (2 * self.count - 1) / self.fps
+        return self.duration
+
+
+class FramePlayer:
+    '''Plays a FrameSequence on a sprite. A frame change only swaps the sprite's image;
+    the rect is resized only for sequences with frames of different sizes, and rotated sprites still go through their pivot.
+    ping_pong plays the frames forward then backward instead of jumping back to the first one.'''
+    def __init__(self, target : 'Sprite', sequence : FrameSequence, loop : bool = True, 
+                 time_source : Callable[[], float]|None = None, timer_factor : float = 1, ping_pong : bool = False) -> None:
+        self.target : Sprite = target
+        self.sequence : FrameSequence = sequence
+        self.loop : bool = loop
+        self.ping_pong : bool = ping_pong
+        self.duration : float = sequence.get_duration(ping_pong)
+        self.timer : Timer = Timer(-1 if loop else self.duration, time_source, timer_factor)
+        self.index : int = -1
+        self.has_ended : bool = False
+        self.finish_callbacks : list[Callable[[], Any]]|None = None
+    
+    def restart(self):
+        self.timer.restart()
+        self.index = -1
+        self.has_ended = False
+    
+    def is_finishing(self) -> bool:
+        '''True if the next update reaches the end of a non looping sequence.'''
+        return not self.loop and not self.has_ended and self.timer.get_time() >= self.duration
+    
+    def add_finish_callback(self, callback : Callable[[], Any]):
+        '''callback runs once, when a non looping sequence shows its last frame. It runs right away if that already happened.'''
+        if self.has_ended:
+            callback()
+            return
+        if self.finish_callbacks is None: self.finish_callbacks = []
+        self.finish_callbacks.append(callback)
+    
+    def run_finish_callbacks(self):
+        callbacks = self.finish_callbacks
+        self.finish_callbacks = None
+        for callback in callbacks:
+            callback()
+    
+    def update(self):
+        if self.has_ended: return
+        elapsed = self.timer.get_time()
+        if not self.loop and elapsed >= self.duration:
             self.has_ended = True
+        index = self.sequence.get_index(elapsed, self.loop, self.ping_pong)
+        if index != self.index: self.set_frame(index)
+        if self.has_ended and self.finish_callbacks: self.run_finish_callbacks()
+    
+    def set_frame(self, index : int):
+        target = self.target
+        sequence = self.sequence
+        frame = sequence.frames[index]
+        target.image = frame
+        if target.pivot:
+            target.pivot.original_image = frame
+            target.angle = target.angle
+        elif self.index < 0 or not sequence.uniform_size:
+            target.rect.size = sequence.sizes[index]
+            target.align_rect()
+        self.index = index
 
 
 TEMPLATES = [
@@ -623,6 +1225,7 @@ TEMPLATES = [
     {"type" : "image_gradient", "source" : "source_name", "target_index" : 0, "time" : 0, "easing_style" : interpolation.linear, 'dynamic_anchor' : 'rect_attr/none',
     'colorkey' : 'color or none'},
     {"type" : "tween_property", "property" : "", "goal" : 0, "time" : 0, "easing_style" : interpolation.linear},
+    {"type" : "frame_sequence", "source" : "FrameSequence attribute name", "loop" : False, "ping_pong" : False, "time" : None}, #time None plays the sequence once (or forever if loop)
     #{"type" : "set_alpha", "target" : 0}, set_alpha and alpha_gradient are currently unspported with no plan of being brought back
     #{"type" : "alpha_gradient", "target" : 0, "time" : 0, "easing_style" : interpolation.linear},
              ]
@@ -652,11 +1255,16 @@ test_anim = [
 
 class Animation:
     ANIM_DATA = {"test" : test_anim}
+    loaded : dict[str, 'Animation'] = {}
 
     @classmethod
     def get_animation(cls, name):
+        if name in cls.loaded:
+            return cls.loaded[name]
         if name in cls.ANIM_DATA:
-            return Animation(cls.ANIM_DATA[name], name)
+            animation = Animation(cls.ANIM_DATA[name], name)
+            cls.loaded[name] = animation
+            return animation
         else:
             print("AnimationError: Animation not found")
             return None
@@ -665,9 +1273,10 @@ class Animation:
     def __init__(self, data : list[dict], name : str) -> None:
         self.data = data
         self.name : str = name
+        self.program : AnimationProgram = AnimationProgram(data, name)
     
-    def load(self, owner : 'Sprite', time_source : Callable[[], float]|None = None, timer_factor : float = 1):
-        return AnimationTrack(owner, self.data, self.name, time_source, timer_factor)
+    def load(self, owner : 'Sprite', time_source : Callable[[], float]|None = None, timer_factor : float = 1, lazy : bool = False):
+        return AnimationTrack(owner, self.program, self.name, time_source, timer_factor, lazy)
 
     def load_file(self, path = "data/animations/animation_data.json"):
         with open(path, "r") as read_file:
@@ -0,0 +1,93 @@
+import json
+import os
+import pygame
+from typing import Union
+from utils.surface_registry import SurfaceRegistry
+
+ColorType = Union[list[int], tuple[int, int, int], pygame.Color]
+
+def pack_directory(directory : str, output_path : str, max_width : int = 2048, padding : int = 1) -> dict[str, list[int]]:
+    '''Packs every .png in directory into one sheet (output_path + ".png") and writes a name -> [x, y, w, h] index (output_path + ".json").
+    Images are named after their file name without the extension. Uses simple shelf packing, tallest images first.'''
+    images : dict[str, pygame.Surface] = {}
+    for file_name in sorted(os.listdir(directory)):
+        name, extension = os.path.splitext(file_name)
+        if extension.lower() != '.png': continue
+        images[name] = pygame.image.load(os.path.join(directory, file_name))
+
+    order = sorted(images, key = lambda name : images[name].get_height(), reverse=True)
+    index : dict[str, list[int]] = {}
+    x = y = shelf_height = sheet_width = 0
+    for name in order:
+        width, height = images[name].get_size()
+        if x + width > max_width and x > 0:
+            x = 0
+            y += shelf_height + padding
+            shelf_height = 0
+        index[name] = [x, y, width, height]
+        x += width + padding
+        shelf_height = max(shelf_height, height)
+        sheet_width = max(sheet_width, x - padding)
+
+    sheet = pygame.Surface((max(sheet_width, 1), max(y + shelf_height, 1)), pygame.SRCALPHA)
+    for name, (x, y, width, height) in index.items():
+        sheet.blit(images[name], (x, y))
+
+    pygame.image.save(sheet, output_path + '.png')
+    with open(output_path + '.json', 'w') as file:
+        json.dump(index, file)
+    return index
+
+
+class TextureAtlas:
+    '''Runtime side of pack_directory. The sheet is loaded once and images are handed out as subsurfaces,
+    which share the sheet's pixels instead of copying them.'''
+    atlases : dict[str, 'TextureAtlas'] = {}
+
+    def __init__(self, path : str) -> None:
+        '''path is the output_path that was given to pack_directory (no extension).'''
+        self.path : str = path
+        self.sheet : pygame.Surface = SurfaceRegistry.load_image(path + '.png', owner='atlas')
+        with open(path + '.json', 'r') as file:
+            self.index : dict[str, list[int]] = json.load(file)
+        self.views : dict[tuple[str, tuple|None], pygame.Surface] = {}
+
+    @classmethod
+    def load(cls, path : str) -> 'TextureAtlas':
+        '''Returns the cached atlas for path, loading it on first use.'''
+        atlas = cls.atlases.get(path, None)
+        if atlas is None:
+            atlas = TextureAtlas(path)
+            cls.atlases[path] = atlas
+        return atlas
+
+    def __contains__(self, name : str) -> bool:
+        return name in self.index
+
+    def names(self) -> list[str]:
+        return list(self.index)
+
+    def get(self, name : str, colorkey : ColorType|str|None = None) -> pygame.Surface:
+        '''Returns the named image as a subsurface of the sheet.
+        With a colorkey it returns an opaque display format copy keyed with RLEACCEL instead, the same fast path
+        SurfaceRegistry.prepare gives colorkeyed images loaded on their own.'''
+        key_color = None if colorkey is None else tuple(pygame.Color(colorkey))
+        view = self.views.get((name, key_color), None)
+        if view is None:
+            view = self.sheet.subsurface(self.index[name])
+            if key_color is not None:
+                if SurfaceRegistry.display_ready(): view = SurfaceRegistry.track(view.convert(), 'atlas')
+                view.set_colorkey(key_color, pygame.RLEACCEL)
+            self.views[(name, key_color)] = view
+        return view
+
+
+if __name__ == '__main__':
+    #Offline pack: python -m utils.atlas <directory> <output path without extension>
+    import sys
+    args = sys.argv[1:]
+    if len(args) < 2:
+        print('Usage: python -m utils.atlas <directory> <output path without extension>')
+        sys.exit(1)
+    result = pack_directory(args[0], args[1])
+    print(f'Packed {len(result)} images into {args[1]}.png')
@@ -3,6 +3,8 @@ from math import copysign
 from typing import Callable, Any, Union
 from random import random
 from collections import OrderedDict
+from utils.mipmap import MipChain
+from utils.surface_registry import SurfaceRegistry
 
 def to_roman(num : int) -> str:
 
@@ -42,7 +44,9 @@ class Task:
     def execute(self):
         self.callback(*self.args, **self.kwargs)
 
-def scale_surf(surf : pygame.Surface, scale : float):
+def scale_surf(surf : pygame.Surface, scale : float, use_mipmaps : bool = False):
+    '''With use_mipmaps, downscaling starts from the closest cached mip level of surf.'''
+    if use_mipmaps: return MipChain.get(surf).scale_by(scale)
     return pygame.transform.scale_by(surf, scale)
 
 def rotate_around_pivot(image : pygame.Surface, rect : pygame.Rect, angle : float, 
@@ -120,7 +124,7 @@ def make_upgrade_bar(width : int = 100, length : int = 20, count = 5, border : i
     pygame.draw.rect(surf, bg_color, (border, border, width, (length + border) * count - border))
     for i in range(count):
         pygame.draw.rect(surf, border_color, (0, (border + length) * i, width + border * 2, border))
-    return surf
+    return SurfaceRegistry.prepare(surf)
 
 def paint_upgrade_bar(surf : pygame.Surface, index : int, width : int = 100, length : int = 20, border : int = 3, color : str|ColorType = 'Green'):
     pygame.draw.rect(surf, color, (border, (length + border) * index + border, width, length))
@@ -134,7 +138,7 @@ def make_right_arrow(height : int, width : int, color : ColorType|str = (255, 0,
     surface.set_colorkey(colorkey)
     surface.fill(colorkey)
     pygame.draw.polygon(surface, color, [(0,0), (width, height // 2), (0, height)])
-    return surface
+    return SurfaceRegistry.prepare(surface)
 
 def make_circle(radius : int, color : ColorType|str, colorkey : ColorType|str = (0, 255, 0)) -> pygame.Surface:
     d = radius * 2
@@ -142,7 +146,7 @@ def make_circle(radius : int, color : ColorType|str, colorkey : ColorType|str =
     surface.set_colorkey(colorkey)
     surface.fill(colorkey)
     pygame.draw.circle(surface, color, (radius, radius), radius)
-    return surface
+    return SurfaceRegistry.prepare(surface)
 
 
 def load_alpha_to_colorkey(path : str, colorkey : ColorType|str):
@@ -151,7 +155,7 @@ def load_alpha_to_colorkey(path : str, colorkey : ColorType|str):
     new_surf.set_colorkey(colorkey)
     new_surf.fill(colorkey)
     new_surf.blit(image, (0,0))
-    return new_surf
+    return SurfaceRegistry.prepare(new_surf)
 
 def tuple_vec_average(l : list[tuple[float, float]]) -> float:
     x_sum : float = 0
@@ -1,20 +1,68 @@
 """Module that contains multiple lerp related utility functions."""
+import pygame
+from typing import Any, Callable
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+LerpFunction = Callable[[Any, Any, float], Any]
+RECT_TYPES : tuple[type, ...] = (pygame.Rect, pygame.FRect) if hasattr(pygame, 'FRect') else (pygame.Rect,)
+
+def lerp_arithmetic(a, b, t : float):
+    '''Numbers, vectors and NumPy arrays (t can be an array too).'''
+    return a + (b-a) * t
+
+def lerp_method(a, b, t : float):
+    return a.lerp(b, t)
+
+def lerp_sequence(a, b, t : float) -> list:
+    size = len(a)
+    if size != len(b): raise ValueError("Size mismatch")
+    return [a[i] + (b[i] - a[i]) * t for i in range(size)]
+
+def lerp_color(a, b, t : float) -> pygame.Color:
+    if 0 <= t <= 1: return pygame.Color(a).lerp(b, t)
+    #Color.lerp only takes 0-1, overshooting easings get clamped channels instead
+    return pygame.Color([min(max(round(value), 0), 255) for value in lerp_sequence(pygame.Color(a), pygame.Color(b), t)])
+
+def lerp_rect(a, b, t : float) -> pygame.Rect:
+    return a.__class__(lerp_sequence(a, b, t))
+
+def lerp_tuple(a, b, t : float) -> tuple:
+    return tuple(lerp_sequence(a, b, t))
+
+#Strategy for every (start type, goal type) pair seen so far
+lerp_strategies : dict[tuple[type, type], LerpFunction] = {}
+
+def resolve_lerp(a, b) -> LerpFunction:
+    '''Picks the strategy compatibilty_lerp would end up using for values like a and b.'''
+    if isinstance(a, pygame.Color) or isinstance(b, pygame.Color): return lerp_color
+    #Rects and tuples keep their type, whatever sequence the goal is given as
+    if isinstance(a, RECT_TYPES): return lerp_rect
+    if isinstance(a, tuple) and not isinstance(b, pygame.Color): return lerp_tuple
+    try: 
+        a + (b-a) * 0.5
+        return lerp_arithmetic
+    except Exception: pass
+
+    if hasattr(a, 'lerp'): return lerp_method
+    try: len(a), len(b)
+    except TypeError: raise ValueError(f"Compatibilty checks failed ({a} does not match {b})")
+    return lerp_sequence
+
+def get_lerp(a, b) -> LerpFunction:
+    '''Returns the lerp function for a start value and goal of these types. Resolved once per type pair,
+    so tweens and instructions can look it up when they start instead of trying every strategy each frame.'''
+    key = (a.__class__, b.__class__)
+    strategy = lerp_strategies.get(key, None)
+    if strategy is None:
+        strategy = resolve_lerp(a, b)
+        lerp_strategies[key] = strategy
+    return strategy
+
 def compatibilty_lerp(a, b, t : float):
-    try: return a + (b-a) * t 
-    except: pass
-        
-    try : return a.lerp(b, t) 
-    except: pass
-        
-    try: size_a, size_b = len(a), len(b)
-    except: raise ValueError("Compatibilty checks failed")
-    else: 
-        if size_a != size_b: raise ValueError("Size mismatch")
-        
-    try: return [a[i] + (b[i] - a[i]) * t for i in range(size_a)]
-    except: pass
-        
-    raise ValueError(f"Compatibilty checks failed ({a} does not match {b})")
+    return get_lerp(a, b)(a, b, t)
 
 def lerp(a, b, t : float):
     try:
@@ -47,7 +95,8 @@ def cubic_ease_out(t : float) -> float:
 
 
 def smoothstep(t : float) -> float:
-    return lerp(quad_ease_in(t), quad_ease_out(t), t)
+    #lerp(quad_ease_in(t), quad_ease_out(t), t) expanded
+    return t * t * (3 - 2 * t)
 
 
 def linear(t : float) -> float:
@@ -58,4 +107,113 @@ def mirror(t : float) -> float:
     else: return flip(t) * 2
 
 
-
+#One more than a power of two, so 0.5 and the other binary fractions (where piecewise curves like mirror bend) are sampled exactly
+LUT_SIZE : int = 257
+
+class Easing:
+    '''An easing curve that can be evaluated one value at a time, over a NumPy array of alphas,
+    or from a lookup table sampled from it (see bake).'''
+    def __init__(self, function : Callable[[float], float], array_function : Callable|None = None, name : str|None = None) -> None:
+        self.function : Callable[[float], float] = function
+        #Version of function that works on NumPy arrays, if there is one
+        self.array_function : Callable|None = array_function
+        self.name : str|None = name
+        self.lut : list[float]|None = None
+        self.lut_array : 'numpy.ndarray|None' = None
+        self.lut_grid : 'numpy.ndarray|None' = None
+    
+    def __call__(self, t : float) -> float:
+        if self.lut is None: return self.function(t)
+        return self.sample(t)
+    
+    def bake(self, size : int = LUT_SIZE) -> 'Easing':
+        '''Samples the curve into size evenly spaced values. Calls are then answered by linear interpolation between them.'''
+        self.lut = [self.function(i / (size - 1)) for i in range(size)]
+        if numpy is not None:
+            self.lut_array = numpy.array(self.lut, dtype=float)
+            self.lut_grid = numpy.linspace(0, 1, size)
+        return self
+    
+    def sample(self, t : float) -> float:
+        if t < 0 or t > 1: return self.function(t)
+        position = t * (len(self.lut) - 1)
+        index = int(position)
+        if index >= len(self.lut) - 1: return self.lut[-1]
+        low = self.lut[index]
+        return low + (self.lut[index + 1] - low) * (position - index)
+    
+    def get_callable(self) -> Callable[[float], float]:
+        '''The fastest way to call the curve on a single value.'''
+        return self.function if self.lut is None else self
+    
+    def evaluate(self, alphas) -> 'numpy.ndarray':
+        '''Eases every alpha of an array at once. Requires NumPy.'''
+        alphas = numpy.asarray(alphas, dtype=float)
+        if self.lut_array is not None: return numpy.interp(alphas, self.lut_grid, self.lut_array)
+        if self.array_function is not None: return numpy.asarray(self.array_function(alphas), dtype=float)
+        return numpy.array([self.function(alpha) for alpha in alphas.ravel()], dtype=float).reshape(alphas.shape)
+
+
+def mirror_array(t : 'numpy.ndarray') -> 'numpy.ndarray':
+    return numpy.where(t < 0.5, t * 2, flip(t) * 2)
+
+easings : dict[str, Easing] = {}
+easings_by_function : dict[Callable, Easing] = {}
+
+def register_easing(name : str, function : Callable[[float], float]|Easing, array_function : Callable|None = None) -> Easing:
+    '''Makes the curve available by name to animations (easing_style) and to batch evaluation.'''
+    easing = function if isinstance(function, Easing) else Easing(function, array_function, name)
+    easing.name = name
+    easings[name] = easing
+    easings_by_function[easing.function] = easing
+    easings_by_function[easing] = easing
+    return easing
+
+for _function in (quad_ease_out, quad_ease_in, cubic_ease_in, cubic_ease_out, smoothstep, linear):
+    #Plain arithmetic, so they already work on arrays
+    register_easing(_function.__name__, _function, _function)
+register_easing('mirror', mirror, mirror_array)
+
+def get_easing(easing_style : str|Callable[[float], float]) -> Callable[[float], float]:
+    '''Resolves an easing_style (a registered name or a function) to the callable to use per value.'''
+    if type(easing_style) != str: return easing_style
+    easing = easings.get(easing_style, None)
+    if easing is None: return globals()[easing_style]
+    return easing.get_callable()
+
+def ease_array(easing_style : Callable[[float], float], alphas) -> 'numpy.ndarray':
+    '''Evaluates easing_style over an array of alphas, using its registered array version or lookup table when there is one.'''
+    easing = easings_by_function.get(easing_style, None)
+    if easing is None: easing = Easing(easing_style)
+    return easing.evaluate(alphas)
+
+def cubic_bezier(x1 : float, y1 : float, x2 : float, y2 : float, name : str|None = None) -> Easing:
+    '''CSS style cubic-bezier(x1, y1, x2, y2) curve. Solving for t is too slow to do every call, so the curve comes baked.
+    Pass a name to register it.'''
+    def bezier(p1 : float, p2 : float, s : float) -> float:
+        return 3 * (1 - s) * (1 - s) * s * p1 + 3 * (1 - s) * s * s * p2 + s * s * s
+    
+    def bezier_slope(p1 : float, p2 : float, s : float) -> float:
+        return 3 * (1 - s) * (1 - s) * p1 + 6 * (1 - s) * s * (p2 - p1) + 3 * s * s * (1 - p2)
+    
+    def curve(t : float) -> float:
+        if t <= 0: return 0.0
+        if t >= 1: return 1.0
+        s = t
+        for _ in range(8): #Newton's method
+            error = bezier(x1, x2, s) - t
+            if abs(error) < 1e-7: return bezier(y1, y2, s)
+            slope = bezier_slope(x1, x2, s)
+            if abs(slope) < 1e-6: break
+            s -= error / slope
+        low, high = 0.0, 1.0
+        s = t
+        for _ in range(30): #Bisection when Newton's method doesn't settle
+            if bezier(x1, x2, s) < t: low = s
+            else: high = s
+            s = (low + high) / 2
+        return bezier(y1, y2, s)
+    
+    easing = Easing(curve, None, name).bake()
+    if name is not None: register_easing(name, easing)
+    return easing
@@ -0,0 +1,82 @@
+import pygame
+from utils.surface_registry import SurfaceRegistry
+
+class MipChain:
+    '''Half-size copies of a surface, built once with smoothscale.
+    Downscaling starts from the smallest level that is still at least as large as the target,
+    which is cheaper and aliases a lot less than scaling the full resolution original.'''
+    chains : dict[pygame.Surface, 'MipChain'] = {}
+    MIN_SIZE : int = 4
+
+    def __init__(self, surf : pygame.Surface) -> None:
+        self.levels : list[pygame.Surface] = [surf]
+        self.can_smoothscale : bool = surf.get_bitsize() in (24, 32)
+        self.colorkey : pygame.Color|None = surf.get_colorkey()
+        self.last_used : int = SurfaceRegistry.frame
+        width, height = surf.get_size()
+        while width // 2 >= MipChain.MIN_SIZE and height // 2 >= MipChain.MIN_SIZE:
+            width, height = width // 2, height // 2
+            if self.can_smoothscale:
+                level = pygame.transform.smoothscale(self.levels[-1], (width, height))
+            else:
+                level = pygame.transform.scale(self.levels[-1], (width, height))
+            if self.colorkey is not None: level.set_colorkey(self.colorkey)
+            self.levels.append(SurfaceRegistry.track(level, 'mipmap'))
+        self.bytes : int = sum(SurfaceRegistry.get_bytes(level) for level in self.levels[1:])
+
+    @classmethod
+    def get(cls, surf : pygame.Surface) -> 'MipChain':
+        '''Returns the cached chain for surf, building it on first use.'''
+        chain = cls.chains.get(surf, None)
+        if chain is None:
+            chain = MipChain(surf)
+            cls.chains[surf] = chain
+        chain.last_used = SurfaceRegistry.frame
+        return chain
+
+    @classmethod
+    def clear_cache(cls):
+        cls.chains.clear()
+
+    @classmethod
+    def evict_unused(cls):
+        '''Drops the chains that weren't used this frame.'''
+        frame = SurfaceRegistry.frame
+        cls.chains = {surf : chain for surf, chain in cls.chains.items() if chain.last_used >= frame}
+
+    @classmethod
+    def get_evictable(cls) -> int:
+        frame = SurfaceRegistry.frame
+        return sum(chain.bytes for chain in cls.chains.values() if chain.last_used < frame)
+
+    @property
+    def source(self) -> pygame.Surface:
+        return self.levels[0]
+
+    def get_level(self, scale_x : float, scale_y : float) -> pygame.Surface:
+        '''Returns the smallest level that is at least scale_x by scale_y times the size of the source.'''
+        base_width, base_height = self.levels[0].get_size()
+        best = self.levels[0]
+        for level in self.levels:
+            if level.get_width() < base_width * scale_x or level.get_height() < base_height * scale_y: break
+            best = level
+        return best
+
+    def scale_by(self, scale : float|tuple[float, float]|pygame.Vector2) -> pygame.Surface:
+        '''Drop-in replacement for pygame.transform.scale_by(self.source, scale).'''
+        if type(scale) == float or type(scale) == int:
+            scale_x = scale_y = scale
+        else:
+            scale_x, scale_y = scale
+        base_width, base_height = self.levels[0].get_size()
+        new_size = (int(base_width * scale_x), int(base_height * scale_y))
+        level = self.get_level(scale_x, scale_y)
+        if level is self.levels[0] and (scale_x >= 1 or scale_y >= 1):
+            return pygame.transform.scale_by(level, (scale_x, scale_y))
+        if not self.can_smoothscale: return pygame.transform.scale(level, new_size)
+        #The last step is a downscale by less than 2x, so filter it like the levels instead of dropping pixels
+        new_surf = pygame.transform.smoothscale(level, new_size)
+        if self.colorkey is not None: new_surf.set_colorkey(self.colorkey)
+        return new_surf
+
+SurfaceRegistry.register_evictor('mipmap', MipChain.evict_unused, evictable = MipChain.get_evictable)
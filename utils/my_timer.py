@@ -1,19 +1,141 @@
 from time import perf_counter
 from typing import Callable
 
+class FrameClock:
+    '''Samples a time source once per frame, so everything reading it sees the same "now" for the whole frame
+    and the source is only called once. Core ticks it at the start of every frame (see Core.update_dt).
+    Until the first tick it reads the source directly.
+    A frame advances the clock by at most max_dt, so after a hitch (loading, a dragged window, a breakpoint) everything
+    driven by it moves on by one long frame instead of jumping ahead. smoothed_dt is an exponential moving average of dt,
+    smoothing being the weight of the previous average.'''
+    def __init__(self, source : Callable[[], float], max_dt : float|None = None, smoothing : float = 0.9) -> None:
+        self.source : Callable[[], float] = source
+        self.now : float|None = None
+        self.frame : int = 0
+        self.max_dt : float|None = max_dt
+        self.smoothing : float = smoothing
+        self.dt : float = 0
+        self.smoothed_dt : float = 0
+        self.last_source : float = 0
+    
+    def tick(self) -> float:
+        source_now = self.source()
+        if self.now is None:
+            self.now = source_now
+        else:
+            dt = source_now - self.last_source
+            if dt < 0: dt = 0
+            elif self.max_dt is not None and dt > self.max_dt: dt = self.max_dt
+            self.now += dt
+            self.dt = dt
+            self.smoothed_dt = dt if self.frame == 1 else self.smoothed_dt * self.smoothing + dt * (1 - self.smoothing)
+        self.last_source = source_now
+        self.frame += 1
+        return self.now
+    
+    def get_time(self) -> float:
+        now = self.now
+        return now if now is not None else self.source()
+
+
+class TimeDomain:
+    '''A clock that runs off its parent's clock at a scale factor. Domains form a tree: Core builds 'real' on the frame clock,
+    with 'game' and 'ui' under it, and more can be added with create (a scene domain under 'game', for example).
+    Pausing or rescaling a domain only re-anchors it, which is O(1). Every timer, tween, animation or task reading the domain,
+    or any domain under it, follows along without being told.'''
+    domains : dict[str, 'TimeDomain'] = {}
+
+    def __init__(self, name : str, parent : 'TimeDomain|Callable[[], float]', scale : float = 1.0) -> None:
+        self.name : str = name
+        self.parent : TimeDomain|None = parent if isinstance(parent, TimeDomain) else None
+        self.parent_time : Callable[[], float] = parent.get_time if isinstance(parent, TimeDomain) else parent
+        self.scale : float = scale
+        self.paused : bool = False
+        #local time = anchor_local + (parent time - anchor_parent) * scale
+        self.anchor_parent : float = self.parent_time()
+        self.anchor_local : float = self.anchor_parent
+    
+    @classmethod
+    def create(cls, name : str, parent : 'str|TimeDomain|Callable[[], float]' = 'real', scale : float = 1.0) -> 'TimeDomain':
+        '''Makes a domain and registers it under name. parent can be the name of a registered domain.'''
+        if isinstance(parent, str): parent = cls.domains[parent]
+        domain = TimeDomain(name, parent, scale)
+        cls.domains[name] = domain
+        return domain
+    
+    @classmethod
+    def get(cls, name : str) -> 'TimeDomain|None':
+        return cls.domains.get(name, None)
+    
+    @classmethod
+    def get_source(cls, name : str) -> Callable[[], float]|None:
+        '''The get_time of the named domain, or None (the default time source) if there is no such domain.'''
+        domain = cls.domains.get(name, None)
+        return domain.get_time if domain is not None else None
+    
+    @classmethod
+    def remove(cls, name : str):
+        cls.domains.pop(name, None)
+    
+    def get_time(self) -> float:
+        if self.paused: return self.anchor_local
+        return self.anchor_local + (self.parent_time() - self.anchor_parent) * self.scale
+    
+    def anchor(self):
+        self.anchor_local = self.get_time()
+        self.anchor_parent = self.parent_time()
+    
+    def pause(self):
+        if self.paused: return
+        self.anchor()
+        self.paused = True
+    
+    def unpause(self):
+        if not self.paused: return
+        self.anchor_parent = self.parent_time()
+        self.paused = False
+    
+    def set_scale(self, scale : float):
+        self.anchor()
+        self.scale = scale
+    
+    def is_paused(self) -> bool:
+        '''True if this domain or one of its parents is paused.'''
+        if self.paused: return True
+        return self.parent.is_paused() if self.parent is not None else False
+    
+    def get_scale(self) -> float:
+        '''Speed of this domain relative to the root, taking the parents' scales and pauses into account.'''
+        if self.paused: return 0
+        return self.scale * (self.parent.get_scale() if self.parent is not None else 1)
+    
+    def make_timer(self, duration : float = -1, scale_factor : float = 1.0) -> 'Timer':
+        return Timer(duration, self.get_time, scale_factor)
+
+
 class Timer:
     
     @staticmethod
     def time_source() -> float:
         return perf_counter()
     
+    @staticmethod
+    def real_time_source() -> float:
+        '''Used by timers created with real_time=True. Core points it at the global timer, while time_source reads the 'real' domain.'''
+        return perf_counter()
+    
     def get_timestamp(self) -> float:
         return self.time_source() * self.scale_factor
     
-    def __init__(self, treshold : float = -1, time_source : Callable[[], float]|None = None, scale_factor : float = 1.0) -> None:
+    def __init__(self, treshold : float = -1, time_source : Callable[[], float]|None = None, scale_factor : float = 1.0,
+                 real_time : bool = False) -> None:
+        '''Without a time_source, the timer reads Timer.time_source. Once Core is set up that is the 'real' time domain,
+        which only changes once per frame. Game objects pass the 'game' domain instead, which stops while the game is paused.
+        real_time makes it read the current time on every call instead, for measuring time within a frame.'''
         self.duration = treshold
         self.time_source : Callable[[], float]
         if time_source: self.time_source = time_source
+        elif real_time: self.time_source = Timer.real_time_source
         self.scale_factor : float = scale_factor
         self.start_time = self.get_timestamp()
         self.init_time = self.get_timestamp()
@@ -27,6 +149,17 @@ class Timer:
     def new(cls, duration = -1):
         return cls(duration)
     
+    def reset(self, treshold : float = -1, time_source : Callable[[], float]|None = None, scale_factor : float = 1.0,
+              real_time : bool = False):
+        '''Reinitializes the timer in place, as if it was just created with these arguments. Lets pooled objects keep their Timer.'''
+        self.duration = treshold
+        if time_source: self.time_source = time_source
+        elif real_time: self.time_source = Timer.real_time_source
+        else: self.__dict__.pop('time_source', None)
+        self.scale_factor = scale_factor
+        self.init_time = self.get_timestamp()
+        self.restart()
+    
     def restart(self):
         self.start_time = self.get_timestamp()
         
@@ -66,6 +199,14 @@ class Timer:
     def get_time_left(self):
         return self.duration - self.get_time()
     
+    def get_end_time(self) -> float|None:
+        """
+        Returns the time_source() value at which the timer will be over.
+        Returns None if that can't be known in advance (no duration, paused or a scale factor of 0).
+        """
+        if self.duration < 0 or self.paused or self.scale_factor <= 0: return None
+        return (self.start_time + self.pause_duration + self.duration) / self.scale_factor
+    
     def isover(self):
         """
         Determines if the timer is over. 
@@ -1,11 +1,13 @@
 import pygame
-from utils.my_timer import Timer
+from utils.my_timer import Timer, TimeDomain
 from utils.animation import Animation
+import utils.tween_module as TweenModule
 import utils.interpolation as interpolation
 from random import random
 from math import sin, radians, cos
 from game.sprite import Sprite
 from utils.pivot_2d import Pivot2D
+from utils.surface_registry import SurfaceRegistry
 
 def __random_float(a, b):
     return random() * (b-a) + a
@@ -28,6 +30,7 @@ class Particle(Sprite):
     inactive_elements : list['Particle']  = []
     test_image = pygame.surface.Surface((4,4))
     pygame.draw.rect(test_image, 'White', (0, 0, 4, 4))
+    test_image = SurfaceRegistry.prepare(test_image)
 
     def __init__(self) -> None:
         self._position = pygame.Vector2(0,0)
@@ -63,7 +66,7 @@ class Particle(Sprite):
         self.rect.center = self.position
 
         self.lifetime = lifetime
-        self.lifetime_timer.set_duration(lifetime)
+        self.lifetime_timer.reset(lifetime, TimeDomain.get_source('game'))
 
         self.update_method = update_method
         self.velocity = velocity or pygame.Vector2(0,0)
@@ -106,6 +109,7 @@ class Particle(Sprite):
             self.anim_track.update()
     
     def draw(self, display : pygame.Surface):
+        if SurfaceRegistry.audit_enabled: SurfaceRegistry.audit_blit(self.image, display, self.__class__.__name__)
         display.blit(self.image, self.rect)
     
     @classmethod
@@ -116,6 +120,7 @@ class Particle(Sprite):
         
         if element not in cls.inactive_elements:
             cls.inactive_elements.append(element)
+        TweenModule.cancel_all(element)
     
     @classmethod
     def unpool(cls, element):
@@ -132,6 +137,7 @@ class Particle(Sprite):
         element: cls
         for element in cls.active_elements:
             cls.inactive_elements.append(element)
+            TweenModule.cancel_all(element)
         cls.active_elements.clear() 
     
     
@@ -269,7 +275,7 @@ class ParticleEffectTrack:
     def __init__(self, origin, cooldown) -> None:
         self.total_count = 0
         self.active : list[Particle] = []
-        self.timer : Timer = Timer(cooldown)
+        self.timer : Timer = Timer(cooldown, TimeDomain.get_source('game'))
         self.origin = origin
         self.ended = False
         self.can_emit = True
@@ -1,5 +1,7 @@
+import math
 import pygame
 from typing import Any
+from utils.rotation_sheet import RotationSheet
 def rotate_around_pivot_accurate(image : pygame.Surface, pos : pygame.Vector2, angle : float,
                         offset : pygame.Vector2 = None, debug = False, colorkey : pygame.Color|None = None):
     
@@ -20,6 +22,19 @@ def rotate_around_pivot_accurate(image : pygame.Surface, pos : pygame.Vector2, a
 def rotate_around_pivot_pos_only(pos : pygame.Vector2, angle : float, offset : pygame.Vector2):
     return pos - offset.rotate(angle)
 
+def rotated_size(size : tuple[int, int], angle : float) -> tuple[int, int]:
+    '''Size of pygame.transform.rotate(surf, angle) for a surface of the given size, without rotating anything.'''
+    width, height = size
+    if not math.fmod(angle, 90):
+        return (height, width) if int(angle / 90) % 2 else (width, height)
+    radians = angle * .01745329251994329
+    sin, cos = math.sin(radians), math.cos(radians)
+    #Same corner math (and truncation) as SDL_gfx's rotozoom, which pygame uses
+    cos_x, cos_y, sin_x, sin_y = cos * width, cos * height, sin * width, sin * height
+    new_width = int(max(abs(cos_x + sin_y), abs(cos_x - sin_y), abs(-cos_x + sin_y), abs(-cos_x - sin_y)))
+    new_height = int(max(abs(sin_x + cos_y), abs(sin_x - cos_y), abs(-sin_x + cos_y), abs(-sin_x - cos_y)))
+    return new_width, new_height
+
 
 class Pivot2D:
     def __init__(self, pos : pygame.Vector2, og_image : pygame.Surface|None = None, colorkey : pygame.Color|None = None) -> None:
@@ -71,10 +86,27 @@ class Pivot2D:
         self.origin += offset
     
     def rotate_image(self, image : pygame.Surface) -> tuple[pygame.Surface, pygame.Rect, pygame.Vector2]:
-        return rotate_around_pivot_accurate(image, self._origin, self._angle, self._pivot_offset, debug=False, colorkey=self.img_colorkey)
+        new_image, new_rect, new_pos = rotate_around_pivot_accurate(image, self._origin, self._angle, self._pivot_offset, debug=False, colorkey=self.img_colorkey)
+        return new_image, new_rect, new_pos
     
     def rotate_og_image(self):
         return self.rotate_image(self.original_image)
     
+    def rotate_image_baked(self, image : pygame.Surface, steps : int) -> tuple[pygame.Surface, pygame.Rect, pygame.Vector2]:
+        '''Like rotate_image, but snaps to one of steps headings and reads it from a cached RotationSheet.'''
+        sheet = RotationSheet.get(image, steps, self.img_colorkey)
+        return sheet.lookup(self._origin, self._angle, self._pivot_offset)
+    
+    def rotate_og_image_baked(self, steps : int):
+        return self.rotate_image_baked(self.original_image, steps)
+    
+    def get_rotated_size(self, steps : int|None = None) -> tuple[int, int]:
+        '''Size of the image rotate_og_image (or rotate_og_image_baked with steps) would return.'''
+        angle = self._angle
+        if steps:
+            step_angle = 360 / steps
+            angle = step_angle * (round(angle / step_angle) % steps)
+        return rotated_size(self.original_image.get_size(), -angle)
+    
     def rotate_image_debug(self, image : pygame.Surface) -> tuple[pygame.Surface, pygame.Rect, pygame.Vector2, Any]:
         return rotate_around_pivot_accurate(image, self._origin, self._angle, self._pivot_offset, debug=True, colorkey=self.img_colorkey)
\ No newline at end of file
@@ -0,0 +1,126 @@
+import json
+import pygame
+from typing import Union
+from utils.surface_registry import SurfaceRegistry
+
+ColorType = Union[list[int], tuple[int, int, int], pygame.Color]
+
+class RotationSheet:
+    '''Pre-rotated copies of an image at a fixed number of evenly spaced headings.
+    Bake it once (at class load time or offline with save/load) and rotation becomes a lookup.
+    The pivot offset is applied at lookup time, so one sheet serves every pivot that uses the image.'''
+    sheets : dict[tuple, 'RotationSheet'] = {}
+
+    def __init__(self, image : pygame.Surface, steps : int, colorkey : ColorType|str|None = None, bake : bool = True) -> None:
+        self.image : pygame.Surface = image
+        self.steps : int = steps
+        self.step_angle : float = 360 / steps
+        self.colorkey : ColorType|str|None = colorkey
+        self.surfaces : list[pygame.Surface] = []
+        self.bytes : int = 0
+        self.last_used : int = SurfaceRegistry.frame
+        if bake: self.bake()
+
+    @staticmethod
+    def make_key(image : pygame.Surface, steps : int, colorkey : ColorType|str|None) -> tuple:
+        key_color = None if colorkey is None else tuple(pygame.Color(colorkey))
+        return (image, steps, key_color)
+
+    @classmethod
+    def get(cls, image : pygame.Surface, steps : int, colorkey : ColorType|str|None = None) -> 'RotationSheet':
+        '''Returns the cached sheet for these settings, baking it on first use.'''
+        key = cls.make_key(image, steps, colorkey)
+        sheet = cls.sheets.get(key, None)
+        if sheet is None:
+            sheet = RotationSheet(image, steps, colorkey)
+            cls.sheets[key] = sheet
+        sheet.last_used = SurfaceRegistry.frame
+        return sheet
+
+    @classmethod
+    def clear_cache(cls):
+        cls.sheets.clear()
+
+    @classmethod
+    def evict_unused(cls):
+        '''Drops the sheets that weren't used this frame.'''
+        frame = SurfaceRegistry.frame
+        cls.sheets = {key : sheet for key, sheet in cls.sheets.items() if sheet.last_used >= frame}
+
+    @classmethod
+    def get_evictable(cls) -> int:
+        frame = SurfaceRegistry.frame
+        return sum(sheet.bytes for sheet in cls.sheets.values() if sheet.last_used < frame)
+
+    def bake(self):
+        '''Renders every heading. Matches rotate_around_pivot_accurate for the snapped angles.'''
+        if self.colorkey is not None:
+            prev_colorkey = self.image.get_colorkey()
+            self.image.set_colorkey(self.colorkey)
+        self.surfaces = [SurfaceRegistry.track(pygame.transform.rotate(self.image, -self.step_angle * i), 'rotation_sheet')
+                         for i in range(self.steps)]
+        self.bytes = sum(SurfaceRegistry.get_bytes(surf) for surf in self.surfaces)
+        if self.colorkey is not None: self.image.set_colorkey(prev_colorkey)
+
+    def get_index(self, angle : float) -> int:
+        return round(angle / self.step_angle) % self.steps
+
+    def snap_angle(self, angle : float) -> float:
+        return round(angle / self.step_angle) * self.step_angle
+
+    def lookup(self, pos : pygame.Vector2, angle : float,
+               pivot_offset : pygame.Vector2|None = None) -> tuple[pygame.Surface, pygame.Rect, pygame.Vector2]:
+        '''Same return value as rotate_around_pivot_accurate, using the nearest baked heading.
+        Only the image is snapped: the position orbits the pivot at the exact angle, like Pivot2D.position.'''
+        new_image = self.surfaces[self.get_index(angle)]
+        new_pos = pos - pivot_offset.rotate(angle) if pivot_offset else pygame.Vector2(pos)
+        return new_image, new_image.get_rect(center = round(new_pos)), new_pos
+
+    def save(self, path : str):
+        '''Saves the sheet as a single image strip (path + ".png") and its index (path + ".json").'''
+        cell_w = max(surf.get_width() for surf in self.surfaces)
+        cell_h = max(surf.get_height() for surf in self.surfaces)
+        strip = pygame.Surface((cell_w * self.steps, cell_h), pygame.SRCALPHA)
+        frames : list[list[float]] = []
+        for i, surf in enumerate(self.surfaces):
+            #Colorkeyed pixels are skipped by the blit, so they end up transparent in the strip
+            strip.blit(surf, (cell_w * i, 0))
+            frames.append([cell_w * i, 0, surf.get_width(), surf.get_height()])
+        pygame.image.save(strip, path + '.png')
+        with open(path + '.json', 'w') as file:
+            json.dump({'steps' : self.steps, 'frames' : frames}, file)
+
+    @classmethod
+    def load(cls, path : str, image : pygame.Surface|None = None, colorkey : ColorType|str|None = None) -> 'RotationSheet':
+        '''Loads a sheet made with save. The rotated surfaces are subsurfaces of the strip.
+        Pass the source image (and the colorkey the pivot uses) to register the sheet in the cache so RotationSheet.get finds it.'''
+        with open(path + '.json', 'r') as file:
+            data : dict = json.load(file)
+        strip = pygame.image.load(path + '.png')
+        if pygame.display.get_surface(): strip = strip.convert_alpha()
+        SurfaceRegistry.track(strip, 'rotation_sheet')
+        sheet = RotationSheet(image, data['steps'], None, bake=False)
+        for frame in data['frames']:
+            #Sheets saved before pivots moved to lookup time carry two extra offset values per frame
+            sheet.surfaces.append(strip.subsurface(frame[:4]))
+        sheet.bytes = SurfaceRegistry.get_bytes(strip)
+        if image is not None:
+            cls.sheets[cls.make_key(image, sheet.steps, colorkey)] = sheet
+        return sheet
+
+SurfaceRegistry.register_evictor('rotation_sheet', RotationSheet.evict_unused, evictable = RotationSheet.get_evictable)
+
+
+if __name__ == '__main__':
+    #Offline bake: python -m utils.rotation_sheet <image> <steps> <output path without extension> [--colorkey <color>]
+    #The colorkey is anything pygame.Color accepts (a name, #rrggbb or r,g,b) and should match the one the sprite's pivot uses
+    import argparse
+    parser = argparse.ArgumentParser(prog='python -m utils.rotation_sheet', description='Bakes a RotationSheet into a PNG strip and a JSON index.')
+    parser.add_argument('image')
+    parser.add_argument('steps', type=int)
+    parser.add_argument('output', help='output path without extension')
+    parser.add_argument('--colorkey', default=None)
+    args = parser.parse_args()
+    colorkey = args.colorkey
+    if colorkey is not None and ',' in colorkey: colorkey = [int(part) for part in colorkey.split(',')]
+    RotationSheet(pygame.image.load(args.image), args.steps, colorkey).save(args.output)
@@ -0,0 +1,153 @@
+import pygame
+import weakref
+from typing import Any, Callable, Union
+
+ColorType = Union[list[int], tuple[int, int, int], pygame.Color]
+
+class SurfaceRegistry:
+    '''Converts loaded and generated surfaces to the display format and audits blits that still take the slow conversion path.
+    Turn the audit on with SurfaceRegistry.audit_enabled = True; a report is printed at the end of every frame that had mismatches.
+
+    With accounting_enabled (off by default, turn it on before loading anything) it also keeps a byte count of the cached
+    and long lived surfaces the framework creates, tagged by the subsystem that owns them (see track). Per frame render
+    results are not tracked. Set SurfaceRegistry.budget (in bytes) as well to have the registered evictors drop cache entries
+    that weren't used this frame whenever the total is over it. The budget is checked once per frame, in end_frame.'''
+    audit_enabled : bool = False
+    frame_report : dict[tuple[str, tuple[int, int], str], int] = {}
+
+    accounting_enabled : bool = False
+    budget : int|None = None
+    total : int = 0
+    totals : dict[str, int] = {}
+    live : dict[int, tuple[weakref.ref, str, int]] = {}
+    evictors : list[tuple[int, str, Callable[[], Any], Callable[[], int]|None]] = []
+    is_evicting : bool = False
+    #Caches stamp their entries with this when they are used, so eviction can leave this frame's working set alone
+    frame : int = 0
+    over_budget_warned : bool = False
+
+    @staticmethod
+    def display_ready() -> bool:
+        return pygame.display.get_surface() is not None
+
+    @classmethod
+    def prepare(cls, surf : pygame.Surface, colorkey : ColorType|str|None = None, owner : str|None = None) -> pygame.Surface:
+        '''Returns surf converted to the display format (convert_alpha if it has per-pixel alpha, else convert).
+        Colorkeyed surfaces get RLEACCEL. Returns surf untouched if no display mode has been set yet.
+        If owner is given, the returned surface is tracked under that tag.'''
+        if not cls.display_ready(): return surf if owner is None else cls.track(surf, owner)
+        if colorkey is None: colorkey = surf.get_colorkey()
+        if surf.get_flags() & pygame.SRCALPHA:
+            new_surf = surf.convert_alpha()
+        else:
+            new_surf = surf.convert()
+        if colorkey is not None: new_surf.set_colorkey(colorkey, pygame.RLEACCEL)
+        return new_surf if owner is None else cls.track(new_surf, owner)
+
+    @classmethod
+    def load_image(cls, path : str, colorkey : ColorType|str|None = None, owner : str|None = None) -> pygame.Surface:
+        return cls.prepare(pygame.image.load(path), colorkey, owner)
+    
+    @staticmethod
+    def get_bytes(surf : pygame.Surface) -> int:
+        '''Pixel memory owned by surf. Subsurfaces share their parent's pixels and count as 0.'''
+        if surf.get_parent() is not None: return 0
+        return surf.get_pitch() * surf.get_height()
+
+    @classmethod
+    def track(cls, surf : pygame.Surface, owner : str) -> pygame.Surface:
+        '''Counts surf under owner until it is garbage collected. Returns surf so it can wrap the expression that creates it.'''
+        if not cls.accounting_enabled: return surf
+        key = id(surf)
+        if key in cls.live: return surf
+        size = cls.get_bytes(surf)
+        cls.live[key] = (weakref.ref(surf, lambda ref, key=key : cls._forget(key, ref)), owner, size)
+        cls.totals[owner] = cls.totals.get(owner, 0) + size
+        cls.total += size
+        return surf
+
+    @classmethod
+    def _forget(cls, key : int, ref : weakref.ref):
+        entry = cls.live.get(key, None)
+        if entry is None or entry[0] is not ref: return
+        del cls.live[key]
+        _, owner, size = entry
+        cls.totals[owner] -= size
+        cls.total -= size
+
+    @classmethod
+    def get_totals(cls) -> dict[str, int]:
+        '''Live bytes per owner tag.'''
+        return dict(cls.totals)
+
+    @classmethod
+    def register_evictor(cls, owner : str, callback : Callable[[], Any], priority : int = 0, evictable : Callable[[], int]|None = None):
+        '''callback should drop cached surfaces that weren't used this frame so they can be collected.
+        evictable returns how many bytes callback would free right now; without it the evictor is assumed to be able to free everything.
+        Evictors with a lower priority run first.'''
+        cls.evictors.append((priority, owner, callback, evictable))
+        cls.evictors.sort(key = lambda evictor : evictor[0])
+
+    @classmethod
+    def remove_evictor(cls, callback : Callable[[], Any]):
+        cls.evictors = [evictor for evictor in cls.evictors if evictor[2] != callback]
+
+    @classmethod
+    def get_evictable(cls) -> int|None:
+        '''Bytes the evictors could free right now, or None if one of them can't tell.'''
+        total = 0
+        for _, _, _, evictable in cls.evictors:
+            if evictable is None: return None
+            total += evictable()
+        return total
+
+    @classmethod
+    def enforce_budget(cls):
+        '''Runs evictors in priority order until the total is back under the budget.
+        Does nothing if evicting everything that can go would still leave the total over it.'''
+        if cls.is_evicting or cls.budget is None or not cls.accounting_enabled or cls.total <= cls.budget:
+            cls.over_budget_warned = False
+            return
+        evictable = cls.get_evictable()
+        if evictable is None or cls.total - evictable <= cls.budget:
+            cls.is_evicting = True
+            for _, owner, callback, _ in cls.evictors:
+                if cls.total <= cls.budget: break
+                callback()
+            cls.is_evicting = False
+        if cls.total > cls.budget and not cls.over_budget_warned:
+            cls.over_budget_warned = True
+            print(f'SurfaceRegistry: {cls.total} bytes in use, over the budget of {cls.budget} bytes after eviction')
+            cls.print_totals()
+
+    @classmethod
+    def print_totals(cls):
+        for owner, size in sorted(cls.totals.items(), key = lambda item : item[1], reverse=True):
+            print(f'    {owner}: {size / 1024:.1f} KiB')
+
+    @staticmethod
+    def get_mismatch(source : pygame.Surface, target : pygame.Surface) -> str|None:
+        '''Returns why a blit from source to target needs a pixel format conversion, or None if the formats match.'''
+        if source.get_bytesize() != target.get_bytesize():
+            return f'{source.get_bitsize()}bit -> {target.get_bitsize()}bit'
+        if source.get_masks()[:3] != target.get_masks()[:3]:
+            return 'channel order'
+        return None
+
+    @classmethod
+    def audit_blit(cls, source : pygame.Surface, target : pygame.Surface, owner : str):
+        reason = cls.get_mismatch(source, target)
+        if reason is None: return
+        key = (owner, source.get_size(), reason)
+        cls.frame_report[key] = cls.frame_report.get(key, 0) + 1
+
+    @classmethod
+    def end_frame(cls):
+        '''Core only calls this when accounting or the blit audit is on.'''
+        if cls.budget is not None: cls.enforce_budget()
+        cls.frame += 1
+        if not cls.frame_report: return
+        print(f'SurfaceRegistry: {sum(cls.frame_report.values())} mismatched blit(s) this frame')
+        for (owner, size, reason), count in cls.frame_report.items():
+            print(f'    {owner} {size[0]}x{size[1]} ({reason}) x{count}')
+        cls.frame_report.clear()
@@ -1,22 +1,71 @@
 "I just copied roblox's homework on this one. For the better or the worse."
 
 import pygame
+import operator
 import utils.interpolation as interpolation
 from utils.my_timer import Timer
 from typing import Callable, Any
+from copy import copy
+from collections import deque
+from itertools import repeat
 from time import perf_counter
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 def new_tween(target : object, info : 'TweenInfo', goal : dict, use_compatibilty_lerp = True, update_manually = False, play_now = True,
-              time_source : Callable[[], float]|None = None, time_factor : float = 1):
-    new_track = TweenTrack(target, info, goal, use_compatibilty_lerp, time_source, time_factor)
+              time_source : Callable[[], float]|None = None, time_factor : float = 1, batched : bool = False,
+              pooled : bool = False, override : str = 'replace') -> 'TweenTrack|EngineTween|TweenHandle':
+    '''override decides what happens to tweens already running on the same attributes of target:
+    'replace' takes the attributes over, 'blend' takes them over while fading out of the old tween's motion
+    and 'queue' waits for the old tween to finish before starting. See TweenTrack.play.
+    batched runs the tween in the TweenEngine of its time source when NumPy is available and every goal is numeric
+    (numbers, Vector2/3, Color or 2-4 number sequences). Otherwise, or if play_now is False or update_manually is True
+    (the engine updates all of its tweens at once), it makes a regular TweenTrack.
+    pooled takes the track from the pool and returns a TweenHandle to it. The track goes back to the pool when it finishes
+    (or when the handle is stopped); with update_manually, call release on the handle once it is no longer needed.'''
+    if batched and play_now and not update_manually:
+        engine = TweenEngine.get(time_source)
+        engine_tween = engine.add(target, info, goal, time_factor, override) if engine is not None else None
+        if engine_tween is not None: return engine_tween
+    if pooled:
+        new_track = TweenTrack.acquire(target, info, goal, use_compatibilty_lerp, time_source, time_factor)
+        new_track.recycle = not update_manually
+    else:
+        new_track = TweenTrack(target, info, goal, use_compatibilty_lerp, time_source, time_factor)
+    new_track.override = override
     if not update_manually:
-        TweenTrack.elements.append(new_track)
+        new_track.auto_update = True
+        new_track.register()
     if play_now:
         new_track.play()
-    return new_track
+    return TweenHandle(new_track) if pooled else new_track
+
+def cancel_all(target : object):
+    '''Cancels every tween (regular, chained or batched) running or queued on target. Called when sprites and particles are pooled.'''
+    TweenTrack.cancel_all(target)
+    TweenChain.cancel_all(target)
+
+Getter = Callable[[object], Any]
+Setter = Callable[[object, Any], None]
+#Writes values[i] to targets[i] for every target, see TweenEngine.compile_writer
+Writer = Callable[[list[object], 'numpy.ndarray'], None]
+#Runs an iterator to the end without keeping its items
+consume : Callable[[Any], None] = deque(maxlen=0).extend
+VECTOR_COMPONENTS : dict[str, int] = {'x' : 0, 'y' : 1, 'z' : 2}
+OVERRIDE_MODES : tuple[str, ...] = ('replace', 'blend', 'queue')
+#start, goal, lerp function, easing style and timer of the tween a blending track fades out of
+BlendSource = tuple[Any, Any, 'interpolation.LerpFunction', Callable[[float], float], Timer]
 
 class TweenTrack:
     elements : list['TweenTrack'] = []
+    inactive_elements : list['TweenTrack'] = []
+    #Compiled getter and setter for every (target type, attribute path) that has been tweened
+    accessors : dict[tuple[type, str], tuple[Getter, Setter]] = {}
+    #id(target) -> attribute path -> the track (or engine tween) currently driving it.
+    #Tracks keep their target alive, so ids can't be reused while indexed
+    index : dict[int, dict[str, 'TweenTrack|EngineTween']] = {}
     def __init__(self, target : object, info : 'TweenInfo', goal : dict[str, Any], use_compat_lerp = True,
               time_source : Callable[[], float]|None = None, time_factor : float = 1) -> None:
         self.target = target
@@ -28,71 +77,289 @@ class TweenTrack:
         self.is_playing = False
         self.has_finished = False
         self._can_play = True
+        #(attribute, setter, lerp function) for every goal, resolved in play
+        self.properties : list[tuple[str, Setter, interpolation.LerpFunction]] = []
         
         self.time_source : Callable[[], float]|None = time_source
         self.time_factor : float = time_factor
+
+        #Pooling. The Timer is kept between plays and reset in place; generation goes up every time the track is recycled
+        self.reusable_timer : Timer|None = None
+        self.auto_update : bool = False
+        self.recycle : bool = False
+        self.in_pool : bool = False
+        self.generation : int = 0
+        self.is_registered : bool = False
+
+        self.override : str = 'replace'
+        self.is_indexed : bool = False
+        self.blend_sources : dict[str, BlendSource] = {}
+        self.queued : list[TweenTrack] = []
+        #TweenChain this track is a step of
+        self.owner : TweenChain|None = None
+        self.finish_callbacks : list[Callable[[], Any]]|None = None
+    
+    def register(self):
+        '''Adds the track to the tracks update_all updates. Nothing changes if it is already there.'''
+        self.auto_update = True
+        if self.is_registered: return
+        self.is_registered = True
+        TweenTrack.elements.append(self)
+    
+    def retarget(self, target : object, info : 'TweenInfo', goal : dict[str, Any], use_compat_lerp = True,
+              time_source : Callable[[], float]|None = None, time_factor : float = 1):
+        '''Points the track at a new target and goal without allocating a new track. The track is stopped; call play to start it.'''
+        self.unindex()
+        self.blend_sources.clear()
+        self.target = target
+        self.info = info
+        self.goal = goal
+        self.start.clear()
+        self.properties.clear()
+        self.timer = None
+        self.use_compatibilty_lerp = use_compat_lerp
+        self.is_playing = False
+        self.has_finished = False
+        self._can_play = True
+        self.time_source = time_source
+        self.time_factor = time_factor
+    
+    @classmethod
+    def acquire(cls, target : object, info : 'TweenInfo', goal : dict[str, Any], use_compat_lerp = True,
+              time_source : Callable[[], float]|None = None, time_factor : float = 1) -> 'TweenTrack':
+        '''Returns a pooled track retargeted to target and goal, or a new track if the pool is empty. The track is not playing.'''
+        if not cls.inactive_elements:
+            return TweenTrack(target, info, goal, use_compat_lerp, time_source, time_factor)
+        track = cls.inactive_elements.pop()
+        track.in_pool = False
+        track.retarget(target, info, goal, use_compat_lerp, time_source, time_factor)
+        return track
+    
+    @classmethod
+    def release(cls, track : 'TweenTrack'):
+        '''Cancels the track and returns it to the pool. Handles to it go stale. Nothing changes if the track is already pooled.
+        If the track is still in elements, update_all drops it the next time it runs.'''
+        if track.in_pool: return
+        track.cancel()
+        track.generation += 1
+        track.target = None
+        track.info = None
+        track.goal = None
+        track.start.clear()
+        track.properties.clear()
+        track.timer = None
+        track.is_playing = False
+        track.auto_update = False
+        track.recycle = False
+        track.owner = None
+        track.in_pool = True
+        cls.inactive_elements.append(track)
     
     @staticmethod
     def stall_tween(time : float):
         return TweenTrack(None, TweenInfo(lambda t: 0, time), {})
     
     @staticmethod
-    def get_chained_attribute(obj : object, name : str) -> Any:
-        steps = name.split('.')
-        step_count = len(steps)
-        if step_count != 1:
-            current = obj
-            for index, step in enumerate(steps):
-                current = current.__getattribute__(step)
-                if index + 2 >= step_count: break
-            final_target = current
-            reach = steps[-1]
+    def compile_accessor(target : object, name : str) -> tuple[Getter, Setter]:
+        '''Builds a getter and a setter for a dotted attribute path like 'rect.centery'.
+        target is only used to find out what type of object the last step writes to.'''
+        getter : Getter = operator.attrgetter(name)
+        parent_name, _, reach = name.rpartition('.')
+        if not parent_name:
+            def setter(obj : object, value : Any):
+                setattr(obj, reach, value)
+            return getter, setter
+        
+        get_parent : Getter = operator.attrgetter(parent_name)
+        parent = get_parent(target)
+        if isinstance(parent, (pygame.Vector2, pygame.Vector3)) and reach in VECTOR_COMPONENTS:
+            #Vector components are written by index, which skips the attribute lookup.
+            #The cache is keyed by the target's type only, so another instance may hold something else at the same path
+            index = VECTOR_COMPONENTS[reach]
+            vector_type = type(parent)
+            def setter(obj : object, value : Any):
+                parent = get_parent(obj)
+                if type(parent) is vector_type: parent[index] = value
+                else: setattr(parent, reach, value)
         else:
-            final_target = obj
-            reach = name
+            def setter(obj : object, value : Any):
+                setattr(get_parent(obj), reach, value)
+        return getter, setter
+    
+    @classmethod
+    def get_accessor(cls, target : object, name : str) -> tuple[Getter, Setter]:
+        key = (type(target), name)
+        accessor = cls.accessors.get(key, None)
+        if accessor is None:
+            accessor = cls.compile_accessor(target, name)
+            cls.accessors[key] = accessor
+        return accessor
     
-        return final_target.__getattribute__(reach)
+    @staticmethod
+    def get_chained_attribute(obj : object, name : str) -> Any:
+        return TweenTrack.get_accessor(obj, name)[0](obj)
     
     @staticmethod
     def set_chained_attribute(obj : object, name : str, value : Any):
-        steps = name.split('.')
-        step_count = len(steps)
-        if step_count != 1:
-            current = obj
-            for index, step in enumerate(steps):
-                current = current.__getattribute__(step)
-                if index + 2 >= step_count: break
-            final_target = current
-            reach = steps[-1]
-        else:
-            final_target = obj
-            reach = name
-        final_target.__setattr__(reach, value)
+        TweenTrack.get_accessor(obj, name)[1](obj, value)
 
-    def play(self):
+    def play(self, override : str|None = None):
+        '''Starts the track from the current values of its attributes. override (the track's own override mode by default) decides
+        what happens to other tracks driving the same attributes of the same target:
+        'replace' removes the attributes from them, 'blend' does the same but starts from the old track's moving value instead of
+        a fixed one, so the motion stays continuous, and 'queue' waits until they finish. Tracks left without attributes are cancelled.'''
         if not self._can_play: return
+        if override is None: override = self.override
+        self.unindex()
+        self.blend_sources.clear()
+        entries = TweenTrack.index.get(id(self.target), None)
+        if entries and override == 'queue':
+            for attr in self.goal:
+                current = entries.get(attr, None)
+                if current is not None and current is not self and current.is_playing:
+                    current.queued.append(self)
+                    self.timer = None
+                    self.is_playing = False
+                    self.has_finished = False
+                    return
+        self.properties.clear()
         for attr in self.goal:
-            self.start[attr] = self.get_chained_attribute(self.target, attr)
-        self.timer = Timer(self.info.time, self.time_source, self.time_factor)
+            getter, setter = TweenTrack.get_accessor(self.target, attr)
+            start_value = getter(self.target)
+            self.start[attr] = start_value
+            lerp_func = interpolation.get_lerp(start_value, self.goal[attr]) if self.use_compatibilty_lerp else interpolation.lerp
+            self.properties.append((attr, setter, lerp_func))
+            current = entries.get(attr, None) if entries else None
+            if current is not None and current is not self:
+                if override == 'blend': self.take_blend_source(current, attr)
+                current.drop_property(attr)
+        self.add_to_index()
+        timer = self.reusable_timer
+        if timer is None:
+            timer = Timer(self.info.time, self.time_source, self.time_factor)
+            self.reusable_timer = timer
+        else:
+            timer.reset(self.info.time, self.time_source, self.time_factor)
+        self.timer = timer
         self.has_finished = False
         self.is_playing = True
     
+    def add_to_index(self):
+        if not self.goal: return
+        entries = TweenTrack.index.get(id(self.target), None)
+        if entries is None:
+            entries = {}
+            TweenTrack.index[id(self.target)] = entries
+        for attr in self.goal:
+            entries[attr] = self
+        self.is_indexed = True
+    
+    def unindex(self):
+        if not self.is_indexed: return
+        self.is_indexed = False
+        key = id(self.target)
+        entries = TweenTrack.index.get(key, None)
+        if entries is None: return
+        for attr in self.goal:
+            if entries.get(attr, None) is self: del entries[attr]
+        if not entries: del TweenTrack.index[key]
+    
+    def take_blend_source(self, current : 'TweenTrack|EngineTween', attr : str):
+        '''Makes attr start from where current would have taken it, fading into this track's own goal.'''
+        source = current.get_blend_source(attr)
+        if source is not None: self.blend_sources[attr] = source
+    
+    def get_blend_source(self, attr : str) -> BlendSource|None:
+        '''How this track is moving attr, for a track that blends out of it.'''
+        if self.timer is None or attr not in self.start: return None
+        for current_attr, _, lerp_func in self.properties:
+            if current_attr != attr: continue
+            #The timer is copied because a pooled track resets its timer in place when it is reused
+            return (self.start[attr], self.goal[attr], lerp_func, self.info.easying_style, copy(self.timer))
+        return None
+    
+    def drop_property(self, attr : str):
+        '''Stops driving attr, which has been taken over by another track. The track is cancelled once it drives nothing.'''
+        self.properties = [prop for prop in self.properties if prop[0] != attr]
+        self.blend_sources.pop(attr, None)
+        if not self.properties: self.cancel()
+    
+    @classmethod
+    def cancel_all(cls, target : object):
+        '''Cancels every track and engine tween driving target, along with the tweens queued behind them.'''
+        entries = cls.index.get(id(target), None)
+        if not entries: return
+        for track in set(entries.values()):
+            track.cancel()
+    
+    def cancel(self):
+        '''Stops the track for good: it counts as finished, so update_all drops it and anything waiting on it moves on.
+        Tracks queued behind it are cancelled too. A cancelled chain step cancels its chain.'''
+        self.unindex()
+        self.blend_sources.clear()
+        self.is_playing = False
+        self.timer = None
+        was_finished = self.has_finished
+        self.has_finished = True
+        if self.queued:
+            queued = self.queued
+            self.queued = []
+            for track in queued:
+                track.cancel()
+        if not was_finished and self.owner is not None: self.owner.cancel()
+        if self.finish_callbacks: self.run_finish_callbacks()
+    
+    def finish(self):
+        self.unindex()
+        self.blend_sources.clear()
+        if self.queued:
+            queued = self.queued
+            self.queued = []
+            for track in queued:
+                track.restart()
+        if self.finish_callbacks: self.run_finish_callbacks()
+    
+    def add_finish_callback(self, callback : Callable[[], Any]):
+        '''callback runs once, when the track finishes or is cancelled. It runs right away if the track has already finished.'''
+        if self.has_finished:
+            callback()
+            return
+        if self.finish_callbacks is None: self.finish_callbacks = []
+        self.finish_callbacks.append(callback)
+    
+    def run_finish_callbacks(self):
+        callbacks = self.finish_callbacks
+        self.finish_callbacks = None
+        for callback in callbacks:
+            callback()
+    
+    def __await__(self):
+        '''Lets coroutines run by the TaskScheduler wait for the track with "await track".'''
+        if not self.has_finished: yield self
+    
     def stop(self):
+        self.unindex()
+        self.blend_sources.clear()
         self.is_playing = False
         self.timer = None
     
+    def restart(self):
+        '''Plays the track again from its start. A finished track that was updated automatically is registered again.'''
+        self.play()
+        if self.auto_update: self.register()
+    
     def destroy(self):
+        self.cancel()
         self.start.clear()
         self.goal.clear()
+        self.properties.clear()
         self.info = None
         self.target = None
         self.is_playing = False
         self.timer = None
         self.is_playing = False
-        self.has_finished = False
         self._can_play = False
-        if self in TweenTrack.elements:
-            TweenTrack.elements.remove(self)
+    
     def pause(self):
         self.is_playing = False
         if self.timer:  
@@ -113,25 +380,45 @@ class TweenTrack:
             alpha = 1
             self.has_finished = True
             self.is_playing = False
-        lerp_func : Callable[[Any, Any, float], Any]
-        if self.use_compatibilty_lerp:
-            lerp_func = interpolation.compatibilty_lerp
-        else:
-            lerp_func = interpolation.lerp
-        for attr in self.goal:
-            result = lerp_func(self.start[attr], self.goal[attr], self.info.easying_style(alpha))
+        eased_alpha : float = self.info.easying_style(alpha)
+        if self.blend_sources: self.update_blend_sources()
+        for attr, setter, lerp_func in self.properties:
+            result = lerp_func(self.start[attr], self.goal[attr], eased_alpha)
             #print(f'{self.start[attr]} --> {self.goal[attr]} : {result}')
-            self.set_chained_attribute(self.target, attr, result)
+            setter(self.target, result)
+        if self.has_finished: self.finish()
+    
+    def update_blend_sources(self):
+        '''Moves the start of blended attributes along with the tween they are fading out of.'''
+        finished = None
+        for attr, (start, goal, lerp_func, easing_style, timer) in self.blend_sources.items():
+            alpha = timer.get_time() / timer.duration if timer.duration > 0 else 1
+            if alpha >= 1:
+                self.start[attr] = goal
+                if finished is None: finished = []
+                finished.append(attr)
+            else:
+                self.start[attr] = lerp_func(start, goal, easing_style(alpha))
+        if finished:
+            for attr in finished: del self.blend_sources[attr]
       
     @classmethod
     def update_all(cls):
-        to_cleanup = []
+        if not cls.elements: return
+        any_finished = False
         for element in cls.elements:
             element.update()
-            if element.has_finished:
-                to_cleanup.append(element)
-        for element in to_cleanup:
-            cls.elements.remove(element)
+            if element.has_finished or not element.auto_update: any_finished = True
+        if not any_finished: return
+        #Finished, cancelled and released tracks are dropped here instead of being removed one by one
+        remaining = []
+        for element in cls.elements:
+            if element.auto_update and not element.has_finished:
+                remaining.append(element)
+                continue
+            element.is_registered = False
+            if element.recycle: cls.release(element)
+        cls.elements[:] = remaining
 
 
 class TweenInfo:
@@ -142,6 +429,9 @@ class TweenInfo:
 
 class TweenChain:
     elements : list['TweenChain'] = []
+    inactive_elements : list['TweenChain'] = []
+    #id(target) -> chains playing on it. Indexed by target rather than through their steps, since a wait step has no goal
+    index : dict[int, list['TweenChain']] = {}
     def __init__(self, target : object, steps : list[tuple[TweenInfo, dict[str, Any]]], use_compat_lerp = True,
               time_source : Callable[[], float]|None = None, time_factor : float = 1) -> None:
         self.target = target
@@ -153,23 +443,141 @@ class TweenChain:
         self.is_playing : bool = False
         self.has_finished : bool = False
         self.step_count = len(steps)
+        #One track per step, made on first use and retargeted every time the step comes up again
+        self.tracks : list[TweenTrack|None] = [None] * self.step_count
 
         self.time_source : Callable[[], float] = time_source
         self.time_factor : float = time_factor
+
+        self.recycle : bool = False
+        self.in_pool : bool = False
+        self.generation : int = 0
+        self.is_registered : bool = False
+        self.is_indexed : bool = False
+        self.finish_callbacks : list[Callable[[], Any]]|None = None
     
-    def register(self):
+    def register(self, recycle : bool = False):
+        '''recycle returns the chain to the pool once it finishes.'''
+        self.recycle = recycle
+        if self.is_registered: return
+        self.is_registered = True
         TweenChain.elements.append(self)
     
+    def retarget(self, target : object, steps : list[tuple[TweenInfo, dict[str, Any]]], use_compat_lerp = True,
+              time_source : Callable[[], float]|None = None, time_factor : float = 1):
+        '''Gives the chain a new target and steps. The step tracks are kept; call play to start it.'''
+        self.unindex()
+        self.target = target
+        self.steps = steps
+        self.step_count = len(steps)
+        if len(self.tracks) < self.step_count:
+            self.tracks.extend([None] * (self.step_count - len(self.tracks)))
+        self.current_step = None
+        self.current_track = None
+        self.use_compatibilty_lerp = use_compat_lerp
+        self.is_playing = False
+        self.has_finished = False
+        self.time_source = time_source
+        self.time_factor = time_factor
+    
+    @classmethod
+    def acquire(cls, target : object, steps : list[tuple[TweenInfo, dict[str, Any]]], use_compat_lerp = True,
+              time_source : Callable[[], float]|None = None, time_factor : float = 1) -> 'TweenChain':
+        '''Returns a pooled chain retargeted to target and steps, or a new chain if the pool is empty.'''
+        if not cls.inactive_elements:
+            return TweenChain(target, steps, use_compat_lerp, time_source, time_factor)
+        chain = cls.inactive_elements.pop()
+        chain.in_pool = False
+        chain.retarget(target, steps, use_compat_lerp, time_source, time_factor)
+        return chain
+    
+    @classmethod
+    def release(cls, chain : 'TweenChain'):
+        '''Cancels the chain and returns it to the pool. Handles to it go stale. Nothing changes if the chain is already pooled.'''
+        if chain.in_pool: return
+        chain.cancel()
+        chain.generation += 1
+        for track in chain.tracks:
+            if track is None: continue
+            track.stop()
+            track.target = None
+        chain.target = None
+        chain.steps = None
+        chain.current_track = None
+        chain.is_playing = False
+        chain.recycle = False
+        chain.in_pool = True
+        cls.inactive_elements.append(chain)
+    
     def play(self):
+        if self.current_track: self.current_track.stop()
         self.current_step = 0
+        self.has_finished = False
         first_track = self.get_track_from_step(0)
         first_track.play()
         self.current_track = first_track
         self.is_playing = True
+        self.add_to_index()
+    
+    def add_to_index(self):
+        if self.is_indexed: return
+        self.is_indexed = True
+        TweenChain.index.setdefault(id(self.target), []).append(self)
+    
+    def unindex(self):
+        if not self.is_indexed: return
+        self.is_indexed = False
+        key = id(self.target)
+        chains = TweenChain.index.get(key, None)
+        if chains is None: return
+        if self in chains: chains.remove(self)
+        if not chains: del TweenChain.index[key]
+    
+    @classmethod
+    def cancel_all(cls, target : object):
+        '''Cancels every chain playing on target, whatever step it is on.'''
+        for chain in list(cls.index.get(id(target), ())):
+            chain.cancel()
+    
+    def restart(self):
+        '''Plays the chain again from its first step. A finished chain is registered again.'''
+        self.play()
+        self.register(self.recycle)
 
     def stop(self):
+        if self.current_track: self.current_track.stop()
         self.is_playing = False
         self.current_track = None
+        self.unindex()
+    
+    def cancel(self):
+        '''Stops the chain for good. It counts as finished, so update_all drops it.'''
+        self.unindex()
+        if self.has_finished: return
+        self.has_finished = True
+        self.is_playing = False
+        current_track = self.current_track
+        self.current_track = None
+        if current_track is not None: current_track.cancel()
+        if self.finish_callbacks: self.run_finish_callbacks()
+    
+    def add_finish_callback(self, callback : Callable[[], Any]):
+        '''callback runs once, when the chain finishes or is cancelled. It runs right away if the chain has already finished.'''
+        if self.has_finished:
+            callback()
+            return
+        if self.finish_callbacks is None: self.finish_callbacks = []
+        self.finish_callbacks.append(callback)
+    
+    def run_finish_callbacks(self):
+        callbacks = self.finish_callbacks
+        self.finish_callbacks = None
+        for callback in callbacks:
+            callback()
+    
+    def __await__(self):
+        '''Lets coroutines run by the TaskScheduler wait for the chain with "await chain".'''
+        if not self.has_finished: yield self
     
     def pause(self):
         self.is_playing = False
@@ -183,9 +591,16 @@ class TweenChain:
         else:
             self.play()
 
-    def get_track_from_step(self, step : int):
+    def get_track_from_step(self, step : int) -> TweenTrack:
         info1, goal1 = self.steps[step]
-        return TweenTrack(self.target, info1, goal1, self.use_compatibilty_lerp, self.time_source, self.time_factor)
+        track = self.tracks[step]
+        if track is None:
+            track = TweenTrack(self.target, info1, goal1, self.use_compatibilty_lerp, self.time_source, self.time_factor)
+            track.owner = self
+            self.tracks[step] = track
+        else:
+            track.retarget(self.target, info1, goal1, self.use_compatibilty_lerp, self.time_source, self.time_factor)
+        return track
         
     def update(self):
         if not self.current_track: return
@@ -197,16 +612,556 @@ class TweenChain:
                 self.has_finished = True
                 self.is_playing = False
                 self.current_track = None
+                self.unindex()
+                if self.finish_callbacks: self.run_finish_callbacks()
                 return
             self.current_track = self.get_track_from_step(self.current_step)
             self.current_track.play()
     
     @classmethod
     def update_all(cls):
-        to_cleanup = []
+        if not cls.elements: return
+        any_finished = False
         for element in cls.elements:
             element.update()
-            if element.has_finished:
-                to_cleanup.append(element)
-        for element in to_cleanup:
-            cls.elements.remove(element)
\ No newline at end of file
+            if element.has_finished: any_finished = True
+        if not any_finished: return
+        remaining = []
+        for element in cls.elements:
+            if not element.has_finished:
+                remaining.append(element)
+                continue
+            element.is_registered = False
+            if element.recycle: cls.release(element)
+        cls.elements[:] = remaining
+
+
+class TweenHandle:
+    '''Reference to a pooled TweenTrack or TweenChain. Once the tween is recycled the handle goes stale:
+    it reports a finished tween and its methods do nothing, so an old handle never controls a tween that was reused elsewhere.'''
+    __slots__ = ('element', 'generation')
+    def __init__(self, element : TweenTrack|TweenChain) -> None:
+        self.element : TweenTrack|TweenChain = element
+        self.generation : int = element.generation
+    
+    def get(self) -> TweenTrack|TweenChain|None:
+        '''The tween this handle points to, or None if it has been recycled since.'''
+        element = self.element
+        return element if element.generation == self.generation else None
+    
+    @property
+    def is_valid(self) -> bool:
+        return self.element.generation == self.generation
+    
+    @property
+    def is_playing(self) -> bool:
+        element = self.get()
+        return element is not None and element.is_playing
+    
+    @property
+    def has_finished(self) -> bool:
+        element = self.get()
+        return element is None or element.has_finished
+    
+    def update(self):
+        element = self.get()
+        if element is not None: element.update()
+    
+    def pause(self):
+        element = self.get()
+        if element is not None: element.pause()
+    
+    def unpause(self):
+        element = self.get()
+        if element is not None: element.unpause()
+    
+    def restart(self):
+        element = self.get()
+        if element is not None: element.restart()
+    
+    def stop(self):
+        '''Stops the tween and returns it to the pool.'''
+        self.release()
+    
+    def release(self):
+        element = self.get()
+        if element is not None: type(element).release(element)
+    
+    def add_finish_callback(self, callback : Callable[[], Any]):
+        '''callback runs once the tween finishes, is cancelled or is recycled. It runs right away if the handle is stale.'''
+        element = self.get()
+        if element is None: callback()
+        else: element.add_finish_callback(callback)
+    
+    def __await__(self):
+        element = self.get()
+        if element is not None and not element.has_finished: yield element
+
+
+class EngineChannel:
+    '''One tweened attribute of an EngineTween, stored in a row of the engine arrays.'''
+    __slots__ = ('tween', 'row', 'attr', 'kind', 'width', 'start_value', 'goal_value', 'goal_row', 'blend_source')
+    def __init__(self, tween : 'EngineTween', row : int, attr : str, kind : int, width : int,
+                 start_value : Any, goal_value : Any, goal_row : list[float]) -> None:
+        self.tween : EngineTween = tween
+        self.row : int = row
+        self.attr : str = attr
+        self.kind : int = kind
+        self.width : int = width
+        self.start_value : Any = start_value
+        self.goal_value : Any = goal_value
+        self.goal_row : list[float] = goal_row
+        self.blend_source : BlendSource|None = None
+
+
+class EngineTween:
+    '''Handle of a tween running in a TweenEngine. Takes part in the same override modes, index and cancel_all as a TweenTrack
+    and has the same is_playing, has_finished, cancel and finish callbacks. The engine updates it, so update does nothing.'''
+    __slots__ = ('engine', 'target', 'info', 'goal', 'time_factor', 'override', 'channels', 'is_playing', 'has_finished',
+                 'finish_callbacks', 'queued', 'is_indexed')
+    def __init__(self, engine : 'TweenEngine', target : object, info : 'TweenInfo', goal : dict[str, Any], time_factor : float = 1,
+                 override : str = 'replace') -> None:
+        self.engine : TweenEngine = engine
+        self.target : object = target
+        self.info : TweenInfo = info
+        self.goal : dict[str, Any] = goal
+        self.time_factor : float = time_factor
+        self.override : str = override
+        self.channels : list[EngineChannel] = []
+        self.is_playing : bool = False
+        self.has_finished : bool = False
+        self.finish_callbacks : list[Callable[[], Any]]|None = None
+        self.queued : list[TweenTrack|EngineTween] = []
+        self.is_indexed : bool = False
+    
+    def update(self):
+        pass
+
+    def play(self, override : str|None = None, rows : list[tuple[str, int, Any, Any]]|None = None):
+        '''Adds the tween's rows to the engine, starting from the current values. override works like in TweenTrack.play.
+        rows are the engine's get_rows for the tween, if they were just worked out.'''
+        if override is None: override = self.override
+        self.unindex()
+        entries = TweenTrack.index.get(id(self.target), None)
+        if entries and override == 'queue':
+            for attr in self.goal:
+                current = entries.get(attr, None)
+                if current is not None and current is not self and current.is_playing:
+                    current.queued.append(self)
+                    self.is_playing = False
+                    self.has_finished = False
+                    return
+        if self.channels: self.engine.remove_tween(self)
+        if rows is None: rows = self.engine.get_rows(self.target, self.goal)
+        self.engine.add_rows(self, rows)
+        for channel in self.channels:
+            current = entries.get(channel.attr, None) if entries else None
+            if current is not None and current is not self:
+                if override == 'blend': self.engine.blend(channel, current.get_blend_source(channel.attr))
+                current.drop_property(channel.attr)
+        self.add_to_index()
+        self.has_finished = False
+        self.is_playing = True
+    
+    def restart(self):
+        self.play()
+    
+    def add_to_index(self):
+        if not self.goal: return
+        entries = TweenTrack.index.get(id(self.target), None)
+        if entries is None:
+            entries = {}
+            TweenTrack.index[id(self.target)] = entries
+        for attr in self.goal:
+            entries[attr] = self
+        self.is_indexed = True
+    
+    def unindex(self):
+        if not self.is_indexed: return
+        self.is_indexed = False
+        key = id(self.target)
+        entries = TweenTrack.index.get(key, None)
+        if entries is None: return
+        for attr in self.goal:
+            if entries.get(attr, None) is self: del entries[attr]
+        if not entries: del TweenTrack.index[key]
+    
+    def get_blend_source(self, attr : str) -> BlendSource|None:
+        for channel in self.channels:
+            if channel.attr != attr: continue
+            engine = self.engine
+            timer = Timer(engine.durations[channel.row], engine.time_source, self.time_factor)
+            timer.start_time = engine.start_times[channel.row]
+            return (channel.start_value, channel.goal_value, interpolation.get_lerp(channel.start_value, channel.goal_value),
+                    self.info.easying_style, timer)
+        return None
+    
+    def drop_property(self, attr : str):
+        '''Stops driving attr, which has been taken over by another tween. The tween is cancelled once it drives nothing.'''
+        for channel in self.channels:
+            if channel.attr != attr: continue
+            self.channels.remove(channel)
+            self.engine.remove_row(channel.row)
+            break
+        if not self.channels: self.cancel()
+    
+    def cancel(self):
+        '''Stops the tween for good and cancels the tweens queued behind it, like TweenTrack.cancel.'''
+        self.unindex()
+        if self.channels: self.engine.remove_tween(self)
+        self.is_playing = False
+        self.has_finished = True
+        if self.queued:
+            queued = self.queued
+            self.queued = []
+            for tween in queued:
+                tween.cancel()
+        if self.finish_callbacks: self.run_finish_callbacks()
+    
+    def stop(self):
+        '''Same as cancel. Engine tweens can't be paused and picked up again.'''
+        self.cancel()
+    
+    def finish(self):
+        '''Called by the engine once the tween's rows are done and removed.'''
+        self.unindex()
+        self.channels.clear()
+        if self.queued:
+            queued = self.queued
+            self.queued = []
+            for tween in queued:
+                tween.restart()
+        if self.finish_callbacks: self.run_finish_callbacks()
+    
+    def add_finish_callback(self, callback : Callable[[], Any]):
+        '''callback runs once, when the tween finishes or is cancelled. It runs right away if the tween has already finished.'''
+        if self.has_finished:
+            callback()
+            return
+        if self.finish_callbacks is None: self.finish_callbacks = []
+        self.finish_callbacks.append(callback)
+    
+    def run_finish_callbacks(self):
+        callbacks = self.finish_callbacks
+        self.finish_callbacks = None
+        for callback in callbacks:
+            callback()
+    
+    def __await__(self):
+        '''Lets coroutines run by the TaskScheduler wait for the tween with "await tween".'''
+        if not self.has_finished: yield self
+
+
+class TweenEngine:
+    '''Runs numeric tweens as a struct of NumPy arrays (one row per tweened attribute) and advances all of them in one pass.
+    Values are only written back to targets whose value changed, one batch per (target type, attribute) so that the loop over
+    targets runs inside map instead of calling a setter per row. There is one engine per time source, see new_tween(batched=True).'''
+    engines : dict[Callable[[], float]|None, 'TweenEngine'] = {}
+    KIND_SCALAR, KIND_VECTOR2, KIND_VECTOR3, KIND_COLOR, KIND_SEQUENCE = range(5)
+    WIDTH : int = 4
+    #(target type, attribute path, kind, width, start value type) -> writer, shared by every engine
+    writers : dict[tuple[type, str, int, int, type], 'Writer'] = {}
+
+    def __init__(self, time_source : Callable[[], float]|None) -> None:
+        self.time_source : Callable[[], float]|None = time_source
+        self.count : int = 0
+        self.capacity : int = 0
+        self.channels : list[EngineChannel] = []
+        self.starts : numpy.ndarray = numpy.zeros((0, TweenEngine.WIDTH))
+        self.deltas : numpy.ndarray = numpy.zeros((0, TweenEngine.WIDTH))
+        self.last_values : numpy.ndarray = numpy.zeros((0, TweenEngine.WIDTH))
+        self.start_times : numpy.ndarray = numpy.zeros(0)
+        self.durations : numpy.ndarray = numpy.zeros(0)
+        self.factors : numpy.ndarray = numpy.zeros(0)
+        self.easing_ids : numpy.ndarray = numpy.zeros(0, dtype=int)
+        self.kinds : numpy.ndarray = numpy.zeros(0, dtype=int)
+        self.writer_ids : numpy.ndarray = numpy.zeros(0, dtype=int)
+        self.target_objects : numpy.ndarray = numpy.empty(0, dtype=object)
+        self.row_writers : list[Writer] = []
+        self.writer_index : dict[Writer, int] = {}
+        self.easings : list[Callable[[float], float]] = []
+        self.easing_index : dict[Callable[[float], float], int] = {}
+        #Channels whose start follows the tween they took over, see blend
+        self.blending : set[EngineChannel] = set()
+    
+    @classmethod
+    def get(cls, time_source : Callable[[], float]|None = None) -> 'TweenEngine':
+        engine = cls.engines.get(time_source, None)
+        if engine is None:
+            engine = TweenEngine(time_source) if numpy is not None else None
+            cls.engines[time_source] = engine
+        return engine
+    
+    @staticmethod
+    def get_kind(start : Any, goal : Any) -> int|None:
+        '''Returns how a start value and goal are stored, or None if the engine can't tween them.'''
+        if isinstance(start, (int, float)) and isinstance(goal, (int, float)) and not isinstance(start, bool): 
+            return TweenEngine.KIND_SCALAR
+        if isinstance(start, pygame.Color):
+            try: pygame.Color(goal)
+            except (ValueError, TypeError): return None
+            return TweenEngine.KIND_COLOR
+        try: size = len(start)
+        except TypeError: return None
+        if size != len(goal) or not 2 <= size <= TweenEngine.WIDTH: return None
+        if not all(isinstance(value, (int, float)) for value in start) or not all(isinstance(value, (int, float)) for value in goal): return None
+        if isinstance(start, pygame.Vector2): return TweenEngine.KIND_VECTOR2
+        if isinstance(start, pygame.Vector3): return TweenEngine.KIND_VECTOR3
+        #Other sequence types go to a TweenTrack, since the engine can only rebuild these from a row
+        if type(start) in (list, tuple) or isinstance(start, interpolation.RECT_TYPES): return TweenEngine.KIND_SEQUENCE
+        return None
+    
+    @staticmethod
+    def compile_writer(target : object, name : str, kind : int, width : int, value_type : type) -> 'Writer':
+        '''Builds a function that writes one row of values to each of a list of targets of the same type.
+        Sequences are written back as value_type (the type of the start value), so a Rect or tuple stays one.'''
+        if kind == TweenEngine.KIND_SCALAR:
+            convert = lambda values : values[:, 0].tolist()
+        elif kind == TweenEngine.KIND_VECTOR2:
+            convert = lambda values : map(pygame.Vector2, values[:, :2].tolist())
+        elif kind == TweenEngine.KIND_VECTOR3:
+            convert = lambda values : map(pygame.Vector3, values[:, :3].tolist())
+        elif kind == TweenEngine.KIND_COLOR:
+            convert = lambda values : map(pygame.Color, values.astype(int).tolist())
+        elif value_type is list:
+            convert = lambda values : values[:, :width].tolist()
+        else:
+            convert = lambda values : map(value_type, values[:, :width].tolist())
+        
+        parent_name, _, reach = name.rpartition('.')
+        if not parent_name:
+            def writer(targets : list[object], values : 'numpy.ndarray'):
+                consume(map(setattr, targets, repeat(reach), convert(values)))
+            return writer
+        
+        get_parent : Getter = operator.attrgetter(parent_name)
+        parent = get_parent(target)
+        if isinstance(parent, (pygame.Vector2, pygame.Vector3)) and reach in VECTOR_COMPONENTS:
+            index = VECTOR_COMPONENTS[reach]
+            def writer(targets : list[object], values : 'numpy.ndarray'):
+                consume(map(operator.setitem, map(get_parent, targets), repeat(index), convert(values)))
+        else:
+            def writer(targets : list[object], values : 'numpy.ndarray'):
+                consume(map(setattr, map(get_parent, targets), repeat(reach), convert(values)))
+        return writer
+    
+    @classmethod
+    def get_writer(cls, target : object, name : str, kind : int, width : int, value_type : type) -> 'Writer':
+        key = (type(target), name, kind, width, value_type)
+        writer = cls.writers.get(key, None)
+        if writer is None:
+            writer = cls.compile_writer(target, name, kind, width, value_type)
+            cls.writers[key] = writer
+        return writer
+    
+    def get_now(self) -> float:
+        return (self.time_source or Timer.time_source)()
+    
+    def grow(self):
+        new_capacity = max(64, self.capacity * 2)
+        extra = new_capacity - self.capacity
+        self.starts = numpy.concatenate((self.starts, numpy.zeros((extra, TweenEngine.WIDTH))))
+        self.deltas = numpy.concatenate((self.deltas, numpy.zeros((extra, TweenEngine.WIDTH))))
+        self.last_values = numpy.concatenate((self.last_values, numpy.zeros((extra, TweenEngine.WIDTH))))
+        self.start_times = numpy.concatenate((self.start_times, numpy.zeros(extra)))
+        self.durations = numpy.concatenate((self.durations, numpy.zeros(extra)))
+        self.factors = numpy.concatenate((self.factors, numpy.zeros(extra)))
+        self.easing_ids = numpy.concatenate((self.easing_ids, numpy.zeros(extra, dtype=int)))
+        self.kinds = numpy.concatenate((self.kinds, numpy.zeros(extra, dtype=int)))
+        self.writer_ids = numpy.concatenate((self.writer_ids, numpy.zeros(extra, dtype=int)))
+        self.target_objects = numpy.concatenate((self.target_objects, numpy.empty(extra, dtype=object)))
+        self.capacity = new_capacity
+    
+    def add(self, target : object, info : 'TweenInfo', goal : dict[str, Any], time_factor : float = 1,
+            override : str = 'replace') -> EngineTween|None:
+        '''Starts the tween now (or queues it, see EngineTween.play). Returns None (and adds nothing) if one of the goal values is not numeric.'''
+        rows = self.get_rows(target, goal)
+        if rows is None: return None
+        tween = EngineTween(self, target, info, goal, time_factor, override)
+        tween.play(rows = rows)
+        return tween
+    
+    @staticmethod
+    def get_rows(target : object, goal : dict[str, Any]) -> list[tuple[str, int, Any, Any]]|None:
+        '''(attribute, kind, start value, goal value) for every goal, or None if one of them can't be tweened by the engine.'''
+        rows : list[tuple[str, int, Any, Any]] = []
+        for attr, goal_value in goal.items():
+            start_value = TweenTrack.get_accessor(target, attr)[0](target)
+            kind = TweenEngine.get_kind(start_value, goal_value)
+            if kind is None: return None
+            rows.append((attr, kind, start_value, goal_value))
+        return rows
+    
+    @staticmethod
+    def to_row(value : Any, kind : int) -> list[float]:
+        if kind == TweenEngine.KIND_SCALAR: return [value]
+        if kind == TweenEngine.KIND_COLOR: return list(pygame.Color(value))
+        return list(value)
+    
+    def add_rows(self, tween : EngineTween, rows : list[tuple[str, int, Any, Any]]):
+        info = tween.info
+        target = tween.target
+        time_factor = tween.time_factor
+        easing_style = info.easying_style
+        easing_id = self.easing_index.get(easing_style, None)
+        if easing_id is None:
+            easing_id = len(self.easings)
+            self.easings.append(easing_style)
+            self.easing_index[easing_style] = easing_id
+        
+        start_time = self.get_now() * time_factor
+        for attr, kind, start_value, goal_value in rows:
+            if self.count >= self.capacity: self.grow()
+            row = self.count
+            start_row = TweenEngine.to_row(start_value, kind)
+            goal_row = TweenEngine.to_row(goal_value, kind)
+            width = len(start_row)
+            self.starts[row] = 0
+            self.deltas[row] = 0
+            self.starts[row, :width] = start_row
+            self.deltas[row, :width] = [goal - start for start, goal in zip(start_row, goal_row)]
+            self.last_values[row] = numpy.nan
+            self.start_times[row] = start_time
+            self.durations[row] = info.time
+            self.factors[row] = time_factor
+            self.easing_ids[row] = easing_id
+            self.kinds[row] = kind
+            self.writer_ids[row] = self.get_writer_id(TweenEngine.get_writer(target, attr, kind, width, type(start_value)))
+            self.target_objects[row] = target
+            channel = EngineChannel(tween, row, attr, kind, width, start_value, goal_value, goal_row)
+            self.channels.append(channel)
+            tween.channels.append(channel)
+            self.count += 1
+    
+    def blend(self, channel : EngineChannel, source : BlendSource|None):
+        '''Makes the channel start from where source would have taken it, fading into its own goal. See TweenTrack.play.'''
+        if source is None: return
+        channel.blend_source = source
+        self.blending.add(channel)
+    
+    def update_blend_sources(self):
+        '''Moves the start of blending channels along with the tween they are fading out of.'''
+        finished = None
+        for channel in self.blending:
+            start, goal, lerp_func, easing_style, timer = channel.blend_source
+            alpha = timer.get_time() / timer.duration if timer.duration > 0 else 1
+            if alpha >= 1:
+                start_value = goal
+                if finished is None: finished = []
+                finished.append(channel)
+            else:
+                start_value = lerp_func(start, goal, easing_style(alpha))
+            channel.start_value = start_value
+            start_row = TweenEngine.to_row(start_value, channel.kind)
+            row, width = channel.row, channel.width
+            self.starts[row, :width] = start_row
+            self.deltas[row, :width] = [goal - start for start, goal in zip(start_row, channel.goal_row)]
+        if finished:
+            for channel in finished:
+                channel.blend_source = None
+                self.blending.discard(channel)
+    
+    def get_writer_id(self, writer : 'Writer') -> int:
+        writer_id = self.writer_index.get(writer, None)
+        if writer_id is None:
+            writer_id = len(self.row_writers)
+            self.row_writers.append(writer)
+            self.writer_index[writer] = writer_id
+        return writer_id
+    
+    def remove_row(self, row : int):
+        '''Swap-remove: the last row takes the place of the removed one.'''
+        last = self.count - 1
+        if row != last:
+            self.starts[row] = self.starts[last]
+            self.deltas[row] = self.deltas[last]
+            self.last_values[row] = self.last_values[last]
+            self.start_times[row] = self.start_times[last]
+            self.durations[row] = self.durations[last]
+            self.factors[row] = self.factors[last]
+            self.easing_ids[row] = self.easing_ids[last]
+            self.kinds[row] = self.kinds[last]
+            self.writer_ids[row] = self.writer_ids[last]
+            self.target_objects[row] = self.target_objects[last]
+            removed = self.channels[row]
+            moved = self.channels[last]
+            moved.row = row
+            self.channels[row] = moved
+        else:
+            removed = self.channels[last]
+        if removed.blend_source is not None:
+            removed.blend_source = None
+            self.blending.discard(removed)
+        self.target_objects[last] = None
+        self.channels.pop()
+        self.count = last
+    
+    def remove_tween(self, tween : EngineTween):
+        for channel in tween.channels:
+            self.remove_row(channel.row)
+        tween.channels.clear()
+    
+    def update(self):
+        count = self.count
+        if not count: return
+        now = self.get_now()
+        if self.blending: self.update_blend_sources()
+        durations = self.durations[:count]
+        alphas = now * self.factors[:count] - self.start_times[:count]
+        numpy.divide(alphas, durations, out=alphas, where=durations > 0)
+        alphas[durations <= 0] = 2
+        finished = alphas > 1
+        numpy.minimum(alphas, 1, out=alphas)
+
+        easing_ids = self.easing_ids[:count]
+        if len(self.easings) == 1:
+            eased = interpolation.ease_array(self.easings[0], alphas)
+        else:
+            eased = numpy.empty(count)
+            for easing_id in numpy.unique(easing_ids).tolist():
+                mask = easing_ids == easing_id
+                eased[mask] = interpolation.ease_array(self.easings[easing_id], alphas[mask])
+        
+        values = self.starts[:count] + self.deltas[:count] * eased[:, None]
+        kinds = self.kinds[:count]
+        is_color = kinds == TweenEngine.KIND_COLOR
+        if is_color.any(): values[is_color] = numpy.clip(numpy.rint(values[is_color]), 0, 255)
+        changed = (values != self.last_values[:count]).any(axis=1)
+        self.last_values[:count] = values
+        if changed.any(): self.write_back(values, changed)
+        
+        if finished.any():
+            channels = self.channels
+            finished_tweens = []
+            #Remove from the highest row down so swap-remove never moves a row that is still to be removed
+            for row in numpy.flatnonzero(finished)[::-1].tolist():
+                tween = channels[row].tween
+                if not tween.has_finished:
+                    tween.is_playing = False
+                    tween.has_finished = True
+                    finished_tweens.append(tween)
+                self.remove_row(row)
+            #Queued tweens and callbacks can start new tweens, so they only run once the rows are settled
+            for tween in finished_tweens:
+                tween.finish()
+    
+    def write_back(self, values : 'numpy.ndarray', changed : 'numpy.ndarray'):
+        rows = numpy.flatnonzero(changed)
+        writer_ids = self.writer_ids[rows]
+        first_id = int(writer_ids[0])
+        if (writer_ids == first_id).all():
+            self.row_writers[first_id](self.target_objects[rows].tolist(), values[rows])
+            return
+        #Group the rows by writer, keeping the row order inside each group
+        order = numpy.argsort(writer_ids, kind='stable')
+        rows = rows[order]
+        writer_ids = writer_ids[order]
+        bounds = [0] + (numpy.flatnonzero(numpy.diff(writer_ids)) + 1).tolist() + [len(rows)]
+        for start, end in zip(bounds, bounds[1:]):
+            group = rows[start:end]
+            self.row_writers[int(writer_ids[start])](self.target_objects[group].tolist(), values[group])
+            
+    @classmethod
+    def update_all(cls):
+        for engine in cls.engines.values():
+            if engine is not None: engine.update()
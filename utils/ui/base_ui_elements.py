@@ -1,6 +1,7 @@
 import pygame
 from utils.ui.ui_sprite import UiSprite
 import utils.ui.button_templates as button_templates
+from utils.mipmap import MipChain
 
 class BaseUiElements:
     font_40 = pygame.font.Font("assets/fonts/Pixeltype.ttf", 40)
@@ -9,7 +10,7 @@ class BaseUiElements:
 
     @classmethod
     def new_button(cls, button_type : str, text, tag, alignment, pos, scale : float|tuple = 1, attributes = None, text_settings : tuple = None, 
-                   name : str|None = None):
+                   name : str|None = None, use_mipmaps : bool = False):
         if text_settings is None: text_settings = (cls.font_40, "Black", False)
         font : pygame.Font
         text_color : pygame.Color|str
@@ -24,7 +25,10 @@ class BaseUiElements:
             surf_scale, text_scale = scale
 
         surface = cls.image_dict[button_type]
-        surface = pygame.transform.scale_by(surface, surf_scale)
+        if use_mipmaps:
+            surface = MipChain.get(surface).scale_by(surf_scale)
+        else:
+            surface = pygame.transform.scale_by(surface, surf_scale)
         
         surface_rect = surface.get_bounding_rect()
         
@@ -40,8 +44,12 @@ class BaseUiElements:
         return UiSprite(surface, surface_rect, tag, attributes = attributes, name=name)
 
     @classmethod
-    def new_textless_button(cls, button_type : str, tag, alignment, pos, scale : float|tuple = 1, attributes = None, name : str|None = None):
-        surface = pygame.transform.scale_by(cls.image_dict[button_type], scale)
+    def new_textless_button(cls, button_type : str, tag, alignment, pos, scale : float|tuple = 1, attributes = None, name : str|None = None,
+                            use_mipmaps : bool = False):
+        if use_mipmaps:
+            surface = MipChain.get(cls.image_dict[button_type]).scale_by(scale)
+        else:
+            surface = pygame.transform.scale_by(cls.image_dict[button_type], scale)
         surface_rect = surface.get_bounding_rect()
         surface_rect.__setattr__(alignment, pos)
         
@@ -1,6 +1,7 @@
 import pygame
 from utils.ui.ui_sprite import UiSprite
 from utils.helpers import rotate_around_pivot_accurate
+from utils.surface_registry import SurfaceRegistry
 
 class BrightnessOverlay(UiSprite):
     def __init__(self, brightness : int, rect: pygame.Rect, tag: int, name: str | None = None, attributes: dict = None, data: dict = None, zindex: int = 0):
@@ -15,9 +16,16 @@ class BrightnessOverlay(UiSprite):
             self._blend_mode = pygame.BLEND_RGB_ADD if self._brightness >= 0 else pygame.BLEND_RGB_SUB
             abs_brightness = abs(self._brightness)
 
-        self.surf = pygame.surface.Surface(self.rect.size)
+        self._fill_surf : pygame.Surface|None = None
+        self.surf = self.get_fill_surf()
         self.surf.fill((abs_brightness, abs_brightness, abs_brightness))
     
+    def get_fill_surf(self) -> pygame.Surface:
+        '''The plain overlay surface. It is converted to the display format once and only remade when the size changes.'''
+        if self._fill_surf is None or self._fill_surf.get_size() != self.rect.size:
+            self._fill_surf = SurfaceRegistry.prepare(pygame.surface.Surface(self.rect.size))
+        return self._fill_surf
+    
     @property
     def brightness(self):
         return self._brightness
@@ -35,8 +43,9 @@ class BrightnessOverlay(UiSprite):
         else:
             self._blend_mode = pygame.BLEND_RGB_ADD if self._brightness >= 0 else pygame.BLEND_RGB_SUB
             abs_brightness = abs(self._brightness)
-        self.surf = pygame.surface.Surface(self.rect.size)
+        self.surf = self.get_fill_surf()
         self.surf.fill((abs_brightness, abs_brightness, abs_brightness))
+        self.surf.set_alpha(None)
         scalex_offset, scaley_offset = self._scale.x - 1, self._scale.y - 1
         if abs(scalex_offset) > 0.001 or abs(scaley_offset) > 0.001:
             self.surf = pygame.transform.scale_by(self.surf, self.scale)
@@ -58,4 +67,5 @@ class BrightnessOverlay(UiSprite):
     
     def draw(self, display : pygame.Surface):
         if self.visible:
+            if SurfaceRegistry.audit_enabled: SurfaceRegistry.audit_blit(self.surf, display, self.__class__.__name__)
             display.blit(self.surf, self.rect, special_flags=self._blend_mode)
\ No newline at end of file
@@ -1,21 +1,24 @@
 import pygame
+from utils.atlas import TextureAtlas
 
-green_button_surf = pygame.image.load("assets/graphics/button_templates/green_button.png").convert_alpha()
-blue_button_surf = pygame.image.load("assets/graphics/button_templates/blue_button.png").convert_alpha()
-red_button_surf = pygame.image.load("assets/graphics/button_templates/red_button.png").convert_alpha()
+#All templates live in one sheet, rebuild it with: python -m utils.atlas assets/graphics/button_templates assets/graphics/atlases/button_templates
+atlas : TextureAtlas = TextureAtlas.load("assets/graphics/atlases/button_templates")
 
-left_button_surf = pygame.image.load("assets/graphics/button_templates/left_button.png").convert_alpha()
-right_button_surf = pygame.image.load("assets/graphics/button_templates/right_button.png").convert_alpha()
+green_button_surf = atlas.get("green_button")
+blue_button_surf = atlas.get("blue_button")
+red_button_surf = atlas.get("red_button")
 
-hover_icon_surf = pygame.image.load("assets/graphics/button_templates/hover_icon.png").convert_alpha()
-hover_icon_clean_surf = pygame.image.load("assets/graphics/button_templates/hover_icon_clean.png").convert_alpha()
-hover_icon_blue_surf = pygame.image.load("assets/graphics/button_templates/hover_icon_blue.png").convert_alpha()
-home_icon_surf = pygame.image.load("assets/graphics/button_templates/home_icon.png").convert_alpha()
+left_button_surf = atlas.get("left_button")
+right_button_surf = atlas.get("right_button")
 
-back_icon_surf = pygame.image.load("assets/graphics/button_templates/back_icon_green_colorkey.png").convert()
-back_icon_surf.set_colorkey((0, 255, 0))
-left_arrow_surf = pygame.image.load("assets/graphics/button_templates/left_arrow.png").convert_alpha()
-right_arrow_surf = pygame.image.load("assets/graphics/button_templates/right_arrow.png").convert_alpha()
+hover_icon_surf = atlas.get("hover_icon")
+hover_icon_clean_surf = atlas.get("hover_icon_clean")
+hover_icon_blue_surf = atlas.get("hover_icon_blue")
+home_icon_surf = atlas.get("home_icon")
+
+back_icon_surf = atlas.get("back_icon_green_colorkey", (0, 255, 0))
+left_arrow_surf = atlas.get("left_arrow")
+right_arrow_surf = atlas.get("right_arrow")
 
 image_dict : dict[str, pygame.Surface] = {
 "GreenButton": green_button_surf,
@@ -30,4 +33,4 @@ image_dict : dict[str, pygame.Surface] = {
 "LeftArrow" : left_arrow_surf,
 "RightArrow" : right_arrow_surf,
 "BackIcon" : back_icon_surf,
-}
\ No newline at end of file
+}
@@ -2,9 +2,10 @@ import pygame
 from math import floor
 from utils.ui.ui_sprite import UiSprite
 from utils.helpers import rotate_around_pivot_accurate
+from utils.surface_registry import SurfaceRegistry
+import utils.ui.button_templates as button_templates
 class TextBox(UiSprite):
-    main_image = pygame.image.load('assets/graphics/button_templates/textbox_green_colorkey.png').convert()
-    main_image.set_colorkey((0, 255, 0))
+    main_image = button_templates.atlas.get('textbox_green_colorkey', (0, 255, 0))
     main_font = pygame.font.Font(r'assets/fonts/Pixeltype.ttf', 40)
     def __init__(self, surf: pygame.Surface, rect: pygame.Rect, tag: int, text : str, name: str | None = None, keep_og_surf=False, 
                  attributes: dict = None, data: dict = None, forced_og_surf: pygame.Surface = None, zindex: int = 0, 
@@ -28,7 +29,7 @@ class TextBox(UiSprite):
         
     def _render(self):
         if self.og_surf is None:
-            self.og_surf = self.surf.copy()
+            self.og_surf = SurfaceRegistry.track(self.surf.copy(), 'ui')
         else:
             self.surf = self.og_surf.copy()
         self._render_text()
@@ -2,6 +2,7 @@ import pygame
 from math import floor
 from utils.ui.ui_sprite import UiSprite
 from utils.helpers import rotate_around_pivot_accurate
+from utils.surface_registry import SurfaceRegistry
 import button_templates
 
 class TextButton(UiSprite):
@@ -22,7 +23,7 @@ class TextButton(UiSprite):
         
     def _render(self):
         if self.og_surf is None:
-            self.og_surf = self.surf.copy()
+            self.og_surf = SurfaceRegistry.track(self.surf.copy(), 'ui')
         else:
             self.surf = self.og_surf.copy()
         self._render_text()
@@ -1,6 +1,8 @@
 import pygame
 from utils.helpers import rotate_around_pivot_accurate, ColorType
 from utils.pivot_2d import Pivot2D
+from utils.mipmap import MipChain
+from utils.surface_registry import SurfaceRegistry
 
 
 
@@ -28,7 +30,7 @@ class UiSprite:
         self.og_surf : None|pygame.Surface
         if keep_og_surf:
             if forced_og_surf: self.og_surf = forced_og_surf
-            else: self.og_surf = self.surf.copy()
+            else: self.og_surf = SurfaceRegistry.track(self.surf.copy(), 'ui')
         else:
             self.og_surf = None
 
@@ -41,6 +43,7 @@ class UiSprite:
         self.interactible : bool = True
         self.clickable : bool = True if self.tag != 0 else False
         self.use_pivot : bool = False
+        self.use_mipmaps : bool = False
         self.has_per_pixel_alpha : bool = False
         if self.surf:
             if self.surf.get_alpha() == None: 
@@ -76,14 +79,18 @@ class UiSprite:
 
     def _render(self):
         if self.og_surf is None:
-            self.og_surf = self.surf.copy()
+            self.og_surf = SurfaceRegistry.track(self.surf.copy(), 'ui')
         else:
             pass
         has_modified = False
         scalex_offset, scaley_offset = self._scale.x - 1, self._scale.y - 1
         if abs(scalex_offset) > 0.001 or abs(scaley_offset) > 0.001:
             surf_to_mod = self.surf if has_modified else self.og_surf
-            self.surf = pygame.transform.scale_by(surf_to_mod, self.scale)
+            if self.use_mipmaps:
+                #Goes through the cache every render so the chain counts as in use and budget eviction can free it later
+                self.surf = MipChain.get(surf_to_mod).scale_by(self.scale)
+            else:
+                self.surf = pygame.transform.scale_by(surf_to_mod, self.scale)
             has_modified = True
 
         
@@ -163,7 +170,7 @@ class UiSprite:
         self._render()
     
     def reset(self):
-        self.surf = self.og_surf.copy()
+        self.surf = SurfaceRegistry.track(self.og_surf.copy(), 'ui')
         self._scale = pygame.Vector2(1,1)
         self._opacity = 1
         self._angle = 0
@@ -171,6 +178,7 @@ class UiSprite:
     
     def draw(self, display : pygame.Surface):
         if self.visible:
+            if SurfaceRegistry.audit_enabled: SurfaceRegistry.audit_blit(self.surf, display, self.__class__.__name__)
             display.blit(self.surf, self.rect)
     
     def on_click(self):